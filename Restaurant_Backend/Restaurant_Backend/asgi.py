@@ -5,6 +5,10 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+
+The kitchen/barista SSE streams are async views and should be served from here,
+e.g. ``gunicorn Restaurant_Backend.asgi:application -k uvicorn.workers.UvicornWorker``,
+so that idle stream connections do not each hold a worker thread.
 """
 
 import os
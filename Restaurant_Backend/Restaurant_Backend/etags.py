@@ -0,0 +1,22 @@
+"""Conditional GET helpers shared by the polling endpoints.
+
+Views build a strong ETag from a cheap version signal (max updated_at, counters,
+...) and return 304 before running the full query or serializer.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response
+
+
+def make_etag(*parts):
+    """Return a quoted strong ETag for the given version parts."""
+    digest = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def not_modified(request, etag):
+    """Return a 304 response if the request's If-None-Match matches ``etag``, else None."""
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        response["ETag"] = etag
+    return response
@@ -0,0 +1,138 @@
+"""Idempotency-Key support for the mutating endpoints.
+
+Waiter tablets retry POSTs on flaky Wi-Fi. A request carrying an
+``Idempotency-Key`` header claims the key (per user) before the view runs; the
+view's response is stored on the claim, and a retry with the same key replays it
+with an ``Idempotent-Replayed: true`` header instead of writing again. Keys
+expire after ``TTL``.
+
+The claim, the view's writes and the stored response are committed in one
+transaction. A retry arriving while the first request runs waits on the key's
+unique index and then replays the committed response; if the first request
+fails, is killed or times out, nothing of it is committed and the retry runs
+the view itself.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.http.request import RawPostDataException
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+
+HEADER = "Idempotency-Key"
+TTL = timedelta(hours=24)
+MAX_KEY_LENGTH = 255
+UNSAFE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+
+class _Replay(APIException):
+    """Raised from ``initial()`` to short-circuit the view with a ready response."""
+
+    def __init__(self, response):
+        super().__init__()
+        self.response = response
+
+
+def _fingerprint(request):
+    digest = hashlib.sha256()
+    digest.update(f"{request.method} {request.path}\n".encode("utf-8"))
+    try:
+        digest.update(request.body)
+    except RawPostDataException:
+        # multipart bodies are streamed by the parser; fall back to the parsed data
+        digest.update(repr(sorted(request.data.items())).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _error(detail, status_code):
+    return _Replay(Response({"detail": detail}, status=status_code))
+
+
+def claim_key(request):
+    """Claim the request's Idempotency-Key. Returns the claim, or None if the request has no key.
+
+    Raises ``_Replay`` with the stored response for a retry, or with an error if
+    the key was used for a different request. Called inside the request's
+    transaction, so a concurrent first request holding the key makes this wait
+    until it commits or rolls back.
+    """
+    from accounts_app.models import IdempotencyKey
+
+    key = request.headers.get(HEADER)
+    if not key or request.method not in UNSAFE_METHODS or not request.user.is_authenticated:
+        return None
+    if len(key) > MAX_KEY_LENGTH:
+        raise _error(f"{HEADER} must be at most {MAX_KEY_LENGTH} characters.", status.HTTP_400_BAD_REQUEST)
+
+    fingerprint = _fingerprint(request)
+    now = timezone.now()
+    IdempotencyKey.objects.filter(created_at__lt=now - TTL).delete()
+    # committed claims without a response can only be left over from before claims
+    # shared the view's transaction; nothing is running for them any more
+    IdempotencyKey.objects.filter(user=request.user, key=key, status_code__isnull=True).delete()
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(user=request.user, key=key, fingerprint=fingerprint)
+    except IntegrityError:
+        pass
+
+    existing = IdempotencyKey.objects.filter(user=request.user, key=key).first()
+    if existing is None:
+        # expired and pruned by a concurrent request in between; let the client retry
+        raise _error("Request with this Idempotency-Key is being processed.", status.HTTP_409_CONFLICT)
+    if existing.fingerprint != fingerprint:
+        raise _error(f"{HEADER} was already used for a different request.", status.HTTP_422_UNPROCESSABLE_ENTITY)
+    response = Response(existing.response, status=existing.status_code)
+    response["Idempotent-Replayed"] = "true"
+    raise _Replay(response)
+
+
+def store_response(claim, response):
+    """Save the view's response on the claim. Server errors are not stored: the
+    request's transaction is rolled back, releasing the key."""
+    if response.status_code >= 500:
+        return
+    claim.status_code = response.status_code
+    claim.response = response.data
+    claim.save(update_fields=["status_code", "response"])
+
+
+class IdempotentAPIViewMixin:
+    """Honour Idempotency-Key on the unsafe methods of a DRF view.
+
+    The key is claimed after authentication and permission checks, so replays are
+    scoped to the calling user. Requests with a key run in one transaction.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in UNSAFE_METHODS or not request.headers.get(HEADER):
+            return super().dispatch(request, *args, **kwargs)
+        with transaction.atomic():
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code >= 500:
+                # release the key together with whatever the view wrote
+                transaction.set_rollback(True)
+        return response
+
+    def initial(self, request, *args, **kwargs):
+        self._idempotency_claim = None
+        super().initial(request, *args, **kwargs)
+        self._idempotency_claim = claim_key(request)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, _Replay):
+            return exc.response
+        # unhandled errors propagate out of dispatch() and roll the claim back
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        claim = getattr(self, "_idempotency_claim", None)
+        if claim is not None:
+            self._idempotency_claim = None
+            store_response(claim, response)
+        return response
@@ -149,7 +149,8 @@ AUTH_USER_MODEL = "accounts_app.User"
 # DRF configuration: use TokenAuthentication by default
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        # JWTAuthentication with a short-lived per-process user/role cache
+        "accounts_app.authentication.CachedJWTAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
@@ -17,7 +17,7 @@ Including another URLconf
 
 from django.contrib import admin
 from django.urls import path, include
-from tables_app.views import SessionRetrieveAPIView, RequestBillAPIView, ActiveSessionsListAPIView
+from tables_app.views import SessionRetrieveAPIView, RequestBillAPIView, ActiveSessionsListAPIView, FloorPlanAPIView
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -31,5 +31,6 @@ urlpatterns = [
     # session detail endpoint accessible at /api/sessions/<id>/ per spec
     path("api/sessions/<int:pk>/", SessionRetrieveAPIView.as_view(), name="session-detail-root"),
     path("api/sessions/active/", ActiveSessionsListAPIView.as_view(), name="sessions-active"),
+    path("api/floor/", FloorPlanAPIView.as_view(), name="floor-plan"),
     path("api/sessions/<int:pk>/request-bill/", RequestBillAPIView.as_view(), name="session-request-bill"),
 ]
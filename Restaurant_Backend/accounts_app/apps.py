@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AccountsAppConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "accounts_app"
+
+    def ready(self):
+        from . import signals  # noqa: F401
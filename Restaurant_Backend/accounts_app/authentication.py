@@ -0,0 +1,105 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+class UserSnapshotCache:
+    """Process-local LRU of user + role rows keyed by user id.
+
+    Entries are plain field values, so every request gets its own fresh ``User``
+    (with ``role`` already attached) and never shares instances across threads.
+    Signals on User and Role drop entries in this process; other processes see
+    changes after ``TTL_SECONDS``.
+    """
+
+    TTL_SECONDS = 30
+    MAX_SIZE = 1024
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, user_id):
+        """Return a fresh User for ``user_id`` or None on a miss."""
+        # tokens may carry the id as a string
+        key = str(user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] >= self.TTL_SECONDS:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return self._build(entry[1], entry[2])
+
+    def put(self, user):
+        role = user.role
+        user_values = tuple(getattr(user, f.attname) for f in user._meta.concrete_fields)
+        role_values = tuple(getattr(role, f.attname) for f in role._meta.concrete_fields) if role else None
+        with self._lock:
+            self._entries[str(user.pk)] = (time.monotonic(), user_values, role_values)
+            self._entries.move_to_end(str(user.pk))
+            while len(self._entries) > self.MAX_SIZE:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id=None):
+        """Drop one user, or everything when ``user_id`` is None (e.g. a role changed)."""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(str(user_id), None)
+
+    @staticmethod
+    def _build(user_values, role_values):
+        from rbac_app.models import Role
+        from .models import User
+
+        user = User.from_db("default", [f.attname for f in User._meta.concrete_fields], user_values)
+        role = None
+        if role_values is not None:
+            role = Role.from_db("default", [f.attname for f in Role._meta.concrete_fields], role_values)
+        user.role = role
+        return user
+
+
+user_cache = UserSnapshotCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that serves the user and role from ``user_cache``.
+
+    A hit costs no query; a miss loads the user with its role in one query.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user = None
+        if api_settings.USER_ID_FIELD == "id":
+            user = user_cache.get(user_id)
+        if user is None:
+            try:
+                user = self.user_model.objects.select_related("role").get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist as e:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+            user_cache.put(user)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
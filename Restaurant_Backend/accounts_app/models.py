@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth.base_user import AbstractBaseUser, BaseUserManager
 from django.contrib.auth.models import PermissionsMixin
 from django.apps import apps
+from rest_framework.utils.encoders import JSONEncoder
 
 
 class UserManager(BaseUserManager):
@@ -47,3 +48,26 @@ class User(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return self.username
 
+
+
+class IdempotencyKey(models.Model):
+    """Response of a mutating request sent with an ``Idempotency-Key`` header.
+
+    A retry with the same key replays ``status_code``/``response`` instead of
+    running the write again. Rows expire after ``Restaurant_Backend.idempotency.TTL``.
+    """
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey("accounts_app.User", on_delete=models.CASCADE, related_name="idempotency_keys")
+    key = models.CharField(max_length=255)
+    # hash of method, path and body; a reused key with another request is rejected
+    fingerprint = models.CharField(max_length=64)
+    # set before the claim commits, in the same transaction as the view's writes
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response = models.JSONField(null=True, blank=True, encoder=JSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        unique_together = ("user", "key")
+
+    def __str__(self):
+        return f"{self.user_id}:{self.key}"
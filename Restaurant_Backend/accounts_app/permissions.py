@@ -1,3 +1,6 @@
+import threading
+import time
+
 from rest_framework.permissions import BasePermission
 
 
@@ -13,3 +16,73 @@ class IsAdminRole(BasePermission):
             return True
         role = getattr(user, "role", None)
         return bool(role and getattr(role, "is_admin", False))
+
+
+class RolePermissionCache:
+    """Process-local map of role id -> frozenset of rbac Permission codes.
+
+    Built with one query over the Role.permissions table and dropped by the
+    Role/Permission signals in accounts_app.signals; other processes rebuild it
+    after ``TTL_SECONDS``.
+    """
+
+    TTL_SECONDS = 60
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._codes = None
+        self._loaded_at = 0.0
+
+    def invalidate(self):
+        with self._lock:
+            self._codes = None
+
+    def codes(self, role_id):
+        codes = self._codes
+        if codes is None or time.monotonic() - self._loaded_at >= self.TTL_SECONDS:
+            codes = self._load()
+        return codes.get(role_id, frozenset())
+
+    def _load(self):
+        from rbac_app.models import Role
+
+        grouped = {}
+        for role_id, code in Role.permissions.through.objects.values_list("role_id", "permission__code"):
+            grouped.setdefault(role_id, set()).add(code)
+        codes = {role_id: frozenset(role_codes) for role_id, role_codes in grouped.items()}
+        with self._lock:
+            self._codes = codes
+            self._loaded_at = time.monotonic()
+        return codes
+
+
+role_permissions = RolePermissionCache()
+
+
+def user_has_permission(user, code):
+    """True for superusers, admin roles and roles granted the rbac Permission ``code``."""
+    if not user or not user.is_authenticated:
+        return False
+    if getattr(user, "is_superuser", False):
+        return True
+    role = getattr(user, "role", None)
+    if role is None:
+        return False
+    return role.is_admin or code in role_permissions.codes(role.id)
+
+
+class HasPermissionCode(BasePermission):
+    """Require the rbac Permission code declared by the view.
+
+    Views set ``required_permission`` to a code, or to a {method: code} dict when
+    only some methods are restricted (methods not listed are allowed).
+    """
+
+    def has_permission(self, request, view):
+        required = getattr(view, "required_permission", None)
+        if isinstance(required, dict):
+            required = required.get(request.method)
+        if not required:
+            return True
+        self.message = getattr(view, "permission_denied_message", None) or self.message
+        return user_has_permission(request.user, required)
@@ -0,0 +1,36 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from rbac_app.models import Permission, Role
+from .authentication import user_cache
+from .permissions import role_permissions
+from .models import User
+
+
+def _invalidate(callback):
+    callback()
+    # again after commit, in case another request reloaded the old rows meanwhile
+    transaction.on_commit(callback)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    user_id = instance.pk
+    _invalidate(lambda: user_cache.invalidate(user_id))
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+def role_changed(sender, instance, **kwargs):
+    # a role is shared by many cached users
+    _invalidate(user_cache.invalidate)
+
+
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+@receiver(post_delete, sender=Role)
+@receiver(m2m_changed, sender=Role.permissions.through)
+def role_permissions_changed(sender, **kwargs):
+    _invalidate(role_permissions.invalidate)
@@ -0,0 +1,128 @@
+import importlib
+from io import StringIO
+
+from django.apps import apps
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from orders_app.stations import router, user_can_update_station, user_can_view_station
+from rbac_app.models import Permission, Role
+from .authentication import user_cache
+from .models import User
+from .permissions import role_permissions, user_has_permission
+
+
+class RbacTestCase(TestCase):
+    def setUp(self):
+        call_command("seed_permissions_roles", stdout=StringIO())
+        self.roles = {role.name: role for role in Role.objects.all()}
+        self.users = {
+            name: User.objects.create_user(username=name, role=self.roles[name])
+            for name in ("waiter", "chef", "barista", "cashier")
+        }
+        role_permissions.invalidate()
+        user_cache.invalidate()
+        router.invalidate()
+
+    def tearDown(self):
+        role_permissions.invalidate()
+        user_cache.invalidate()
+        router.invalidate()
+
+
+class CacheInvalidationTests(RbacTestCase):
+    def test_revoked_code_is_dropped_again_after_commit(self):
+        cashier = self.users["cashier"]
+        permission = Permission.objects.get(code="billing_invoice_pay")
+        self.assertTrue(user_has_permission(cashier, "billing_invoice_pay"))
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.roles["cashier"].permissions.remove(permission)
+            # another request reloads the codes before the removal is committed
+            with role_permissions._lock:
+                role_permissions._codes = {cashier.role_id: frozenset({"billing_invoice_pay"})}
+        self.assertTrue(callbacks)
+        for callback in callbacks:
+            callback()
+        self.assertFalse(user_has_permission(cashier, "billing_invoice_pay"))
+
+    def test_user_snapshot_is_dropped_again_after_commit(self):
+        waiter, chef = self.users["waiter"], self.users["chef"]
+        with self.captureOnCommitCallbacks() as callbacks:
+            waiter.role = self.roles["cashier"]
+            waiter.save()
+            self.roles["chef"].description = "Kitchen"
+            self.roles["chef"].save()
+            # other requests cache the rows before the changes are committed
+            user_cache.put(User.objects.get(pk=waiter.pk))
+            user_cache.put(chef)
+        self.assertIsNotNone(user_cache.get(waiter.pk))
+        for callback in callbacks:
+            callback()
+        self.assertIsNone(user_cache.get(waiter.pk))
+        self.assertIsNone(user_cache.get(chef.pk))
+
+
+class CachedJWTAuthenticationTests(RbacTestCase):
+    def client_with_token(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+        return client
+
+    def test_repeat_requests_skip_the_user_query(self):
+        client = self.client_with_token(self.users["waiter"])
+        with self.assertNumQueries(1):
+            self.assertEqual(client.get("/api/auth/me/").status_code, 200)
+        with self.assertNumQueries(0):
+            response = client.get("/api/auth/me/")
+        self.assertEqual(response.data["username"], "waiter")
+
+    def test_user_and_role_changes_apply(self):
+        waiter = self.users["waiter"]
+        client = self.client_with_token(waiter)
+        client.get("/api/auth/me/")
+        self.assertFalse(user_has_permission(user_cache.get(waiter.pk), "billing_invoice_pay"))
+        waiter.role = self.roles["cashier"]
+        waiter.save()
+        client.get("/api/auth/me/")
+        self.assertTrue(user_has_permission(user_cache.get(waiter.pk), "billing_invoice_pay"))
+
+        waiter.is_active = False
+        waiter.save()
+        self.assertEqual(client.get("/api/auth/me/").status_code, 401)
+
+    def test_unknown_user_is_rejected(self):
+        client = self.client_with_token(self.users["chef"])
+        self.users["chef"].delete()
+        self.assertEqual(client.get("/api/auth/me/").status_code, 401)
+
+
+class StationPermissionCodeTests(RbacTestCase):
+    def test_seed_grants_station_codes(self):
+        self.assertTrue(user_has_permission(self.users["chef"], "kitchen_items_view"))
+        self.assertTrue(user_has_permission(self.users["barista"], "barista_items_update"))
+        self.assertFalse(user_has_permission(self.users["chef"], "barista_items_view"))
+
+    def test_codes_grant_station_access(self):
+        kitchen = router.get("kitchen")
+        cashier = self.users["cashier"]
+        self.assertFalse(user_can_view_station(cashier, kitchen))
+        self.assertFalse(user_can_update_station(cashier, "kitchen"))
+        self.roles["cashier"].permissions.add(*Permission.objects.filter(code__in=("kitchen_items_view", "kitchen_items_update")))
+        self.assertTrue(user_can_view_station(cashier, kitchen))
+        self.assertTrue(user_can_update_station(cashier, "kitchen"))
+        self.assertFalse(user_can_update_station(cashier, "barista"))
+
+    def test_chef_sees_the_kitchen_without_station_roles(self):
+        self.assertFalse(router.get("kitchen").role_ids)
+        self.assertTrue(user_can_view_station(self.users["chef"], router.get("kitchen")))
+        self.assertFalse(user_can_view_station(self.users["chef"], router.get("barista")))
+
+    def test_rbac_migration_keeps_station_codes(self):
+        migration = importlib.import_module("rbac_app.migrations.0002_grant_role_permission_codes")
+        migration.grant_role_permission_codes(apps, None)
+        self.assertEqual(
+            Permission.objects.filter(code__startswith="kitchen_items_").count(), 2
+        )
+        self.assertTrue(self.roles["chef"].permissions.filter(code="kitchen_items_update").exists())
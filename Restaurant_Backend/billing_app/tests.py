@@ -0,0 +1,99 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from accounts_app.models import User
+from accounts_app.permissions import role_permissions
+from menu_app.models import Category, Item
+from orders_app.models import Order, OrderItem
+from rbac_app.models import Role
+from settings_app.cache import get_settings, settings_cache
+from settings_app.models import Setting
+from tables_app.models import Table, TableSession
+from .models import Invoice
+
+
+class InvoiceTests(TestCase):
+    def setUp(self):
+        call_command("seed_permissions_roles", stdout=StringIO())
+        roles = {role.name: role for role in Role.objects.all()}
+        self.users = {name: User.objects.create_user(username=name, role=roles[name]) for name in ("waiter", "cashier")}
+        Setting.objects.create(
+            tax_rate=Decimal("10.00"), service_charge_rate=Decimal("5.00"), discount_rate=Decimal("10.00")
+        )
+        settings_cache.invalidate()
+        role_permissions.invalidate()
+        category = Category.objects.create(name="Mains")
+        self.steak = Item.objects.create(category=category, name="Steak", price=Decimal("15.00"), type=Item.TYPE_FOOD)
+        self.session = TableSession.open(Table.objects.create(number=1))
+        self.order = Order.objects.create(session=self.session, created_by=self.users["waiter"])
+        OrderItem.objects.create(order=self.order, item=self.steak, quantity=2, price_snapshot=self.steak.price)
+
+    def tearDown(self):
+        settings_cache.invalidate()
+        role_permissions.invalidate()
+
+    def client_for(self, username):
+        client = APIClient()
+        client.force_authenticate(self.users[username])
+        return client
+
+    def create_invoice(self, session=None, username="cashier"):
+        session = session or self.session
+        return self.client_for(username).post("/api/billing/invoices/", {"session_id": session.pk}, format="json")
+
+    def test_totals_from_the_running_subtotal(self):
+        response = self.create_invoice()
+        self.assertEqual(response.status_code, 201)
+        invoice = Invoice.objects.get()
+        # 30.00 - 10% discount, + 5% service charge, + 10% tax on both (2.835 rounds half up)
+        self.assertEqual(
+            (invoice.subtotal, invoice.discount, invoice.service_charge, invoice.tax, invoice.total),
+            (Decimal("30.00"), Decimal("3.00"), Decimal("1.35"), Decimal("2.84"), Decimal("31.19")),
+        )
+
+    def test_query_count_does_not_grow_with_the_session(self):
+        # warm the settings and role permission caches
+        get_settings()
+        self.client_for("cashier").get("/api/billing/pending/")
+        for _ in range(20):
+            OrderItem.objects.create(order=self.order, item=self.steak, price_snapshot=self.steak.price)
+        with self.assertNumQueries(3):
+            response = self.create_invoice()
+        self.assertEqual(response.data["subtotal"], "330.00")
+
+    def test_rates_follow_setting_changes(self):
+        get_settings()
+        setting = Setting.objects.get()
+        setting.discount_rate = Decimal("0.00")
+        setting.service_charge_rate = Decimal("0.00")
+        setting.save()
+        self.create_invoice()
+        self.assertEqual(Invoice.objects.get().total, Decimal("33.00"))
+
+    def test_one_invoice_per_session(self):
+        self.assertEqual(self.create_invoice().status_code, 201)
+        response = self.create_invoice()
+        self.assertEqual((response.status_code, response.data["detail"]), (400, "Invoice already exists for this session."))
+        response = self.client_for("cashier").post("/api/billing/invoices/", {}, format="json")
+        self.assertEqual((response.status_code, response.data["detail"]), (400, "session_id is required."))
+
+    def test_pay_once(self):
+        invoice_id = self.create_invoice().data["id"]
+        cashier = self.client_for("cashier")
+        response = cashier.patch(f"/api/billing/invoices/{invoice_id}/pay/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["paid"])
+        response = cashier.patch(f"/api/billing/invoices/{invoice_id}/pay/")
+        self.assertEqual((response.status_code, response.data["detail"]), (400, "Invoice is already paid."))
+
+    def test_requires_the_permission_codes(self):
+        response = self.create_invoice(username="waiter")
+        self.assertEqual((response.status_code, response.data["detail"]), (403, "You do not have permission to create invoices."))
+        self.assertFalse(Invoice.objects.exists())
+        invoice_id = self.create_invoice().data["id"]
+        self.assertEqual(self.client_for("waiter").patch(f"/api/billing/invoices/{invoice_id}/pay/").status_code, 403)
+        self.assertEqual(self.client_for("waiter").get("/api/billing/pending/").status_code, 403)
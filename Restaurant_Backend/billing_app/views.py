@@ -5,40 +5,27 @@ from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 
-from accounts_app.permissions import IsAdminRole
-from settings_app.models import Setting
+from accounts_app.permissions import HasPermissionCode, IsAdminRole
+from Restaurant_Backend.idempotency import IdempotentAPIViewMixin
+from settings_app.cache import get_settings
 from tables_app.models import TableSession
 from orders_app.models import OrderItem
 from .models import Invoice
 from .serializers import InvoiceSerializer
 
 
-def _user_has_role(user, role_name):
-    if not user or not user.is_authenticated:
-        return False
-    if getattr(user, "is_superuser", False):
-        return True
-    role = getattr(user, "role", None)
-    return bool(role and getattr(role, "name", "").lower() == role_name.lower())
-
-
 def _quantize(amount: Decimal) -> Decimal:
     return amount.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
 
 
 def _get_settings():
-    obj = Setting.objects.first()
-    if not obj:
-        obj = Setting.objects.create()
-    return obj
+    # rates come from the process cache, refreshed when the Setting row is saved
+    return get_settings()
 
 
 def _compute_totals_for_session(session: TableSession):
-    items = OrderItem.objects.filter(order__session=session)
-    subtotal = Decimal("0.00")
-    for it in items:
-        subtotal += (Decimal(it.price_snapshot) * it.quantity)
-    subtotal = _quantize(subtotal)
+    # running total kept up to date by orders_app on every item add / change / delete
+    subtotal = _quantize(Decimal(session.subtotal))
 
     s = _get_settings()
     # rates are provided as percentages, e.g., 10.00 means 10%
@@ -58,13 +45,11 @@ def _compute_totals_for_session(session: TableSession):
 
 
 class PendingBillsListAPIView(generics.GenericAPIView):
-    permission_classes = (IsAuthenticated,)
+    permission_classes = (IsAuthenticated, HasPermissionCode)
+    required_permission = "billing_pending_view"
+    permission_denied_message = "You do not have permission to view pending bills."
 
     def get(self, request):
-        # Only cashier or admin can view pending
-        if not _user_has_role(request.user, "cashier") and not getattr(request.user, "is_superuser", False) and not getattr(getattr(request.user, 'role', None), 'is_admin', False):
-            return Response({"detail": "You do not have permission to view pending bills."}, status=status.HTTP_403_FORBIDDEN)
-
         sessions = TableSession.objects.filter(status=TableSession.STATUS_ACTIVE, bill_requested=True).select_related("table")
         data = []
         for s in sessions:
@@ -81,14 +66,13 @@ class PendingBillsListAPIView(generics.GenericAPIView):
         return Response(data, status=status.HTTP_200_OK)
 
 
-class CreateInvoiceAPIView(generics.CreateAPIView):
+class CreateInvoiceAPIView(IdempotentAPIViewMixin, generics.CreateAPIView):
     serializer_class = InvoiceSerializer
-    permission_classes = (IsAuthenticated,)
+    permission_classes = (IsAuthenticated, HasPermissionCode)
+    required_permission = "billing_invoice_create"
+    permission_denied_message = "You do not have permission to create invoices."
 
     def post(self, request):
-        if not _user_has_role(request.user, "cashier") and not getattr(request.user, "is_superuser", False) and not getattr(getattr(request.user, 'role', None), 'is_admin', False):
-            return Response({"detail": "You do not have permission to create invoices."}, status=status.HTTP_403_FORBIDDEN)
-
         session_id = request.data.get("session_id")
         if not session_id:
             return Response({"detail": "session_id is required."}, status=status.HTTP_400_BAD_REQUEST)
@@ -111,14 +95,14 @@ class CreateInvoiceAPIView(generics.CreateAPIView):
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
-class MarkInvoicePaidAPIView(generics.UpdateAPIView):
+class MarkInvoicePaidAPIView(IdempotentAPIViewMixin, generics.UpdateAPIView):
     queryset = Invoice.objects.all()
     serializer_class = InvoiceSerializer
-    permission_classes = (IsAuthenticated,)
+    permission_classes = (IsAuthenticated, HasPermissionCode)
+    required_permission = "billing_invoice_pay"
+    permission_denied_message = "You do not have permission to mark invoice paid."
 
     def patch(self, request, pk):
-        if not _user_has_role(request.user, "cashier") and not getattr(request.user, "is_superuser", False) and not getattr(getattr(request.user, 'role', None), 'is_admin', False):
-            return Response({"detail": "You do not have permission to mark invoice paid."}, status=status.HTTP_403_FORBIDDEN)
         invoice = get_object_or_404(Invoice, pk=pk)
         if invoice.paid:
             return Response({"detail": "Invoice is already paid."}, status=status.HTTP_400_BAD_REQUEST)
@@ -130,13 +114,11 @@ class MarkInvoicePaidAPIView(generics.UpdateAPIView):
 
 
 class InvoiceRetrieveAPIView(generics.GenericAPIView):
-    permission_classes = (IsAuthenticated,)
+    permission_classes = (IsAuthenticated, HasPermissionCode)
+    required_permission = "billing_pending_view"
+    permission_denied_message = "You do not have permission to view invoices."
 
     def get(self, request, pk):
-        # Only cashier or admin can view invoice details
-        if not _user_has_role(request.user, "cashier") and not getattr(request.user, "is_superuser", False) and not getattr(getattr(request.user, 'role', None), 'is_admin', False):
-            return Response({"detail": "You do not have permission to view invoices."}, status=status.HTTP_403_FORBIDDEN)
-
         invoice = get_object_or_404(Invoice, pk=pk)
         session = invoice.session
         # Collect items for the whole session
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Category, Item
+from .models import Category, Ingredient, Item
 
 
 @admin.register(Category)
@@ -13,3 +13,10 @@ class ItemAdmin(admin.ModelAdmin):
 	list_display = ("id", "name", "category", "price", "available", "type")
 	list_filter = ("available", "type", "category")
 	search_fields = ("name", "category__name")
+	filter_horizontal = ("ingredients",)
+
+
+@admin.register(Ingredient)
+class IngredientAdmin(admin.ModelAdmin):
+	list_display = ("id", "name")
+	search_fields = ("name",)
@@ -0,0 +1,123 @@
+"""Process-local catalog of menu items for the order-entry path.
+
+Adding an item to an order only needs the item's availability, price, type and
+category, so every item is kept as a small ``CatalogItem`` record keyed by id
+and order entry validates and snapshots prices without reading the menu tables.
+The catalog is loaded with one query on first use; Item and Category signals
+patch it once their transaction commits, and a change of the menu snapshot
+version (bumped by bulk writes here, or noticed from other processes) reloads
+it. Ids it does not know are looked up in the database.
+"""
+import threading
+
+from .models import Category, Item
+from .snapshots import snapshots
+
+
+FIELDS = ("id", "category_id", "category_name", "name", "description", "price", "available", "type")
+
+
+class CatalogItem:
+	__slots__ = FIELDS
+
+	def __init__(self, id, category_id, category_name, name, description, price, available, type):
+		self.id = id
+		self.category_id = category_id
+		self.category_name = category_name
+		self.name = name
+		self.description = description
+		self.price = price
+		self.available = available
+		self.type = type
+
+	@classmethod
+	def from_item(cls, item):
+		# a saved instance keeps whatever was assigned (e.g. price as a string)
+		price = Item._meta.get_field("price").to_python(item.price)
+		return cls(item.id, item.category_id, item.category.name, item.name, item.description, price, item.available, item.type)
+
+	def to_instance(self):
+		"""A fresh ``Item`` (with its category attached) for OrderItem.item and the serializers."""
+		category = Category.from_db("default", ["id", "name"], [self.category_id, self.category_name])
+		item = Item.from_db(
+			"default",
+			["id", "category_id", "name", "description", "price", "available", "type"],
+			[self.id, self.category_id, self.name, self.description, self.price, self.available, self.type],
+		)
+		item.category = category
+		return item
+
+
+def _rows(qs):
+	return qs.values_list("id", "category_id", "category__name", "name", "description", "price", "available", "type")
+
+
+class MenuCatalog:
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._items = None
+		self._version = None
+
+	def _ensure_fresh(self):
+		version = snapshots.version()
+		if self._items is not None and self._version == version:
+			return self._items
+		items = {row[0]: CatalogItem(*row) for row in _rows(Item.objects.all())}
+		with self._lock:
+			self._items = items
+			self._version = version
+		return items
+
+	def get(self, item_id):
+		"""The CatalogItem for ``item_id`` or None if there is no such item."""
+		return self.get_many([item_id]).get(item_id)
+
+	def get_many(self, item_ids):
+		"""{item_id: CatalogItem} for the ids that exist; unknown ids cost one query together."""
+		items = self._ensure_fresh()
+		found = {}
+		unknown = []
+		for item_id in item_ids:
+			record = items.get(item_id)
+			if record is not None:
+				found[item_id] = record
+			else:
+				unknown.append(item_id)
+		if unknown:
+			# created by another process since the last reload
+			for row in _rows(Item.objects.filter(id__in=unknown)):
+				record = CatalogItem(*row)
+				found[record.id] = record
+				with self._lock:
+					self._items[record.id] = record
+		return found
+
+	# The signal handlers below run after the change bumped the snapshot version,
+	# so they adopt the new version instead of reloading everything for it.
+
+	def update_item(self, item):
+		record = CatalogItem.from_item(item)
+		version = snapshots.version()
+		with self._lock:
+			if self._items is not None:
+				self._items[item.id] = record
+				self._version = version
+
+	def remove_item(self, item_id):
+		version = snapshots.version()
+		with self._lock:
+			if self._items is not None:
+				self._items.pop(item_id, None)
+				self._version = version
+
+	def update_category(self, category):
+		version = snapshots.version()
+		with self._lock:
+			if self._items is not None:
+				for record in self._items.values():
+					if record.category_id == category.id:
+						record.category_name = category.name
+				self._version = version
+
+
+catalog = MenuCatalog()
@@ -0,0 +1,25 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from menu_app.transfer import FORMATS, export_menu, guess_format
+
+
+class Command(BaseCommand):
+    help = "Stream every menu item as CSV/JSON/JSON Lines (the format import_menu reads)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", default="-", help='output file (default "-": stdout)')
+        parser.add_argument("--format", choices=FORMATS, help="output format (default: from the file extension, else csv)")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or guess_format(path)
+        if path == "-":
+            for piece in export_menu(fmt):
+                sys.stdout.write(piece)
+            return
+        with open(path, "w", encoding="utf-8", newline="") as out:
+            for piece in export_menu(fmt):
+                out.write(piece)
+        self.stdout.write(self.style.SUCCESS(f"Menu exported to {path}."))
@@ -0,0 +1,47 @@
+import io
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from menu_app.transfer import FORMATS, MenuImportError, guess_format, import_menu
+
+
+class Command(BaseCommand):
+    help = "Upsert menu items from a CSV/JSON/JSON Lines file keyed on (category, name) and print the diff"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help='file to import, or "-" for stdin')
+        parser.add_argument("--format", choices=FORMATS, help="input format (default: from the file extension, else csv)")
+        parser.add_argument("--dry-run", action="store_true", help="report the changes without saving them")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or guess_format(path)
+        try:
+            if path == "-":
+                stream = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8-sig", newline="")
+                report = import_menu(stream, fmt, dry_run=options["dry_run"])
+            else:
+                with open(path, encoding="utf-8-sig", newline="") as stream:
+                    report = import_menu(stream, fmt, dry_run=options["dry_run"])
+        except (OSError, MenuImportError) as e:
+            raise CommandError(str(e)) from e
+
+        if options["verbosity"] > 1:
+            for row in report["created"]:
+                self.stdout.write(f"+ {row['category']} / {row['name']}")
+            for row in report["updated"]:
+                self.stdout.write(f"~ {row['category']} / {row['name']} ({', '.join(row['fields'])})")
+            for row in report["missing"]:
+                self.stdout.write(f"? {row['category']} / {row['name']} (not in input)")
+        for error in report["errors"]:
+            self.stderr.write(f"row {error['row']}: {error['error']}")
+
+        summary = (
+            f"{len(report['created'])} created, {len(report['updated'])} updated, {report['unchanged']} unchanged, "
+            f"{len(report['missing'])} not in input, {len(report['errors'])} invalid rows skipped"
+        )
+        if options["dry_run"]:
+            self.stdout.write(self.style.WARNING(f"Dry run, nothing saved: {summary}."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Menu imported: {summary}."))
@@ -1,3 +1,4 @@
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from menu_app.models import Category, Item
@@ -9,6 +10,7 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         from rbac_app.models import Role
         from accounts_app.models import User
+        from orders_app.models import Station
 
         with transaction.atomic():
             # Create categories
@@ -75,6 +77,9 @@ class Command(BaseCommand):
 
             self.stdout.write(self.style.SUCCESS("Menu seeded."))
 
+            # The default roles with their permission codes; views check codes, not role names
+            call_command("seed_permissions_roles", stdout=self.stdout)
+
             # Create roles if not present (ensure roles exist)
             role_names = ["cashier", "barista", "chef", "waiter", "admin"]
             role_objs = {}
@@ -82,6 +87,14 @@ class Command(BaseCommand):
                 r, _ = Role.objects.get_or_create(name=rn, defaults={"description": f"Auto-created role {rn}"})
                 role_objs[rn] = r
 
+            # Let the station roles see the default kitchen/barista queues
+            for code, name, item_type, station_roles in (
+                ("kitchen", "Kitchen", Item.TYPE_FOOD, ("chef", "waiter")),
+                ("barista", "Barista", Item.TYPE_DRINK, ("barista", "waiter")),
+            ):
+                station, _ = Station.objects.get_or_create(code=code, defaults={"name": name, "item_type": item_type})
+                station.roles.add(*(role_objs[rn] for rn in station_roles))
+
             # Create users: usernames correspond to role names
             users = [
                 ("cashier", "cashier"),
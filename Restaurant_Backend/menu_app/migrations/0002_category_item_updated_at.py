@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-18 19:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("menu_app", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="item",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
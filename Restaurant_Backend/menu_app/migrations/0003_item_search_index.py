@@ -0,0 +1,60 @@
+# Generated by Django 5.2.9 on 2026-10-18 19:31
+
+from django.db import DatabaseError, migrations, transaction
+
+
+# kept in sync with menu_app.search.SEARCH_TABLE
+SEARCH_TABLE = "menu_app_item_search"
+TRIGRAM_INDEXES = (
+    ("menu_item_name_trgm", "menu_app_item", "name"),
+    ("menu_item_description_trgm", "menu_app_item", "description"),
+    ("menu_category_name_trgm", "menu_app_category", "name"),
+)
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    # without FTS5 / pg_trgm the app falls back to an in-memory index
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            if not cursor.fetchone()[0]:
+                return
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+            "name, description, category, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, name, description, category) "
+            "SELECT i.id, i.name, i.description, c.name FROM menu_app_item i "
+            "JOIN menu_app_category c ON c.id = i.category_id"
+        )
+    elif connection.vendor == "postgresql":
+        try:
+            with transaction.atomic(using=connection.alias):
+                schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        except DatabaseError:
+            # the database user may not be allowed to create extensions
+            return
+        for name, table, column in TRIGRAM_INDEXES:
+            schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({column} gin_trgm_ops)")
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+    elif connection.vendor == "postgresql":
+        for name, _table, _column in TRIGRAM_INDEXES:
+            schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("menu_app", "0002_category_item_updated_at"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
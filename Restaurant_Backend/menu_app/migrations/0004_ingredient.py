@@ -0,0 +1,27 @@
+# Generated by Django 5.2.9 on 2026-10-18 19:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("menu_app", "0003_item_search_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Ingredient",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("name", models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="item",
+            name="ingredients",
+            field=models.ManyToManyField(
+                blank=True, related_name="items", to="menu_app.ingredient"
+            ),
+        ),
+    ]
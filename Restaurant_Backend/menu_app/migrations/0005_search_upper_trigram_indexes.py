@@ -0,0 +1,56 @@
+from django.db import migrations
+
+# icontains compiles to UPPER(column::text) LIKE UPPER(%s) on PostgreSQL, so the
+# trigram indexes must be built on that expression for the planner to use them
+OLD_INDEXES = (
+    ("menu_item_name_trgm", "menu_app_item", "name"),
+    ("menu_item_description_trgm", "menu_app_item", "description"),
+    ("menu_category_name_trgm", "menu_app_category", "name"),
+)
+UPPER_INDEXES = (
+    ("menu_item_name_upper_trgm", "menu_app_item", "name"),
+    ("menu_item_description_upper_trgm", "menu_app_item", "description"),
+    ("menu_category_name_upper_trgm", "menu_app_category", "name"),
+)
+
+
+def _has_pg_trgm(connection):
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def create_upper_indexes(apps, schema_editor):
+    if not _has_pg_trgm(schema_editor.connection):
+        return
+    for name, table, column in UPPER_INDEXES:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON {table} "
+            f"USING gin ((UPPER({column}::text)) gin_trgm_ops)"
+        )
+    for name, _table, _column in OLD_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+def restore_plain_indexes(apps, schema_editor):
+    if not _has_pg_trgm(schema_editor.connection):
+        return
+    for name, table, column in OLD_INDEXES:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({column} gin_trgm_ops)"
+        )
+    for name, _table, _column in UPPER_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("menu_app", "0004_ingredient"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_upper_indexes, restore_plain_indexes),
+    ]
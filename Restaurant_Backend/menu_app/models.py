@@ -1,9 +1,21 @@
 from django.db import models
+from django.db.models import Count, Max
 
 
 class Category(models.Model):
 	id = models.BigAutoField(primary_key=True)
 	name = models.CharField(max_length=200, unique=True)
+	updated_at = models.DateTimeField(auto_now=True)
+
+	def __str__(self):
+		return self.name
+
+
+class Ingredient(models.Model):
+	"""Tag shared by the items that use an ingredient, so they can be marked unavailable together."""
+
+	id = models.BigAutoField(primary_key=True)
+	name = models.CharField(max_length=100, unique=True)
 
 	def __str__(self):
 		return self.name
@@ -24,9 +36,18 @@ class Item(models.Model):
 	price = models.DecimalField(max_digits=8, decimal_places=2)
 	available = models.BooleanField(default=True)
 	type = models.CharField(max_length=10, choices=TYPE_CHOICES, default=TYPE_FOOD)
+	ingredients = models.ManyToManyField(Ingredient, blank=True, related_name="items")
+	updated_at = models.DateTimeField(auto_now=True)
 
 	class Meta:
 		unique_together = ("category", "name")
 
 	def __str__(self):
 		return f"{self.name} ({self.type})"
+
+
+def menu_version():
+	"""Cheap signature that changes whenever any category or item is saved or deleted."""
+	items = Item.objects.aggregate(updated=Max("updated_at"), count=Count("id"))
+	categories = Category.objects.aggregate(updated=Max("updated_at"), count=Count("id"))
+	return (items["updated"], items["count"], categories["updated"], categories["count"])
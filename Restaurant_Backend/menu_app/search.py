@@ -0,0 +1,328 @@
+"""Menu item search by name, description and category.
+
+Three interchangeable indexes, picked once per process from the database:
+
+* SQLite with FTS5: the ``menu_app_item_search`` virtual table created by
+  migration 0003, ranked with bm25 and queried with prefix terms.
+* PostgreSQL with pg_trgm: icontains filters served by the trigram GIN indexes
+  on ``UPPER(column)`` from migration 0005, ranked by word similarity.
+* Anything else: a process-local prefix trie over the same three fields, rebuilt
+  every ``TTL_SECONDS`` so other processes' edits show up.
+
+Every word of the query must match the start of a word (FTS5 / trie) or appear
+anywhere (trigram) in one of the fields. Matches in the name rank above
+category matches, which rank above description matches. Item and Category
+signals keep the index current.
+"""
+import re
+import threading
+import time
+import unicodedata
+
+from django.db import connection, transaction
+
+from .models import Category, Item
+
+
+SEARCH_TABLE = "menu_app_item_search"
+# relative weight of a match in each field
+FIELD_WEIGHTS = {"name": 3.0, "category": 2.0, "description": 1.0}
+
+
+def tokenize(text):
+	"""Lowercase words of ``text`` with accents stripped ("Crème brûlée" -> ["creme", "brulee"])."""
+	text = unicodedata.normalize("NFKD", text or "")
+	text = "".join(ch for ch in text if not unicodedata.combining(ch))
+	return re.findall(r"\w+", text.lower())
+
+
+class Fts5Index:
+	"""SQLite FTS5 table keyed by item id (rowid)."""
+
+	# written in the caller's transaction
+	in_database = True
+
+	def search(self, query, limit, available_only=True):
+		tokens = tokenize(query)
+		if not tokens:
+			return []
+		match = " ".join(f'"{token}"*' for token in tokens)
+		sql = (
+			f"SELECT s.rowid FROM {SEARCH_TABLE} s JOIN menu_app_item i ON i.id = s.rowid "
+			f"WHERE {SEARCH_TABLE} MATCH %s {'AND i.available' if available_only else ''} "
+			f"ORDER BY bm25({SEARCH_TABLE}, %s, %s, %s), i.name LIMIT %s"
+		)
+		params = [match, FIELD_WEIGHTS["name"], FIELD_WEIGHTS["description"], FIELD_WEIGHTS["category"], limit]
+		with connection.cursor() as cursor:
+			cursor.execute(sql, params)
+			return [row[0] for row in cursor.fetchall()]
+
+	def update_item(self, item):
+		with connection.cursor() as cursor:
+			cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [item.pk])
+			cursor.execute(
+				f"INSERT INTO {SEARCH_TABLE} (rowid, name, description, category) "
+				f"SELECT i.id, i.name, i.description, c.name FROM menu_app_item i "
+				f"JOIN menu_app_category c ON c.id = i.category_id WHERE i.id = %s",
+				[item.pk],
+			)
+
+	def remove_item(self, item_id):
+		with connection.cursor() as cursor:
+			cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [item_id])
+
+	def set_available(self, item_ids, available):
+		# availability is joined from the item table at query time
+		pass
+
+	def update_category(self, category):
+		with connection.cursor() as cursor:
+			cursor.execute(
+				f"UPDATE {SEARCH_TABLE} SET category = %s "
+				f"WHERE rowid IN (SELECT id FROM menu_app_item WHERE category_id = %s)",
+				[category.name, category.pk],
+			)
+
+	def rebuild(self):
+		with connection.cursor() as cursor:
+			cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+			cursor.execute(
+				f"INSERT INTO {SEARCH_TABLE} (rowid, name, description, category) "
+				f"SELECT i.id, i.name, i.description, c.name FROM menu_app_item i "
+				f"JOIN menu_app_category c ON c.id = i.category_id"
+			)
+
+
+class TrigramIndex:
+	"""PostgreSQL pg_trgm; the database maintains the GIN indexes itself."""
+
+	in_database = True
+
+	def search(self, query, limit, available_only=True):
+		from django.contrib.postgres.search import TrigramWordSimilarity
+		from django.db.models import Q
+
+		tokens = tokenize(query)
+		if not tokens:
+			return []
+		qs = Item.objects.all()
+		if available_only:
+			qs = qs.filter(available=True)
+		for token in tokens:
+			# categories are matched first: an OR across the join would keep the planner
+			# from combining the item indexes
+			category_ids = list(Category.objects.filter(name__icontains=token).values_list("id", flat=True))
+			qs = qs.filter(Q(name__icontains=token) | Q(description__icontains=token) | Q(category_id__in=category_ids))
+		text = " ".join(tokens)
+		rank = (
+			TrigramWordSimilarity(text, "name") * FIELD_WEIGHTS["name"]
+			+ TrigramWordSimilarity(text, "category__name") * FIELD_WEIGHTS["category"]
+			+ TrigramWordSimilarity(text, "description") * FIELD_WEIGHTS["description"]
+		)
+		return list(qs.annotate(rank=rank).order_by("-rank", "name").values_list("id", flat=True)[:limit])
+
+	def update_item(self, item):
+		pass
+
+	def remove_item(self, item_id):
+		pass
+
+	def set_available(self, item_ids, available):
+		pass
+
+	def update_category(self, category):
+		pass
+
+	def rebuild(self):
+		pass
+
+
+class _Node:
+	__slots__ = ("children", "weights")
+
+	def __init__(self):
+		self.children = {}
+		# item id -> best field weight of the item's words below this node
+		self.weights = {}
+
+
+class TrieIndex:
+	"""Process-local prefix trie over item words."""
+
+	TTL_SECONDS = 60
+	# updated once the change is committed
+	in_database = False
+
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._root = None
+		self._loaded_at = 0.0
+		# item id -> (name, available, {word: weight}, category_id)
+		self._items = {}
+
+	def search(self, query, limit, available_only=True):
+		tokens = tokenize(query)
+		if not tokens:
+			return []
+		self._ensure_fresh()
+		with self._lock:
+			scores = None
+			for token in tokens:
+				node = self._find(token)
+				if node is None:
+					return []
+				token_scores = {}
+				for item_id, weight in node.weights.items():
+					# a whole-word match counts double
+					exact = self._items[item_id][2].get(token, 0.0)
+					token_scores[item_id] = max(weight, 2 * exact)
+				if scores is None:
+					scores = token_scores
+				else:
+					scores = {item_id: score + token_scores[item_id] for item_id, score in scores.items() if item_id in token_scores}
+			items = self._items
+			ranked = sorted(
+				(item_id for item_id in scores if not available_only or items[item_id][1]),
+				key=lambda item_id: (-scores[item_id], items[item_id][0]),
+			)
+		return ranked[:limit]
+
+	def _find(self, prefix):
+		node = self._root
+		for ch in prefix:
+			node = node.children.get(ch)
+			if node is None:
+				return None
+		return node
+
+	def _ensure_fresh(self):
+		if self._root is None or time.monotonic() - self._loaded_at >= self.TTL_SECONDS:
+			self.rebuild()
+
+	@staticmethod
+	def _words(name, category_name, description):
+		words = {}
+		for field, text in (("description", description), ("category", category_name), ("name", name)):
+			for word in tokenize(text):
+				words[word] = max(words.get(word, 0.0), FIELD_WEIGHTS[field])
+		return words
+
+	def _add(self, item_id, name, available, category_id, words):
+		self._items[item_id] = (name.lower(), available, words, category_id)
+		for word, weight in words.items():
+			node = self._root
+			for ch in word:
+				node = node.children.setdefault(ch, _Node())
+				if node.weights.get(item_id, 0.0) < weight:
+					node.weights[item_id] = weight
+
+	def _remove(self, item_id):
+		entry = self._items.pop(item_id, None)
+		if entry is None:
+			return
+		for word in entry[2]:
+			path = [self._root]
+			for ch in word:
+				node = path[-1].children.get(ch)
+				if node is None:
+					break
+				node.weights.pop(item_id, None)
+				path.append(node)
+			# prune branches no item passes through any more
+			for depth in range(len(path) - 1, 0, -1):
+				if path[depth].weights or path[depth].children:
+					break
+				del path[depth - 1].children[word[depth - 1]]
+
+	def rebuild(self):
+		rows = list(Item.objects.values_list("id", "name", "available", "category_id", "category__name", "description"))
+		root = _Node()
+		with self._lock:
+			self._root = root
+			self._items = {}
+			for item_id, name, available, category_id, category_name, description in rows:
+				self._add(item_id, name, available, category_id, self._words(name, category_name, description))
+			self._loaded_at = time.monotonic()
+
+	def update_item(self, item):
+		if self._root is None:
+			return
+		words = self._words(item.name, item.category.name, item.description)
+		with self._lock:
+			self._remove(item.pk)
+			self._add(item.pk, item.name, item.available, item.category_id, words)
+
+	def remove_item(self, item_id):
+		if self._root is None:
+			return
+		with self._lock:
+			self._remove(item_id)
+
+	def set_available(self, item_ids, available):
+		with self._lock:
+			for item_id in item_ids:
+				entry = self._items.get(item_id)
+				if entry is not None:
+					self._items[item_id] = (entry[0], available, entry[2], entry[3])
+
+	def update_category(self, category):
+		with self._lock:
+			# renames touch every item of the category; rebuild on next search
+			if any(entry[3] == category.pk for entry in self._items.values()):
+				self._loaded_at = 0.0
+
+
+_index = None
+
+
+def get_index():
+	"""The index for the default database, chosen on first use."""
+	global _index
+	if _index is None:
+		_index = _detect_index()
+	return _index
+
+
+def _detect_index():
+	if connection.vendor == "sqlite" and SEARCH_TABLE in connection.introspection.table_names():
+		return Fts5Index()
+	if connection.vendor == "postgresql":
+		with connection.cursor() as cursor:
+			cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+			if cursor.fetchone():
+				return TrigramIndex()
+	return TrieIndex()
+
+
+def _apply(update):
+	index = get_index()
+	if index.in_database:
+		update(index)
+	else:
+		transaction.on_commit(lambda: update(index))
+
+
+def index_item(item):
+	_apply(lambda index: index.update_item(item))
+
+
+def unindex_item(item_id):
+	_apply(lambda index: index.remove_item(item_id))
+
+
+def index_category(category):
+	_apply(lambda index: index.update_category(category))
+
+
+def index_availability(item_ids, available):
+	_apply(lambda index: index.set_available(item_ids, available))
+
+
+def reindex():
+	"""Rebuild the index after bulk writes that bypass the model signals."""
+	_apply(lambda index: index.rebuild())
+
+
+def search_items(query, limit, available_only=True):
+	"""Ids of the items matching ``query``, best match first."""
+	return get_index().search(query, limit, available_only=available_only)
@@ -16,3 +16,17 @@ class ItemSerializer(serializers.ModelSerializer):
         model = Item
         fields = ("id", "category", "category_id", "name", "description", "price", "available", "type")
         read_only_fields = ("id",)
+
+
+class ItemAvailabilitySerializer(serializers.Serializer):
+    """Body of the bulk availability ("86 list") endpoint; the filters are combined with OR."""
+
+    available = serializers.BooleanField()
+    item_ids = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    category_ids = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    ingredient = serializers.CharField(required=False, allow_blank=True, default="")
+
+    def validate(self, attrs):
+        if not (attrs["item_ids"] or attrs["category_ids"] or attrs["ingredient"].strip()):
+            raise serializers.ValidationError("Provide item_ids, category_ids or ingredient.")
+        return attrs
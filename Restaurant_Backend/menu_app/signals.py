@@ -0,0 +1,39 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .catalog import catalog
+from .models import Category, Item
+from .search import index_category, index_item, unindex_item
+from .snapshots import snapshots
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def menu_changed(sender, **kwargs):
+	# after commit, so a listing rendered by another request cannot miss the change
+	transaction.on_commit(snapshots.bump)
+
+
+@receiver(post_save, sender=Item)
+def item_saved(sender, instance, raw=False, **kwargs):
+	if not raw:
+		index_item(instance)
+		transaction.on_commit(lambda: catalog.update_item(instance))
+
+
+@receiver(post_delete, sender=Item)
+def item_deleted(sender, instance, **kwargs):
+	item_id = instance.pk
+	unindex_item(item_id)
+	# the deleted instance's pk is cleared before the transaction commits
+	transaction.on_commit(lambda: catalog.remove_item(item_id))
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, created, raw=False, **kwargs):
+	if not raw and not created:
+		index_category(instance)
+		transaction.on_commit(lambda: catalog.update_category(instance))
@@ -0,0 +1,100 @@
+"""Pre-serialized menu listings.
+
+The menu changes a few times a day but every waiter tablet loads it on every
+screen, so each listing is rendered once per menu version into JSON bytes (and
+gzip, the first time a client accepts it) and served from memory. Item and
+Category signals bump the version in this process; other processes notice a
+change through ``menu_version()`` at most ``CHECK_SECONDS`` later.
+"""
+import gzip
+import hashlib
+import threading
+import time
+
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import JSONRenderer
+
+from Restaurant_Backend.etags import not_modified
+from .models import menu_version
+
+
+class Snapshot:
+	__slots__ = ("body", "etag", "_gzipped")
+
+	def __init__(self, body):
+		self.body = body
+		# derived from the content so every process hands out the same tag
+		self.etag = f'"{hashlib.sha1(body).hexdigest()}"'
+		self._gzipped = None
+
+	@property
+	def gzipped(self):
+		if self._gzipped is None:
+			self._gzipped = gzip.compress(self.body, mtime=0)
+		return self._gzipped
+
+
+class MenuSnapshots:
+	# how often the database signature is compared for changes made by other processes
+	CHECK_SECONDS = 5
+
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._version = 0
+		self._signature = None
+		self._checked_at = 0.0
+		self._snapshots = {}
+
+	def bump(self):
+		"""Drop every snapshot; the next read renders the listings again."""
+		with self._lock:
+			self._version += 1
+			self._snapshots = {}
+			# re-read the signature so this change is not counted twice
+			self._signature = None
+			self._checked_at = 0.0
+
+	def version(self):
+		"""Process-local menu version, bumped on every Item/Category change."""
+		now = time.monotonic()
+		if now - self._checked_at >= self.CHECK_SECONDS:
+			signature = menu_version()
+			with self._lock:
+				if self._signature is not None and signature != self._signature:
+					self._version += 1
+					self._snapshots = {}
+				self._signature = signature
+				self._checked_at = now
+		return self._version
+
+	def get(self, name, build):
+		"""Return the Snapshot ``name``, rendering the data returned by ``build()`` when missing."""
+		version = self.version()
+		with self._lock:
+			snapshot = self._snapshots.get(name)
+		if snapshot is not None:
+			return snapshot
+		snapshot = Snapshot(JSONRenderer().render(build()))
+		with self._lock:
+			# a change while rendering means the data may already be stale
+			if self._version == version:
+				self._snapshots[name] = snapshot
+		return snapshot
+
+
+snapshots = MenuSnapshots()
+
+
+def snapshot_response(request, snapshot):
+	"""Serve ``snapshot`` with its ETag, gzip-encoded when the client accepts it."""
+	response = not_modified(request, snapshot.etag)
+	if response is None:
+		if "gzip" in request.headers.get("Accept-Encoding", ""):
+			response = HttpResponse(snapshot.gzipped, content_type="application/json")
+			response["Content-Encoding"] = "gzip"
+		else:
+			response = HttpResponse(snapshot.body, content_type="application/json")
+		response["ETag"] = snapshot.etag
+	patch_vary_headers(response, ("Accept-Encoding",))
+	return response
@@ -0,0 +1,329 @@
+import gzip
+import io
+import json
+from decimal import Decimal
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts_app.models import User
+from accounts_app.permissions import role_permissions
+from rbac_app.models import Role
+from .catalog import catalog
+from .models import Category, Ingredient, Item
+from .search import TrieIndex, get_index, tokenize
+from .snapshots import snapshots
+from .transfer import export_menu, import_menu
+
+
+def _jsonl(rows):
+	return io.StringIO("\n".join(json.dumps(row) for row in rows))
+
+
+class MenuImportTests(TestCase):
+	def setUp(self):
+		drinks = Category.objects.create(name="Drinks")
+		Item.objects.create(category=drinks, name="Latte", price=Decimal("3.25"), type=Item.TYPE_DRINK)
+
+	def test_non_finite_prices_are_row_errors(self):
+		rows = [
+			{"category": "Drinks", "name": "A", "price": "NaN"},
+			{"category": "Drinks", "name": "B", "price": "Infinity"},
+			{"category": "Drinks", "name": "C", "price": "-inf"},
+			{"category": "Drinks", "name": "D", "price": "sNaN"},
+			{"category": "Drinks", "name": "E", "price": "2.50"},
+		]
+		report = import_menu(_jsonl(rows), "jsonl")
+		self.assertEqual([error["row"] for error in report["errors"]], [1, 2, 3, 4])
+		self.assertEqual([row["name"] for row in report["created"]], ["E"])
+
+	def test_nan_float_in_json(self):
+		report = import_menu(io.StringIO('[{"category": "Drinks", "name": "A", "price": NaN}]'), "json")
+		self.assertEqual(len(report["errors"]), 1)
+		self.assertFalse(Item.objects.filter(name="A").exists())
+
+	def test_available_accepts_booleans_only(self):
+		rows = [
+			{"category": "Drinks", "name": "A", "price": "1", "available": None},
+			{"category": "Drinks", "name": "B", "price": "1", "available": 2},
+			{"category": "Drinks", "name": "C", "price": "1", "available": "maybe"},
+			{"category": "Drinks", "name": "D", "price": "1", "available": False},
+			{"category": "Drinks", "name": "E", "price": "1", "available": "no"},
+		]
+		report = import_menu(_jsonl(rows), "jsonl")
+		self.assertEqual([error["row"] for error in report["errors"]], [1, 2, 3])
+		self.assertEqual(
+			dict(Item.objects.filter(name__in=["D", "E"]).values_list("name", "available")),
+			{"D": False, "E": False},
+		)
+
+	def test_updates_changed_fields(self):
+		rows = [{"category": "Drinks", "name": "Latte", "price": "3.40", "description": "Milky", "available": "false", "type": "drink"}]
+		report = import_menu(_jsonl(rows), "jsonl")
+		self.assertEqual(report["updated"], [{"category": "Drinks", "name": "Latte", "fields": ["description", "price", "available"]}])
+		latte = Item.objects.get(name="Latte")
+		self.assertEqual((latte.price, latte.description, latte.available), (Decimal("3.40"), "Milky", False))
+
+	def test_dry_run_saves_nothing(self):
+		rows = [{"category": "Drinks", "name": "Latte", "price": "9.00"}, {"category": "Food", "name": "Soup", "price": "4"}]
+		report = import_menu(_jsonl(rows), "jsonl", dry_run=True)
+		self.assertEqual(len(report["created"]), 1)
+		self.assertEqual(Item.objects.get(name="Latte").price, Decimal("3.25"))
+		self.assertFalse(Item.objects.filter(name="Soup").exists())
+
+	def test_api_reports_invalid_rows(self):
+		admin = User.objects.create_user(username="admin", role=Role.objects.create(name="admin", is_admin=True))
+		client = APIClient()
+		client.force_authenticate(admin)
+		csv_text = "category,name,price,available\nDrinks,Mocha,nan,\nDrinks,Tea,2.00,yes\n"
+		response = client.post("/api/menu/import/", {"file": SimpleUploadedFile("menu.csv", csv_text.encode())}, format="multipart")
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response.data["errors"], [{"row": 2, "error": "invalid price 'nan'"}])
+		self.assertEqual([row["name"] for row in response.data["created"]], ["Tea"])
+
+
+	def test_export_round_trips(self):
+		Item.objects.create(category=Category.objects.create(name="Food"), name='Soup, "hot"', price=Decimal("4"), type=Item.TYPE_FOOD, available=False)
+		for fmt in ("csv", "json", "jsonl"):
+			report = import_menu(io.StringIO("".join(export_menu(fmt))), fmt)
+			self.assertEqual((report["created"], report["updated"], report["unchanged"], report["errors"]), ([], [], 2, []), fmt)
+
+	def test_export_api(self):
+		admin = User.objects.create_user(username="admin", role=Role.objects.create(name="admin", is_admin=True))
+		client = APIClient()
+		client.force_authenticate(admin)
+		response = client.get("/api/menu/export/", {"fmt": "jsonl"})
+		self.assertEqual(response["Content-Disposition"], 'attachment; filename="menu.jsonl"')
+		rows = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+		self.assertEqual([(row["name"], row["price"]) for row in rows], [("Latte", "3.25")])
+		self.assertEqual(client.get("/api/menu/export/", {"fmt": "xml"}).status_code, 400)
+
+		waiter = User.objects.create_user(username="waiter", role=Role.objects.create(name="waiter"))
+		client.force_authenticate(waiter)
+		self.assertEqual(client.get("/api/menu/export/").status_code, 403)
+
+class MenuTestCase(TestCase):
+	def setUp(self):
+		# snapshots are process-wide; start every test from a fresh version
+		snapshots.bump()
+		self.drinks = Category.objects.create(name="Drinks")
+		self.food = Category.objects.create(name="Food")
+		self.latte = Item.objects.create(category=self.drinks, name="Latte", price=Decimal("3.25"), type=Item.TYPE_DRINK)
+		self.soup = Item.objects.create(category=self.food, name="Soup", price=Decimal("4.50"), type=Item.TYPE_FOOD)
+		self.stew = Item.objects.create(category=self.food, name="Stew", price=Decimal("9.00"), type=Item.TYPE_FOOD, available=False)
+		self.admin = User.objects.create_user(username="admin", role=Role.objects.create(name="admin", is_admin=True))
+		self.waiter = User.objects.create_user(username="waiter", role=Role.objects.create(name="waiter"))
+
+	def client_for(self, user):
+		client = APIClient()
+		client.force_authenticate(user)
+		return client
+
+
+class MenuSnapshotTests(MenuTestCase):
+	def test_listing_revalidates_with_etag(self):
+		client = self.client_for(self.waiter)
+		response = client.get("/api/menu/items/")
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual([row["name"] for row in json.loads(response.content)], ["Latte", "Soup"])
+		self.assertIn("Accept-Encoding", response["Vary"])
+
+		cached = client.get("/api/menu/items/", HTTP_IF_NONE_MATCH=response["ETag"])
+		self.assertEqual(cached.status_code, 304)
+		self.assertEqual(cached.content, b"")
+
+	def test_gzip_when_accepted(self):
+		client = self.client_for(self.waiter)
+		plain = client.get("/api/menu/categories/")
+		packed = client.get("/api/menu/categories/", HTTP_ACCEPT_ENCODING="gzip, deflate")
+		self.assertNotIn("Content-Encoding", plain)
+		self.assertEqual(packed["Content-Encoding"], "gzip")
+		self.assertEqual(gzip.decompress(packed.content), plain.content)
+		self.assertEqual(packed["ETag"], plain["ETag"])
+
+	def test_change_renders_a_new_snapshot(self):
+		client = self.client_for(self.waiter)
+		before = client.get("/api/menu/items/")
+		with self.captureOnCommitCallbacks(execute=True):
+			self.stew.available = True
+			self.stew.save()
+		after = client.get("/api/menu/items/", HTTP_IF_NONE_MATCH=before["ETag"])
+		self.assertEqual(after.status_code, 200)
+		self.assertNotEqual(after["ETag"], before["ETag"])
+		self.assertEqual([row["name"] for row in json.loads(after.content)], ["Latte", "Soup", "Stew"])
+
+	def test_admin_all_has_its_own_snapshot(self):
+		waiter_view = self.client_for(self.waiter).get("/api/menu/items/?all=1")
+		admin_view = self.client_for(self.admin).get("/api/menu/items/?all=1")
+		self.assertEqual(len(json.loads(waiter_view.content)), 2)
+		self.assertEqual(len(json.loads(admin_view.content)), 3)
+		self.assertNotEqual(waiter_view["ETag"], admin_view["ETag"])
+
+	def test_changes_from_other_processes_are_noticed(self):
+		client = self.client_for(self.waiter)
+		before = client.get("/api/menu/items/")
+		# a save in another process fires no signals here, only moves updated_at
+		Item.objects.filter(pk=self.soup.pk).update(name="Broth", updated_at=timezone.now())
+		with mock.patch.object(snapshots, "CHECK_SECONDS", 0):
+			after = client.get("/api/menu/items/")
+		self.assertNotEqual(after["ETag"], before["ETag"])
+		self.assertEqual([row["name"] for row in json.loads(after.content)], ["Broth", "Latte"])
+
+
+class ItemSearchTests(MenuTestCase):
+	def setUp(self):
+		super().setUp()
+		self.latte.description = "Espresso with steamed milk"
+		self.latte.save()
+		self.shake = Item.objects.create(category=self.drinks, name="Milk Shake", price=Decimal("4.00"), type=Item.TYPE_DRINK)
+		self.brulee = Item.objects.create(category=self.food, name="Crème brûlée", price=Decimal("5.00"), type=Item.TYPE_FOOD)
+
+	def search(self, query, user=None):
+		response = self.client_for(user or self.waiter).get("/api/menu/items/search/", {"q": query})
+		self.assertEqual(response.status_code, 200)
+		return [row["name"] for row in response.data]
+
+	def test_name_matches_rank_above_description_matches(self):
+		self.assertEqual(self.search("milk"), ["Milk Shake", "Latte"])
+
+	def test_every_word_matches_a_prefix(self):
+		self.assertEqual(self.search("espr mil"), ["Latte"])
+		self.assertEqual(self.search("espresso tomato"), [])
+		self.assertEqual(self.search("   "), [])
+
+	def test_accents_are_ignored(self):
+		self.assertEqual(tokenize("Crème brûlée"), ["creme", "brulee"])
+		self.assertEqual(self.search("creme"), ["Crème brûlée"])
+
+	def test_category_matches(self):
+		self.assertEqual(set(self.search("food")), {"Soup", "Crème brûlée"})
+		self.assertEqual(set(self.search("food", user=self.admin)), {"Soup", "Crème brûlée"})
+		response = self.client_for(self.admin).get("/api/menu/items/search/", {"q": "food", "all": "1"})
+		self.assertEqual({row["name"] for row in response.data}, {"Soup", "Stew", "Crème brûlée"})
+
+	def test_edits_are_searchable(self):
+		self.soup.name = "Goulash"
+		self.soup.save()
+		with self.captureOnCommitCallbacks(execute=True):
+			self.food.name = "Mains"
+			self.food.save()
+		self.assertEqual(self.search("goul"), ["Goulash"])
+		self.assertEqual(set(self.search("mains")), {"Goulash", "Crème brûlée"})
+		self.soup.delete()
+		self.assertEqual(self.search("goul"), [])
+
+	def test_limit(self):
+		client = self.client_for(self.waiter)
+		self.assertEqual(len(client.get("/api/menu/items/search/", {"q": "milk", "limit": "1"}).data), 1)
+		self.assertEqual(len(client.get("/api/menu/items/search/", {"q": "milk", "limit": "0"}).data), 1)
+		response = client.get("/api/menu/items/search/", {"q": "milk", "limit": "many"})
+		self.assertEqual(response.status_code, 400)
+
+	def test_trie_index_matches_the_database_index(self):
+		trie = TrieIndex()
+		for query in ("milk", "espr mil", "creme", "tomato"):
+			self.assertEqual(trie.search(query, 20), get_index().search(query, 20), query)
+		# equal scores are ordered by name
+		self.assertEqual(trie.search("food", 20, available_only=False), [self.brulee.pk, self.soup.pk, self.stew.pk])
+
+		self.soup.name = "Goulash"
+		trie.update_item(self.soup)
+		trie.set_available([self.stew.pk], True)
+		self.assertEqual(trie.search("goul", 20), [self.soup.pk])
+		self.assertEqual(trie.search("stew", 20), [self.stew.pk])
+		trie.remove_item(self.soup.pk)
+		self.assertEqual(trie.search("goul", 20), [])
+
+
+class MenuCatalogTests(MenuTestCase):
+	def test_lookups_skip_the_database_once_loaded(self):
+		catalog.get(self.latte.pk)
+		with self.assertNumQueries(0):
+			found = catalog.get_many([self.latte.pk, self.stew.pk])
+		self.assertEqual(found[self.latte.pk].price, Decimal("3.25"))
+		self.assertFalse(found[self.stew.pk].available)
+
+	def test_unknown_ids_are_looked_up_together(self):
+		catalog.get(self.latte.pk)
+		# a row written by another process: no signal reaches this catalog
+		other = Item.objects.bulk_create([Item(category=self.drinks, name="Mocha", price=Decimal("3.75"), type=Item.TYPE_DRINK)])[0]
+		with self.assertNumQueries(1):
+			found = catalog.get_many([self.latte.pk, other.pk, 10**9])
+		self.assertEqual(set(found), {self.latte.pk, other.pk})
+		with self.assertNumQueries(0):
+			self.assertEqual(catalog.get(other.pk).name, "Mocha")
+
+	def test_saves_and_deletes_are_applied_on_commit(self):
+		catalog.get(self.latte.pk)
+		with self.captureOnCommitCallbacks(execute=True):
+			self.latte.price = "3.50"
+			self.latte.save()
+		with self.captureOnCommitCallbacks(execute=True):
+			self.drinks.name = "Coffee"
+			self.drinks.save()
+		soup_id = self.soup.pk
+		with self.captureOnCommitCallbacks(execute=True):
+			self.soup.delete()
+
+		with self.assertNumQueries(1):
+			# the deleted id is looked up once more and not found
+			found = catalog.get_many([self.latte.pk, soup_id])
+		self.assertEqual(list(found), [self.latte.pk])
+		self.assertEqual(found[self.latte.pk].price, Decimal("3.50"))
+		self.assertEqual(found[self.latte.pk].category_name, "Coffee")
+
+	def test_to_instance(self):
+		item = catalog.get(self.latte.pk).to_instance()
+		self.assertEqual((item.pk, item.name, item.price, item.category.name), (self.latte.pk, "Latte", Decimal("3.25"), "Drinks"))
+		self.assertEqual(item.category_id, self.drinks.pk)
+
+
+class ItemAvailabilityTests(MenuTestCase):
+	def setUp(self):
+		super().setUp()
+		call_command("seed_permissions_roles", stdout=io.StringIO())
+		role_permissions.invalidate()
+		self.chef = User.objects.create_user(username="chef", role=Role.objects.get(name="chef"))
+		salmon = Ingredient.objects.create(name="Salmon")
+		self.sushi = Item.objects.create(category=self.food, name="Sushi", price=Decimal("12.00"), type=Item.TYPE_FOOD)
+		self.poke = Item.objects.create(category=self.food, name="Poke", price=Decimal("11.00"), type=Item.TYPE_FOOD)
+		salmon.items.add(self.sushi, self.poke)
+
+	def tearDown(self):
+		role_permissions.invalidate()
+
+	def post(self, body, user=None):
+		return self.client_for(user or self.chef).post("/api/menu/items/availability/", body, format="json")
+
+	def test_requires_the_permission_code(self):
+		response = self.post({"available": False, "item_ids": [self.latte.pk]}, user=self.waiter)
+		self.assertEqual(response.status_code, 403)
+		self.assertEqual(response.data["detail"], "You do not have permission to change item availability.")
+		self.assertTrue(Item.objects.get(pk=self.latte.pk).available)
+
+	def test_by_ingredient(self):
+		with self.captureOnCommitCallbacks(execute=True):
+			response = self.post({"available": False, "ingredient": " salmon "})
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response.data, {"available": False, "updated": [self.sushi.pk, self.poke.pk]})
+		listing = self.client_for(self.waiter).get("/api/menu/items/")
+		self.assertEqual([row["name"] for row in json.loads(listing.content)], ["Latte", "Soup"])
+		search = self.client_for(self.waiter).get("/api/menu/items/search/", {"q": "sushi"})
+		self.assertEqual(search.data, [])
+
+	def test_filters_are_combined_and_unchanged_items_skipped(self):
+		response = self.post({"available": True, "item_ids": [self.latte.pk], "category_ids": [self.food.pk]})
+		self.assertEqual(response.data["updated"], [self.stew.pk])
+		self.assertTrue(Item.objects.get(pk=self.stew.pk).available)
+
+		response = self.post({"available": False, "item_ids": [self.latte.pk], "ingredient": "salmon"})
+		self.assertEqual(response.data["updated"], [self.latte.pk, self.sushi.pk, self.poke.pk])
+
+	def test_a_filter_is_required(self):
+		response = self.post({"available": False, "item_ids": [], "ingredient": "  "})
+		self.assertEqual(response.status_code, 400)
+		self.assertEqual(response.data["non_field_errors"], ["Provide item_ids, category_ids or ingredient."])
@@ -0,0 +1,271 @@
+"""Bulk menu import and export.
+
+Rows are (category, name, description, price, available, type) and are keyed by
+(category, name), like ``Item``'s unique_together. Imports read the input as a
+stream and upsert it ``CHUNK_SIZE`` rows at a time with bulk_create and one
+parameterized UPDATE run with executemany, all in one transaction; exports
+stream the table with ``.iterator()``. Bulk writes skip the model signals, so the
+menu snapshots and the search index are refreshed once at the end of an import.
+"""
+import csv
+import json
+import os
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Category, Item
+from .search import reindex
+from .snapshots import snapshots
+
+
+FIELDS = ("category", "name", "description", "price", "available", "type")
+FORMATS = ("csv", "json", "jsonl")
+# rows upserted per round of queries / exported per streamed piece
+CHUNK_SIZE = 500
+# fields compared and written for items that already exist
+UPDATE_FIELDS = ("description", "price", "available", "type")
+TRUE_VALUES = ("1", "true", "yes", "y")
+FALSE_VALUES = ("0", "false", "no", "n")
+MAX_PRICE = Decimal("999999.99")
+
+
+class MenuImportError(ValueError):
+	"""The input cannot be read at all (as opposed to individual invalid rows)."""
+
+
+def guess_format(filename, default="csv"):
+	"""Format named by the extension of ``filename`` (csv, json or jsonl), else ``default``."""
+	extension = os.path.splitext(filename or "")[1].lstrip(".").lower()
+	return extension if extension in FORMATS else default
+
+
+def read_rows(stream, fmt):
+	"""Yield (row number, raw dict) from a text stream in ``fmt``."""
+	if fmt == "csv":
+		reader = csv.DictReader(stream)
+		missing = {"category", "name", "price"} - set(reader.fieldnames or ())
+		if missing:
+			raise MenuImportError(f"CSV header is missing: {', '.join(sorted(missing))}.")
+		for row in reader:
+			yield reader.line_num, row
+	elif fmt == "jsonl":
+		for number, line in enumerate(stream, 1):
+			if not line.strip():
+				continue
+			try:
+				yield number, json.loads(line)
+			except json.JSONDecodeError as e:
+				raise MenuImportError(f"Line {number} is not valid JSON: {e}.") from e
+	elif fmt == "json":
+		try:
+			data = json.load(stream)
+		except json.JSONDecodeError as e:
+			raise MenuImportError(f"Invalid JSON: {e}.") from e
+		if not isinstance(data, list):
+			raise MenuImportError("JSON input must be a list of items.")
+		yield from enumerate(data, 1)
+	else:
+		raise MenuImportError(f"Unknown format {fmt!r}; use one of {', '.join(FORMATS)}.")
+
+
+def _clean(raw):
+	if not isinstance(raw, dict):
+		raise ValueError("row must be an object")
+	category = str(raw.get("category") or "").strip()
+	name = str(raw.get("name") or "").strip()
+	if not category or not name:
+		raise ValueError("category and name are required")
+	if len(category) > 200 or len(name) > 200:
+		raise ValueError("category and name are limited to 200 characters")
+	try:
+		price = Decimal(str(raw.get("price")))
+		# NaN and infinities parse but cannot be compared or stored
+		if not price.is_finite():
+			raise ValueError
+		price = price.quantize(Decimal("0.01"))
+	except (InvalidOperation, ValueError):
+		raise ValueError(f"invalid price {raw.get('price')!r}") from None
+	if price < 0 or price > MAX_PRICE:
+		raise ValueError(f"price out of range: {price}")
+	available = raw.get("available", True)
+	if isinstance(available, str):
+		value = available.strip().lower()
+		if value in TRUE_VALUES or value == "":
+			available = True
+		elif value in FALSE_VALUES:
+			available = False
+		else:
+			raise ValueError(f"invalid available {available!r}")
+	elif not isinstance(available, bool):
+		raise ValueError(f"invalid available {available!r}")
+	item_type = str(raw.get("type") or Item.TYPE_FOOD).strip().lower()
+	if item_type not in dict(Item.TYPE_CHOICES):
+		raise ValueError(f"invalid type {item_type!r}")
+	return {
+		"category": category,
+		"name": name,
+		"description": str(raw.get("description") or ""),
+		"price": price,
+		"available": available,
+		"type": item_type,
+	}
+
+
+def _upsert(chunk, category_ids, seen, report):
+	new_categories = {category for category, _name in chunk if category not in category_ids}
+	if new_categories:
+		Category.objects.bulk_create([Category(name=name) for name in sorted(new_categories)])
+		category_ids.update(Category.objects.filter(name__in=new_categories).values_list("name", "id"))
+
+	rows = {(category_ids[category], name): row for (category, name), row in chunk.items()}
+	existing = {
+		(item.category_id, item.name): item
+		for item in Item.objects.filter(
+			category_id__in={key[0] for key in rows}, name__in={key[1] for key in rows}
+		).only("id", "category_id", "name", *UPDATE_FIELDS)
+	}
+
+	now = timezone.now()
+	to_create = []
+	to_update = []
+	for key, row in rows.items():
+		seen.add(key)
+		label = {"category": row["category"], "name": row["name"]}
+		item = existing.get(key)
+		if item is None:
+			to_create.append(Item(category_id=key[0], name=row["name"], **{field: row[field] for field in UPDATE_FIELDS}))
+			report["created"].append(label)
+			continue
+		changed = [field for field in UPDATE_FIELDS if getattr(item, field) != row[field]]
+		if not changed:
+			report["unchanged"] += 1
+			continue
+		for field in changed:
+			setattr(item, field, row[field])
+		# bulk_update does not apply auto_now
+		item.updated_at = now
+		to_update.append(item)
+		report["updated"].append({**label, "fields": changed})
+
+	Item.objects.bulk_create(to_create, batch_size=CHUNK_SIZE)
+	_update_items(to_update)
+
+
+def _update_items(items):
+	"""Write UPDATE_FIELDS and updated_at of ``items`` with one UPDATE statement run per row.
+
+	bulk_update builds a CASE expression per field and row, which costs seconds of
+	Python per few thousand rows; executemany reuses one prepared statement.
+	"""
+	if not items:
+		return
+	fields = [Item._meta.get_field(name) for name in (*UPDATE_FIELDS, "updated_at")]
+	quote = connection.ops.quote_name
+	sql = "UPDATE {} SET {} WHERE {} = %s".format(
+		quote(Item._meta.db_table),
+		", ".join(f"{quote(field.column)} = %s" for field in fields),
+		quote(Item._meta.pk.column),
+	)
+	params = [
+		[field.get_db_prep_save(getattr(item, field.attname), connection) for field in fields] + [item.pk]
+		for item in items
+	]
+	with connection.cursor() as cursor:
+		cursor.executemany(sql, params)
+
+
+def import_menu(stream, fmt, dry_run=False):
+	"""Upsert the items read from ``stream`` and return the diff report.
+
+	The report lists the created and updated items (with the changed fields), the
+	number of unchanged rows, existing items absent from the input ("missing", left
+	untouched) and the rows that were skipped as invalid. With ``dry_run`` the
+	changes are rolled back and only the report is returned.
+	"""
+	report = {"created": [], "updated": [], "unchanged": 0, "missing": [], "errors": []}
+	seen = set()
+	with transaction.atomic():
+		category_ids = dict(Category.objects.values_list("name", "id"))
+		chunk = {}
+		for number, raw in read_rows(stream, fmt):
+			try:
+				row = _clean(raw)
+			except ValueError as e:
+				report["errors"].append({"row": number, "error": str(e)})
+				continue
+			# a later row for the same item wins
+			chunk[(row["category"], row["name"])] = row
+			if len(chunk) >= CHUNK_SIZE:
+				_upsert(chunk, category_ids, seen, report)
+				chunk = {}
+		if chunk:
+			_upsert(chunk, category_ids, seen, report)
+
+		rows = Item.objects.order_by("category__name", "name").values_list("category_id", "category__name", "name")
+		for category_id, category, name in rows.iterator(chunk_size=CHUNK_SIZE * 4):
+			if (category_id, name) not in seen:
+				report["missing"].append({"category": category, "name": name})
+
+		if dry_run:
+			transaction.set_rollback(True)
+		elif report["created"] or report["updated"]:
+			reindex()
+			transaction.on_commit(snapshots.bump)
+	return report
+
+
+class _Echo:
+	"""File-like object whose write() hands the line back, for streaming csv.writer output."""
+
+	def write(self, value):
+		return value
+
+
+def _export_rows():
+	rows = Item.objects.order_by("category__name", "name").values_list(
+		"category__name", "name", "description", "price", "available", "type"
+	)
+	return rows.iterator(chunk_size=CHUNK_SIZE * 4)
+
+
+def _as_dict(row):
+	category, name, description, price, available, item_type = row
+	return {
+		"category": category,
+		"name": name,
+		"description": description,
+		"price": str(price),
+		"available": available,
+		"type": item_type,
+	}
+
+
+def export_menu(fmt):
+	"""Yield the whole menu serialized as ``fmt``, a few hundred rows per piece."""
+	if fmt not in FORMATS:
+		raise ValueError(f"Unknown format {fmt!r}; use one of {', '.join(FORMATS)}.")
+	writer = csv.writer(_Echo())
+	pieces = []
+	if fmt == "csv":
+		pieces.append(writer.writerow(FIELDS))
+	elif fmt == "json":
+		pieces.append("[")
+	first = True
+	for row in _export_rows():
+		if fmt == "csv":
+			category, name, description, price, available, item_type = row
+			pieces.append(writer.writerow((category, name, description, price, "true" if available else "false", item_type)))
+		elif fmt == "jsonl":
+			pieces.append(json.dumps(_as_dict(row)) + "\n")
+		else:
+			pieces.append(("\n" if first else ",\n") + json.dumps(_as_dict(row)))
+		first = False
+		if len(pieces) >= CHUNK_SIZE:
+			yield "".join(pieces)
+			pieces = []
+	if fmt == "json":
+		pieces.append("\n]\n")
+	if pieces:
+		yield "".join(pieces)
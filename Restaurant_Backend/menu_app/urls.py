@@ -5,5 +5,9 @@ urlpatterns = [
     path("categories/", views.CategoryListCreateAPIView.as_view(), name="menu-categories"),
     path("categories/<int:pk>/", views.CategoryRetrieveUpdateDestroyAPIView.as_view(), name="menu-category-detail"),
     path("items/", views.ItemListCreateAPIView.as_view(), name="menu-items"),
+    path("export/", views.MenuExportAPIView.as_view(), name="menu-export"),
+    path("import/", views.MenuImportAPIView.as_view(), name="menu-import"),
+    path("items/availability/", views.ItemAvailabilityAPIView.as_view(), name="menu-item-availability"),
+    path("items/search/", views.ItemSearchAPIView.as_view(), name="menu-item-search"),
     path("items/<int:pk>/", views.ItemRetrieveUpdateDestroyAPIView.as_view(), name="menu-item-detail"),
 ]
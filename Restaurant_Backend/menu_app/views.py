@@ -1,11 +1,29 @@
+import io
+
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.db import transaction
+from django.db.models import Q
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 
-from accounts_app.permissions import IsAdminRole
+from accounts_app.permissions import HasPermissionCode, IsAdminRole
 from .models import Category, Item
-from .serializers import CategorySerializer, ItemSerializer
+from .search import index_availability, search_items
+from .serializers import CategorySerializer, ItemAvailabilitySerializer, ItemSerializer
+from .snapshots import snapshot_response, snapshots
+from .transfer import FORMATS, MenuImportError, export_menu, guess_format, import_menu
+
+
+def _show_all(request):
+	# admin can pass ?all=1 to see everything
+	user = request.user
+	if request.query_params.get("all") in ("1", "true", "True"):
+		# only allow admins to view all
+		return bool(getattr(user, "is_superuser", False) or getattr(getattr(user, 'role', None), 'is_admin', False))
+	return False
 
 
 class CategoryListCreateAPIView(generics.ListCreateAPIView):
@@ -13,6 +31,10 @@ class CategoryListCreateAPIView(generics.ListCreateAPIView):
 	serializer_class = CategorySerializer
 	permission_classes = (IsAuthenticated,)
 
+	def list(self, request, *args, **kwargs):
+		snapshot = snapshots.get("categories", lambda: self.get_serializer(self.get_queryset(), many=True).data)
+		return snapshot_response(request, snapshot)
+
 	def get_permissions(self):
 		if self.request.method == "POST":
 			return [IsAuthenticated(), IsAdminRole()]
@@ -24,17 +46,22 @@ class ItemListCreateAPIView(generics.ListCreateAPIView):
 	serializer_class = ItemSerializer
 	permission_classes = (IsAuthenticated,)
 
+	def _show_all(self):
+		return _show_all(self.request)
+
 	def get_queryset(self):
-		# By default return available items; admin can pass ?all=1 to see everything
-		user = self.request.user
+		# By default return available items
 		qs = Item.objects.all().select_related("category").order_by("name")
-		if self.request.query_params.get("all") in ("1", "true", "True"):
-			# only allow admins to view all
-			if getattr(user, "is_superuser", False) or getattr(getattr(user, 'role', None), 'is_admin', False):
-				return qs
-			# fallthrough to available only
+		if self._show_all():
+			return qs
 		return qs.filter(available=True)
 
+	def list(self, request, *args, **kwargs):
+		# admins asking for ?all=1 get their own snapshot including unavailable items
+		name = "items-all" if self._show_all() else "items"
+		snapshot = snapshots.get(name, lambda: self.get_serializer(self.get_queryset(), many=True).data)
+		return snapshot_response(request, snapshot)
+
 	def get_permissions(self):
 		# POST requires admin
 		if self.request.method == "POST":
@@ -42,6 +69,69 @@ class ItemListCreateAPIView(generics.ListCreateAPIView):
 		return [IsAuthenticated()]
 
 
+class ItemSearchAPIView(generics.GenericAPIView):
+	"""GET ?q=<words>[&limit=N] — items matching every word in name, description or category, best first.
+
+	Like the listing, unavailable items are only included for admins passing ?all=1.
+	"""
+
+	serializer_class = ItemSerializer
+	permission_classes = (IsAuthenticated,)
+	DEFAULT_LIMIT = 20
+	MAX_LIMIT = 100
+
+	def get(self, request):
+		query = request.query_params.get("q", "").strip()
+		try:
+			limit = int(request.query_params.get("limit", self.DEFAULT_LIMIT))
+		except ValueError:
+			return Response({"detail": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+		limit = max(1, min(limit, self.MAX_LIMIT))
+
+		ids = search_items(query, limit, available_only=not _show_all(request))
+		items = Item.objects.select_related("category").in_bulk(ids)
+		ranked = [items[item_id] for item_id in ids if item_id in items]
+		return Response(self.get_serializer(ranked, many=True).data, status=status.HTTP_200_OK)
+
+
+class ItemAvailabilityAPIView(generics.GenericAPIView):
+	"""POST {"available": false, "item_ids": [...], "category_ids": [...], "ingredient": "salmon"}
+
+	Marks every item matched by any of the filters available / unavailable with a
+	single UPDATE (the kitchen's "86 list") and returns the ids that changed.
+	"""
+
+	serializer_class = ItemAvailabilitySerializer
+	permission_classes = (IsAuthenticated, HasPermissionCode)
+	required_permission = "menu_items_availability"
+	permission_denied_message = "You do not have permission to change item availability."
+
+	def post(self, request):
+		serializer = self.get_serializer(data=request.data)
+		serializer.is_valid(raise_exception=True)
+		data = serializer.validated_data
+		available = data["available"]
+
+		selection = Q()
+		if data["item_ids"]:
+			selection |= Q(id__in=data["item_ids"])
+		if data["category_ids"]:
+			selection |= Q(category_id__in=data["category_ids"])
+		if data["ingredient"].strip():
+			selection |= Q(ingredients__name__iexact=data["ingredient"].strip())
+
+		with transaction.atomic():
+			ids = list(
+				Item.objects.filter(selection).exclude(available=available).order_by("id").values_list("id", flat=True).distinct()
+			)
+			if ids:
+				Item.objects.filter(id__in=ids).update(available=available, updated_at=timezone.now())
+				# bulk UPDATE skips the Item signals: refresh the caches once
+				index_availability(ids, available)
+				transaction.on_commit(snapshots.bump)
+		return Response({"available": available, "updated": ids}, status=status.HTTP_200_OK)
+
+
 class ItemRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
 	queryset = Item.objects.all()
 	serializer_class = ItemSerializer
@@ -65,3 +155,40 @@ class CategoryRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView
 			return [IsAuthenticated(), IsAdminRole()]
 		return [IsAuthenticated()]
 
+
+
+EXPORT_CONTENT_TYPES = {"csv": "text/csv", "json": "application/json", "jsonl": "application/x-ndjson"}
+
+
+class MenuExportAPIView(generics.GenericAPIView):
+	"""GET ?fmt=csv|json|jsonl — stream every item as a file import accepts (admin only)."""
+
+	permission_classes = (IsAuthenticated, IsAdminRole)
+
+	def get(self, request):
+		fmt = request.query_params.get("fmt", "csv")
+		if fmt not in FORMATS:
+			return Response({"detail": f"fmt must be one of {', '.join(FORMATS)}."}, status=status.HTTP_400_BAD_REQUEST)
+		response = StreamingHttpResponse(export_menu(fmt), content_type=EXPORT_CONTENT_TYPES[fmt])
+		response["Content-Disposition"] = f'attachment; filename="menu.{fmt}"'
+		return response
+
+
+class MenuImportAPIView(generics.GenericAPIView):
+	"""POST multipart ``file`` [?fmt=csv|json|jsonl&dry_run=1] — upsert items, return the diff report (admin only)."""
+
+	permission_classes = (IsAuthenticated, IsAdminRole)
+
+	def post(self, request):
+		upload = request.FILES.get("file")
+		if upload is None:
+			return Response({"detail": "file is required."}, status=status.HTTP_400_BAD_REQUEST)
+		fmt = request.query_params.get("fmt") or guess_format(upload.name)
+		dry_run = request.query_params.get("dry_run") in ("1", "true", "True")
+		stream = io.TextIOWrapper(upload.open("rb"), encoding="utf-8-sig", newline="")
+		try:
+			report = import_menu(stream, fmt, dry_run=dry_run)
+		except (MenuImportError, UnicodeDecodeError) as e:
+			return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+		report["dry_run"] = dry_run
+		return Response(report, status=status.HTTP_200_OK)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Order, OrderItem
+from .models import Order, OrderItem, OrderItemChange, OrderItemDeletion, OrderItemTransition, OrderItemTransitionRollup, Station, StationCounter
 
 
 @admin.register(Order)
@@ -10,6 +10,43 @@ class OrderAdmin(admin.ModelAdmin):
 
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
-	list_display = ("id", "order", "item", "quantity", "status", "created_at")
-	list_filter = ("status",)
+	list_display = ("id", "order", "item", "quantity", "station", "status", "created_at", "updated_at")
+	list_filter = ("station", "status")
 	search_fields = ("item__name",)
+
+
+@admin.register(OrderItemDeletion)
+class OrderItemDeletionAdmin(admin.ModelAdmin):
+	list_display = ("id", "order_item_id", "station", "session_id", "table_number", "deleted_at")
+	list_filter = ("station",)
+
+
+@admin.register(OrderItemChange)
+class OrderItemChangeAdmin(admin.ModelAdmin):
+	list_display = ("id", "order_item_id", "station", "kind", "changed_at")
+	list_filter = ("station", "kind")
+
+
+@admin.register(OrderItemTransition)
+class OrderItemTransitionAdmin(admin.ModelAdmin):
+	list_display = ("id", "order_item_id", "station", "from_status", "to_status", "changed_at", "duration")
+	list_filter = ("station", "from_status")
+
+
+@admin.register(Station)
+class StationAdmin(admin.ModelAdmin):
+	list_display = ("id", "code", "name", "item_type")
+	search_fields = ("code", "name")
+	filter_horizontal = ("categories", "items", "roles")
+
+
+@admin.register(StationCounter)
+class StationCounterAdmin(admin.ModelAdmin):
+	list_display = ("id", "station", "status", "count")
+	list_filter = ("station",)
+
+
+@admin.register(OrderItemTransitionRollup)
+class OrderItemTransitionRollupAdmin(admin.ModelAdmin):
+	list_display = ("id", "day", "kind")
+	list_filter = ("kind",)
@@ -0,0 +1,73 @@
+"""The OrderItemChange log behind the station ``?since=`` delta sync and the SSE
+change poller.
+
+Writers call ``record_changes`` inside the transaction that writes the
+OrderItems, so a change and its log row commit together. Readers take
+``current_cursor()`` first and then read the log up to it by id.
+"""
+import threading
+import time
+
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .models import OrderItemChange
+
+
+# Seconds between two prunes of expired log rows in one process
+PRUNE_INTERVAL = 60
+
+_prune_lock = threading.Lock()
+_pruned_at = 0.0
+
+
+def record_changes(kind, order_items):
+	"""Log ``kind`` for each (order_item_id, station) pair."""
+	OrderItemChange.objects.bulk_create(
+		[OrderItemChange(order_item_id=order_item_id, station=station, kind=kind) for order_item_id, station in order_items]
+	)
+	_prune()
+
+
+def _prune():
+	global _pruned_at
+	now = time.monotonic()
+	with _prune_lock:
+		if now - _pruned_at < PRUNE_INTERVAL:
+			return
+		_pruned_at = now
+	newest = current_cursor()
+	# the newest row stays so cursor_expired() can tell an old cursor from a quiet log
+	OrderItemChange.objects.filter(changed_at__lt=timezone.now() - OrderItemChange.RETENTION, id__lt=newest).delete()
+
+
+def current_cursor():
+	"""Id of the newest logged change, 0 while the log is empty."""
+	return OrderItemChange.objects.aggregate(m=Max("id"))["m"] or 0
+
+
+def cursor_expired(since):
+	"""True when changes after ``since`` may already have been pruned."""
+	oldest = OrderItemChange.objects.aggregate(m=Min("id"))["m"]
+	return oldest is not None and since < oldest - 1
+
+
+def changes_since(since, cursor, stations=None):
+	"""Return ({order_item_id: kinds}, deleted ids) for the changes in (since, cursor].
+
+	``kinds`` is the set of kinds logged for a row that still existed at its last
+	change; rows deleted in the range are only listed as deleted.
+	"""
+	qs = OrderItemChange.objects.filter(id__gt=since, id__lte=cursor)
+	if stations is not None:
+		qs = qs.filter(station__in=stations)
+	changed = {}
+	deleted = set()
+	for order_item_id, kind in qs.values_list("order_item_id", "kind"):
+		if kind == OrderItemChange.KIND_DELETED:
+			deleted.add(order_item_id)
+		else:
+			changed.setdefault(order_item_id, set()).add(kind)
+	for order_item_id in deleted:
+		changed.pop(order_item_id, None)
+	return changed, deleted
@@ -0,0 +1,107 @@
+"""Maintenance of the StationCounter table behind the station dashboards and of
+the running subtotal / item count of each TableSession.
+
+Callers pass deltas keyed by (station, status) or session id and must already be
+inside the transaction that writes the OrderItems, so counts and rows commit
+together.
+"""
+from collections import Counter
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Sum
+
+from tables_app.models import TableSession
+from .models import OrderItem, StationCounter
+
+
+def adjust_counters(deltas):
+	"""Apply {(station, status): delta} to the counters with F() updates."""
+	for (station, status), delta in deltas.items():
+		if not delta:
+			continue
+		updated = StationCounter.objects.filter(station=station, status=status).update(count=F("count") + delta)
+		if not updated:
+			StationCounter.objects.get_or_create(station=station, status=status)
+			StationCounter.objects.filter(station=station, status=status).update(count=F("count") + delta)
+
+
+def count_created(order_items):
+	"""Deltas for newly inserted OrderItems."""
+	return Counter((oi.station, oi.status) for oi in order_items)
+
+
+def count_status_change(rows, new_status):
+	"""Deltas for moving ``rows`` of (station, old_status) to ``new_status``."""
+	deltas = Counter()
+	for station, old_status in rows:
+		if old_status == new_status:
+			continue
+		deltas[(station, old_status)] -= 1
+		deltas[(station, new_status)] += 1
+	return deltas
+
+
+def station_counts(station):
+	"""Return {status: count} for a station from the counters table."""
+	return dict(StationCounter.objects.filter(station=station).values_list("status", "count"))
+
+
+def rebuild_counters():
+	"""Recompute every counter from the OrderItem table."""
+	with transaction.atomic():
+		rows = OrderItem.objects.order_by().values("station", "status").annotate(c=Count("id"))
+		StationCounter.objects.all().delete()
+		StationCounter.objects.bulk_create(
+			StationCounter(station=row["station"], status=row["status"], count=row["c"]) for row in rows
+		)
+
+
+def adjust_session_totals(deltas):
+	"""Apply {session_id: (amount, quantity)} to TableSession.subtotal / item_count with F() updates."""
+	for session_id, (amount, quantity) in deltas.items():
+		if not amount and not quantity:
+			continue
+		TableSession.objects.filter(pk=session_id).update(
+			subtotal=F("subtotal") + amount, item_count=F("item_count") + quantity
+		)
+
+
+def session_totals_created(session_id, order_items):
+	"""Deltas for OrderItems newly inserted into one session."""
+	amount = sum((oi.price_snapshot * oi.quantity for oi in order_items), Decimal("0"))
+	return {session_id: (amount, sum(oi.quantity for oi in order_items))}
+
+
+def _item_totals():
+	return (
+		OrderItem.objects.order_by()
+		.values("order__session_id")
+		.annotate(
+			subtotal=Sum(F("price_snapshot") * F("quantity"), output_field=DecimalField(max_digits=12, decimal_places=2)),
+			item_count=Sum("quantity"),
+		)
+	)
+
+
+def reconcile_session_totals(repair=True):
+	"""Compare every session's running totals with its order items.
+
+	Returns [(session_id, (stored subtotal, stored count), (actual subtotal, actual count))]
+	for the sessions that differ and, with ``repair``, overwrites them with the actual values.
+	"""
+	with transaction.atomic():
+		actual = {
+			row["order__session_id"]: (row["subtotal"].quantize(Decimal("0.01")), row["item_count"])
+			for row in _item_totals()
+		}
+		mismatches = []
+		stored = TableSession.objects.order_by("id").values_list("id", "subtotal", "item_count")
+		for session_id, subtotal, item_count in stored.iterator():
+			expected = actual.get(session_id, (Decimal("0.00"), 0))
+			if (subtotal, item_count) != expected:
+				mismatches.append((session_id, (subtotal, item_count), expected))
+		if repair:
+			for session_id, _stored, (subtotal, item_count) in mismatches:
+				TableSession.objects.filter(pk=session_id).update(subtotal=subtotal, item_count=item_count)
+	return mismatches
@@ -0,0 +1,169 @@
+"""Process-local estimate of when each pending OrderItem will be ready.
+
+The estimator keeps the waiting / in progress items of every station and the
+average in-progress duration per menu item (from the transition log). Each
+station's queue is simulated with ``Station.capacity`` parallel slots: items in
+progress finish after their item's prep time, waiting items start, in order,
+when a slot frees up. ETAs are recomputed for one station whenever one of its
+items changes (fed by the same on-commit hook as the SSE events), so reading an
+ETA is a dict lookup. Each recompute also stores a digest of the station's ETAs,
+which the ETag of the station list includes. Writes made by other processes are picked up by the
+stream poller while a stream is open, and otherwise by the periodic reload.
+"""
+import hashlib
+import heapq
+import threading
+import time
+from datetime import timedelta
+
+from django.db.models import Avg
+from django.utils import timezone
+
+from .models import OrderItem, OrderItemTransition
+from .stations import router as station_router
+
+
+PENDING_STATUSES = (OrderItem.STATUS_WAITING, OrderItem.STATUS_IN_PROGRESS)
+
+
+class EtaEstimator:
+	# queues are reloaded from the database this often
+	RELOAD_SECONDS = 60
+	# average prep times are re-aggregated from the transition log this often
+	PREP_RELOAD_SECONDS = 600
+	HISTORY = timedelta(days=30)
+	# used for items that were never seen in progress at a station without history
+	DEFAULT_PREP_SECONDS = 600.0
+	# weight of the newest observed prep time in the running average
+	SMOOTHING = 0.2
+
+	def __init__(self):
+		self._lock = threading.Lock()
+		# {station: {order_item_id: (item_id, status, created_at, status_changed_at)}}
+		self._pending = None
+		self._eta = {}
+		# {station: digest of its current ETAs}
+		self._digests = {}
+		self._prep_by_item = {}
+		self._prep_by_station = {}
+		self._loaded_at = 0.0
+		self._prep_loaded_at = 0.0
+
+	def eta(self, order_item_id):
+		"""Estimated ready time of a pending OrderItem, None for unknown or finished items."""
+		self._ensure_fresh()
+		return self._eta.get(order_item_id)
+
+	def station_version(self, station):
+		"""Digest of the station's current ETAs; changes whenever one of them does."""
+		self._ensure_fresh()
+		return self._digests.get(station, "")
+
+	def invalidate(self):
+		with self._lock:
+			self._pending = None
+			self._prep_loaded_at = 0.0
+
+	def _ensure_fresh(self):
+		now = time.monotonic()
+		if now - self._prep_loaded_at >= self.PREP_RELOAD_SECONDS:
+			self._load_prep()
+		if self._pending is None or now - self._loaded_at >= self.RELOAD_SECONDS:
+			self._load_pending()
+
+	def _load_prep(self):
+		since = timezone.now() - self.HISTORY
+		history = OrderItemTransition.objects.filter(
+			from_status=OrderItem.STATUS_IN_PROGRESS, changed_at__gte=since
+		).order_by()
+		by_item = dict(history.values("item_id").annotate(avg=Avg("duration")).values_list("item_id", "avg"))
+		by_station = dict(history.values("station").annotate(avg=Avg("duration")).values_list("station", "avg"))
+		with self._lock:
+			self._prep_by_item = by_item
+			self._prep_by_station = by_station
+			self._prep_loaded_at = time.monotonic()
+
+	def _load_pending(self):
+		pending = {}
+		rows = OrderItem.objects.filter(status__in=PENDING_STATUSES).values_list(
+			"id", "station", "item_id", "status", "created_at", "status_changed_at"
+		)
+		for order_item_id, station, item_id, status, created_at, status_changed_at in rows:
+			pending.setdefault(station, {})[order_item_id] = (item_id, status, created_at, status_changed_at)
+		with self._lock:
+			self._pending = pending
+			self._loaded_at = time.monotonic()
+			self._eta = {}
+			self._digests = {}
+			for station in pending:
+				self._refresh_station(station)
+
+	def apply(self, rows):
+		"""Fold created/updated compact OrderItem rows into the queues."""
+		self._update(rows, deleted=False)
+
+	def remove(self, rows):
+		"""Drop deleted OrderItems (rows carry ``id`` and ``station``)."""
+		self._update(rows, deleted=True)
+
+	def _update(self, rows, deleted):
+		with self._lock:
+			if self._pending is None:
+				return
+			dirty = set()
+			for row in rows:
+				station = row.get("station", "")
+				queue = self._pending.setdefault(station, {})
+				previous = queue.pop(row["id"], None)
+				self._eta.pop(row["id"], None)
+				dirty.add(station)
+				if deleted:
+					continue
+				if previous and previous[1] == OrderItem.STATUS_IN_PROGRESS and row["status"] not in PENDING_STATUSES:
+					self._observe(row["item"], (row["status_changed_at"] - previous[3]).total_seconds())
+				if row["status"] in PENDING_STATUSES:
+					queue[row["id"]] = (row["item"], row["status"], row["created_at"], row["status_changed_at"])
+			for station in dirty:
+				self._refresh_station(station)
+
+	def _refresh_station(self, station):
+		etas = self._station_etas(station)
+		self._eta.update(etas)
+		# a content digest rather than a counter, so every process agrees on it
+		self._digests[station] = hashlib.sha1(repr(sorted(etas.items())).encode("utf-8")).hexdigest()
+
+	def _observe(self, item_id, seconds):
+		average = self._prep_by_item.get(item_id)
+		self._prep_by_item[item_id] = seconds if average is None else average + self.SMOOTHING * (seconds - average)
+
+	def _prep_seconds(self, item_id, station):
+		prep = self._prep_by_item.get(item_id)
+		if prep is None:
+			prep = self._prep_by_station.get(station, self.DEFAULT_PREP_SECONDS)
+		return timedelta(seconds=prep)
+
+	def _station_etas(self, station):
+		queue = self._pending.get(station) or {}
+		info = station_router.get(station)
+		capacity = max(1, info.capacity if info else 1)
+		now = timezone.now()
+		etas = {}
+		# times at which a slot frees up
+		slots = []
+		in_progress = sorted(
+			(row[3], order_item_id, row[0]) for order_item_id, row in queue.items() if row[1] == OrderItem.STATUS_IN_PROGRESS
+		)
+		for started_at, order_item_id, item_id in in_progress:
+			etas[order_item_id] = max(now, started_at + self._prep_seconds(item_id, station))
+			heapq.heappush(slots, etas[order_item_id])
+		waiting = sorted(
+			(row[2], order_item_id, row[0]) for order_item_id, row in queue.items() if row[1] == OrderItem.STATUS_WAITING
+		)
+		for _created_at, order_item_id, item_id in waiting:
+			start = heapq.heappop(slots) if len(slots) >= capacity else now
+			etas[order_item_id] = start + self._prep_seconds(item_id, station)
+			heapq.heappush(slots, etas[order_item_id])
+		return etas
+
+
+estimator = EtaEstimator()
@@ -0,0 +1,251 @@
+"""In-process publish/subscribe of OrderItem changes for the station SSE streams.
+
+Writers (signals and the bulk endpoints) publish after their transaction commits,
+which also feeds the ready-time estimator; each open stream owns an asyncio queue on its event loop, so an idle client costs
+a queue entry rather than a thread.
+
+That is the fast path for writes handled by this process. Writes handled by other
+processes are found by one ``ChangePoller`` thread per process, which reads the
+OrderItemChange log every ``POLL_SECONDS`` while any stream is open and
+publishes what it finds. The broker remembers recently published
+changes, so a row seen by both paths is sent once.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.db import DatabaseError, close_old_connections, connection, transaction
+
+from .changes import changes_since, current_cursor
+from .eta import estimator
+from .models import OrderItem, OrderItemChange, OrderItemDeletion
+from .serializers import compact_order_items
+from .stations import router as station_router
+
+
+logger = logging.getLogger(__name__)
+
+
+EVENT_CREATED = "created"
+EVENT_UPDATED = "updated"
+EVENT_DELETED = "deleted"
+EVENT_RESYNC = "resync"
+
+# Per-subscriber buffer; a client that falls this far behind is told to resync
+SUBSCRIBER_QUEUE_SIZE = 256
+# Published changes remembered to drop the poller's copies of local writes
+RECENT_EVENTS = 4096
+
+
+def _event_key(event):
+	if event["type"] == EVENT_DELETED:
+		return (EVENT_DELETED, event["id"])
+	return (event["id"], event["updated_at"])
+
+
+class OrderItemEventBroker:
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._subscribers = set()
+		self._recent = OrderedDict()
+
+	def has_subscribers(self):
+		with self._lock:
+			return bool(self._subscribers)
+
+	def unseen(self, events):
+		"""Drop events already published and remember the rest."""
+		fresh = []
+		with self._lock:
+			for event in events:
+				key = _event_key(event)
+				if key in self._recent:
+					continue
+				self._recent[key] = None
+				fresh.append(event)
+			while len(self._recent) > RECENT_EVENTS:
+				self._recent.popitem(last=False)
+		return fresh
+
+	def subscribe(self):
+		"""Register a queue on the running event loop and return it."""
+		queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+		with self._lock:
+			self._subscribers.add((asyncio.get_running_loop(), queue))
+		return queue
+
+	def unsubscribe(self, queue):
+		with self._lock:
+			self._subscribers = {sub for sub in self._subscribers if sub[1] is not queue}
+
+	def publish(self, events):
+		if not events:
+			return
+		with self._lock:
+			subscribers = list(self._subscribers)
+		for loop, queue in subscribers:
+			try:
+				loop.call_soon_threadsafe(_offer, queue, events)
+			except RuntimeError:
+				# loop already closed; the stream's finally block will unsubscribe
+				pass
+
+
+def _offer(queue, events):
+	for event in events:
+		try:
+			queue.put_nowait(event)
+		except asyncio.QueueFull:
+			# Drop the backlog and ask the client to reload its list
+			while not queue.empty():
+				queue.get_nowait()
+			queue.put_nowait({"type": EVENT_RESYNC})
+			return
+
+
+broker = OrderItemEventBroker()
+
+
+def build_events(kind, ids):
+	"""Load the current state of the given OrderItems as events (one query)."""
+	rows = compact_order_items(OrderItem.objects.filter(pk__in=list(ids)).order_by("created_at"))
+	return [{"type": kind, **row} for row in rows]
+
+
+def _publish_changed(events):
+	events = broker.unseen(events)
+	# refresh the ready-time estimates first so the events carry the new ones
+	estimator.apply(events)
+	for event in events:
+		event["eta"] = estimator.eta(event["id"])
+	broker.publish(events)
+
+
+def _publish(kind, ids):
+	_publish_changed(build_events(kind, ids))
+
+
+def _publish_deleted(events):
+	events = broker.unseen(events)
+	estimator.remove(events)
+	broker.publish(events)
+
+
+def publish_order_items(kind, ids):
+	"""Publish created/updated events for ``ids`` once the current transaction commits."""
+	ids = list(ids)
+	if not ids:
+		return
+	transaction.on_commit(lambda: _publish(kind, ids))
+
+
+def publish_deleted(events):
+	"""Publish pre-built delete events (the rows are gone by commit time)."""
+	if events:
+		transaction.on_commit(lambda: _publish_deleted(events))
+
+
+def deleted_event(order_item):
+	"""Build a delete event while the OrderItem's order and session still exist."""
+	row = (
+		OrderItem.objects.filter(pk=order_item.pk)
+		.values("order__session_id", "order__session__table__number")
+		.first()
+	) or {}
+	return {
+		"type": EVENT_DELETED,
+		"id": order_item.pk,
+		"order": order_item.order_id,
+		"session": row.get("order__session_id"),
+		"table": row.get("order__session__table__number"),
+		"item": order_item.item_id,
+		"item_type": order_item.item_type,
+		"station": order_item.station,
+	}
+
+
+def _poll_event_type(row, kinds):
+	# status filters only scope created events, so an item that already moved on is an update
+	if OrderItemChange.KIND_CREATED in kinds and row["status"] == OrderItem.STATUS_WAITING:
+		return EVENT_CREATED
+	return EVENT_UPDATED
+
+
+class ChangePoller:
+	"""Publishes OrderItem changes committed by other server processes.
+
+	A daemon thread runs while at least one stream is open in this process. Each
+	poll reads the OrderItemChange rows logged since the previous poll, then the
+	changed rows of the configured stations and the tombstones of deleted ones.
+	"""
+
+	POLL_SECONDS = 3
+
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._thread = None
+
+	def ensure_running(self):
+		with self._lock:
+			if self._thread is None:
+				self._thread = threading.Thread(target=self._run, name="order-item-poller", daemon=True)
+				self._thread.start()
+
+	def _run(self):
+		# log position when the thread started; None until it could be read
+		cursor = None
+		try:
+			while True:
+				close_old_connections()
+				try:
+					cursor = current_cursor() if cursor is None else self.poll(cursor)
+				except DatabaseError:
+					# keep the cursor and try again on the next poll
+					logger.exception("Polling order item changes failed")
+				time.sleep(self.POLL_SECONDS)
+				with self._lock:
+					# checked under the lock so ensure_running() cannot miss the exit
+					if not broker.has_subscribers():
+						self._thread = None
+						return
+		finally:
+			connection.close()
+
+	def poll(self, cursor):
+		"""Publish the changes logged after ``cursor`` and return the next cursor."""
+		until = current_cursor()
+		if until <= cursor:
+			return cursor
+		changed, deleted = changes_since(cursor, until)
+		codes = [station.code for station in station_router.all()]
+		rows = compact_order_items(
+			OrderItem.objects.filter(pk__in=list(changed), station__in=codes).order_by("updated_at")
+		)
+		events = [{"type": _poll_event_type(row, changed[row["id"]]), **row} for row in rows]
+		_publish_changed(events)
+
+		deletions = OrderItemDeletion.objects.filter(order_item_id__in=deleted).values_list(
+			"order_item_id", "item_type", "station", "session_id", "table_number"
+		)
+		_publish_deleted(
+			[
+				{
+					"type": EVENT_DELETED,
+					"id": order_item_id,
+					# order and item are not kept on the tombstone
+					"order": None,
+					"session": session_id,
+					"table": table_number,
+					"item": None,
+					"item_type": item_type,
+					"station": station,
+				}
+				for order_item_id, item_type, station, session_id, table_number in deletions
+			]
+		)
+		return until
+
+
+poller = ChangePoller()
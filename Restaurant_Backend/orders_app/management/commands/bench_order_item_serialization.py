@@ -0,0 +1,67 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from orders_app.models import Order, OrderItem
+from orders_app.serializers import OrderItemSerializer, compact_order_items
+
+
+class Command(BaseCommand):
+    help = "Compare rows/second of the nested OrderItemSerializer and the ?view=compact projection"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=2000, help="number of order items to serialize")
+        parser.add_argument("--repeat", type=int, default=5, help="timed runs per mode (best is reported)")
+
+    def handle(self, *args, **options):
+        from accounts_app.models import User
+        from menu_app.models import Category, Item
+        from tables_app.models import Table, TableSession
+
+        rows = options["rows"]
+        repeat = options["repeat"]
+
+        # Synthetic data lives only inside this transaction and is rolled back
+        with transaction.atomic():
+            category = Category.objects.create(name="__bench__")
+            items = [
+                Item.objects.create(
+                    category=category,
+                    name=f"Bench dish {i}",
+                    description="Benchmark item with a realistic description length for the menu",
+                    price=Decimal("9.50"),
+                    type=Item.TYPE_FOOD,
+                )
+                for i in range(20)
+            ]
+            table = Table.objects.create(number=(Table.objects.order_by("-number").values_list("number", flat=True).first() or 0) + 1)
+            session = TableSession.objects.create(table=table)
+            user = User.objects.create(username="__bench__")
+            order = Order.objects.create(session=session, created_by=user)
+            OrderItem.objects.bulk_create(
+                OrderItem(order=order, item=items[i % len(items)], item_type=Item.TYPE_FOOD, price_snapshot=Decimal("9.50"), note_to_chef="no onions")
+                for i in range(rows)
+            )
+
+            qs = OrderItem.objects.filter(order=order).select_related("order", "item", "order__session", "order__session__table").order_by("created_at")
+            modes = [
+                ("nested serializer", lambda: OrderItemSerializer(qs.all(), many=True).data),
+                ("compact projection", lambda: compact_order_items(qs.all())),
+            ]
+            results = {}
+            for label, run in modes:
+                best = None
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    count = len(run())
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                results[label] = count / best
+                self.stdout.write(f"{label:>20}: {count} rows in {best * 1000:.1f} ms ({results[label]:,.0f} rows/s)")
+
+            transaction.set_rollback(True)
+
+        speedup = results["compact projection"] / results["nested serializer"]
+        self.stdout.write(self.style.SUCCESS(f"compact is {speedup:.1f}x faster"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from orders_app.counters import rebuild_counters
+from orders_app.models import StationCounter
+
+
+class Command(BaseCommand):
+    help = "Rebuild the station dashboard counters from the order items table"
+
+    def handle(self, *args, **options):
+        rebuild_counters()
+        for counter in StationCounter.objects.all():
+            self.stdout.write(f"{counter.station} {counter.status}: {counter.count}")
+        self.stdout.write(self.style.SUCCESS("Station counters rebuilt."))
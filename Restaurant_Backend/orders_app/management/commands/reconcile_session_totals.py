@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from orders_app.counters import reconcile_session_totals
+
+
+class Command(BaseCommand):
+    help = "Check every table session's running subtotal and item count against its order items and repair them"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true", help="only report mismatches, do not repair them")
+
+    def handle(self, *args, **options):
+        mismatches = reconcile_session_totals(repair=not options["check"])
+        for session_id, (subtotal, item_count), (actual_subtotal, actual_count) in mismatches:
+            self.stdout.write(
+                f"session {session_id}: stored {subtotal} / {item_count} items, actual {actual_subtotal} / {actual_count} items"
+            )
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS("All session totals match their order items."))
+        elif options["check"]:
+            self.stdout.write(self.style.WARNING(f"{len(mismatches)} session(s) out of date."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{len(mismatches)} session(s) repaired."))
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.9 on 2026-10-18 19:15
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders_app", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrderItemDeletion",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("order_item_id", models.BigIntegerField()),
+                ("item_type", models.CharField(blank=True, max_length=10)),
+                ("session_id", models.BigIntegerField(blank=True, null=True)),
+                ("table_number", models.PositiveIntegerField(blank=True, null=True)),
+                (
+                    "deleted_at",
+                    models.DateTimeField(
+                        db_index=True, default=django.utils.timezone.now
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("deleted_at",),
+            },
+        ),
+        migrations.AddField(
+            model_name="orderitem",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.9 on 2026-10-18 19:40
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_item_type(apps, schema_editor):
+    OrderItem = apps.get_model("orders_app", "OrderItem")
+    Item = apps.get_model("menu_app", "Item")
+    OrderItem.objects.update(
+        item_type=Subquery(Item.objects.filter(pk=OuterRef("item_id")).values("type")[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("menu_app", "0001_initial"),
+        ("orders_app", "0002_orderitem_updated_at_orderitemdeletion"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="orderitem",
+            name="item_type",
+            field=models.CharField(
+                choices=[("food", "Food"), ("drink", "Drink")],
+                default="food",
+                editable=False,
+                max_length=10,
+            ),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_item_type, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="orderitem",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name="orderitem",
+            index=models.Index(
+                fields=["item_type", "status", "created_at"],
+                name="orderitem_type_status_created",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="orderitem",
+            index=models.Index(
+                fields=["item_type", "created_at"], name="orderitem_type_created"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="orderitem",
+            index=models.Index(
+                fields=["item_type", "updated_at"], name="orderitem_type_updated"
+            ),
+        ),
+    ]
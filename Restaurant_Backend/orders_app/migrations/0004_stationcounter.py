@@ -0,0 +1,49 @@
+# Generated by Django 5.2.9 on 2026-10-18 19:18
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def build_counters(apps, schema_editor):
+    OrderItem = apps.get_model("orders_app", "OrderItem")
+    StationCounter = apps.get_model("orders_app", "StationCounter")
+    rows = OrderItem.objects.order_by().values("item_type", "status").annotate(c=Count("id"))
+    StationCounter.objects.bulk_create(
+        StationCounter(station=row["item_type"], status=row["status"], count=row["c"])
+        for row in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders_app", "0003_orderitem_item_type_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StationCounter",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("station", models.CharField(max_length=20)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("waiting", "Waiting"),
+                            ("in_progress", "In Progress"),
+                            ("ready", "Ready"),
+                            ("served", "Served"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("count", models.IntegerField(default=0)),
+            ],
+            options={
+                "ordering": ("station", "status"),
+                "unique_together": {("station", "status")},
+            },
+        ),
+        migrations.RunPython(build_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,132 @@
+# Generated by Django 5.2.9 on 2026-10-18 19:23
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+# The two stations the app shipped with; their codes back the /kitchen/ and /barista/ endpoints
+DEFAULT_STATIONS = (
+    ("kitchen", "Kitchen", "food", ("chef", "waiter")),
+    ("barista", "Barista", "drink", ("barista", "waiter")),
+)
+
+
+def create_default_stations(apps, schema_editor):
+    Station = apps.get_model("orders_app", "Station")
+    Role = apps.get_model("rbac_app", "Role")
+    OrderItem = apps.get_model("orders_app", "OrderItem")
+    OrderItemDeletion = apps.get_model("orders_app", "OrderItemDeletion")
+    StationCounter = apps.get_model("orders_app", "StationCounter")
+
+    for code, name, item_type, role_names in DEFAULT_STATIONS:
+        station, _ = Station.objects.get_or_create(code=code, defaults={"name": name, "item_type": item_type})
+        # Role names are compared case-insensitively, as in rbac_app 0002
+        matches = Q()
+        for role_name in role_names:
+            matches |= Q(name__iexact=role_name)
+        station.roles.add(*Role.objects.filter(matches))
+        OrderItem.objects.filter(item_type=item_type).update(station=code)
+        OrderItemDeletion.objects.filter(item_type=item_type).update(station=code)
+
+    # Counters were keyed by item type until now
+    StationCounter.objects.all().delete()
+    rows = OrderItem.objects.order_by().values("station", "status").annotate(c=Count("id"))
+    StationCounter.objects.bulk_create(
+        StationCounter(station=row["station"], status=row["status"], count=row["c"])
+        for row in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("menu_app", "0002_category_item_updated_at"),
+        ("orders_app", "0004_stationcounter"),
+        ("rbac_app", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Station",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("code", models.SlugField(max_length=20, unique=True)),
+                ("name", models.CharField(max_length=100)),
+                (
+                    "item_type",
+                    models.CharField(
+                        blank=True,
+                        choices=[("food", "Food"), ("drink", "Drink")],
+                        help_text="Fallback for items of this type not routed by item or category.",
+                        max_length=10,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("id",),
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name="orderitem",
+            name="orderitem_type_status_created",
+        ),
+        migrations.RemoveIndex(
+            model_name="orderitem",
+            name="orderitem_type_created",
+        ),
+        migrations.RemoveIndex(
+            model_name="orderitem",
+            name="orderitem_type_updated",
+        ),
+        migrations.AddField(
+            model_name="orderitem",
+            name="station",
+            field=models.CharField(blank=True, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name="orderitemdeletion",
+            name="station",
+            field=models.CharField(blank=True, max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name="orderitem",
+            index=models.Index(
+                fields=["station", "status", "created_at"],
+                name="orderitem_station_status",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="orderitem",
+            index=models.Index(
+                fields=["station", "created_at"], name="orderitem_station_created"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="orderitem",
+            index=models.Index(
+                fields=["station", "updated_at"], name="orderitem_station_updated"
+            ),
+        ),
+        migrations.AddField(
+            model_name="station",
+            name="categories",
+            field=models.ManyToManyField(
+                blank=True, related_name="stations", to="menu_app.category"
+            ),
+        ),
+        migrations.AddField(
+            model_name="station",
+            name="items",
+            field=models.ManyToManyField(
+                blank=True, related_name="stations", to="menu_app.item"
+            ),
+        ),
+        migrations.AddField(
+            model_name="station",
+            name="roles",
+            field=models.ManyToManyField(
+                blank=True, related_name="stations", to="rbac_app.role"
+            ),
+        ),
+        migrations.RunPython(create_default_stations, migrations.RunPython.noop),
+    ]
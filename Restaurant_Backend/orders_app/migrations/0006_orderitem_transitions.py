@@ -0,0 +1,74 @@
+# Generated by Django 5.2.9 on 2026-10-18 19:28
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_status_changed_at(apps, schema_editor):
+    # best guess for existing rows: their last write
+    OrderItem = apps.get_model("orders_app", "OrderItem")
+    OrderItem.objects.update(status_changed_at=F("updated_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders_app", "0005_station"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrderItemTransition",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("order_item_id", models.BigIntegerField()),
+                ("item_id", models.BigIntegerField()),
+                ("category_id", models.BigIntegerField(blank=True, null=True)),
+                ("station", models.CharField(blank=True, max_length=20)),
+                (
+                    "from_status",
+                    models.CharField(
+                        choices=[
+                            ("waiting", "Waiting"),
+                            ("in_progress", "In Progress"),
+                            ("ready", "Ready"),
+                            ("served", "Served"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "to_status",
+                    models.CharField(
+                        choices=[
+                            ("waiting", "Waiting"),
+                            ("in_progress", "In Progress"),
+                            ("ready", "Ready"),
+                            ("served", "Served"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "changed_at",
+                    models.DateTimeField(
+                        db_index=True, default=django.utils.timezone.now
+                    ),
+                ),
+                ("hour", models.PositiveSmallIntegerField()),
+                ("duration", models.FloatField()),
+            ],
+            options={
+                "ordering": ("changed_at",),
+            },
+        ),
+        migrations.AddField(
+            model_name="orderitem",
+            name="status_changed_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now, editable=False
+            ),
+        ),
+        migrations.RunPython(backfill_status_changed_at, migrations.RunPython.noop),
+    ]
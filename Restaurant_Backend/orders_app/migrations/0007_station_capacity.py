@@ -0,0 +1,21 @@
+# Generated by Django 5.2.9 on 2026-10-18 19:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders_app", "0006_orderitem_transitions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="station",
+            name="capacity",
+            field=models.PositiveSmallIntegerField(
+                default=4,
+                help_text="Items the station prepares at the same time; used for ready-time estimates.",
+            ),
+        ),
+    ]
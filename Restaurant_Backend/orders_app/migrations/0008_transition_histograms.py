@@ -0,0 +1,70 @@
+# Generated by Django 5.2.9 on 2026-10-18 20:34
+
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Floor, Ln
+
+
+def backfill_duration_bin(apps, schema_editor):
+    # orders_app.transitions.duration_bin, 20 bins per unit of ln(1 + seconds)
+    OrderItemTransition = apps.get_model("orders_app", "OrderItemTransition")
+    OrderItemTransition.objects.filter(duration__gt=0).update(
+        duration_bin=Floor(Ln(F("duration") + 1) * 20)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders_app", "0007_station_capacity"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrderItemTransitionRollup",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("day", models.DateField()),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("item", "Item, category and station"),
+                            ("hour", "Hour"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("histograms", models.JSONField(default=list)),
+            ],
+            options={
+                "ordering": ("day", "kind"),
+            },
+        ),
+        migrations.AddField(
+            model_name="orderitemtransition",
+            name="duration_bin",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_duration_bin, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="orderitemtransition",
+            index=models.Index(
+                fields=[
+                    "changed_at",
+                    "station",
+                    "from_status",
+                    "duration_bin",
+                    "item_id",
+                    "category_id",
+                    "hour",
+                    "duration",
+                ],
+                name="transition_histogram",
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="orderitemtransitionrollup",
+            unique_together={("day", "kind")},
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.9 on 2026-10-18 20:46
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders_app", "0008_transition_histograms"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrderItemChange",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("order_item_id", models.BigIntegerField()),
+                ("station", models.CharField(blank=True, max_length=20)),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("created", "Created"),
+                            ("updated", "Updated"),
+                            ("deleted", "Deleted"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "changed_at",
+                    models.DateTimeField(
+                        db_index=True, default=django.utils.timezone.now
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("id",),
+                "indexes": [
+                    models.Index(
+                        fields=["station", "id"], name="orderitemchange_station"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -1,7 +1,36 @@
+from datetime import timedelta
+
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
 
+from menu_app.models import Item as MenuItem
+
+
+class Station(models.Model):
+	"""A preparation station (kitchen, bar, grill, pastry...) that order items are routed to.
+
+	An ordered item goes to the first station listing the item itself, else the first
+	listing its category, else the first whose ``item_type`` matches. ``roles`` may view
+	the station's queue.
+	"""
+
+	id = models.BigAutoField(primary_key=True)
+	# routing key copied onto OrderItem.station; keep stable once items reference it
+	code = models.SlugField(max_length=20, unique=True)
+	name = models.CharField(max_length=100)
+	item_type = models.CharField(max_length=10, choices=MenuItem.TYPE_CHOICES, blank=True, help_text="Fallback for items of this type not routed by item or category.")
+	capacity = models.PositiveSmallIntegerField(default=4, help_text="Items the station prepares at the same time; used for ready-time estimates.")
+	categories = models.ManyToManyField("menu_app.Category", blank=True, related_name="stations")
+	items = models.ManyToManyField("menu_app.Item", blank=True, related_name="stations")
+	roles = models.ManyToManyField("rbac_app.Role", blank=True, related_name="stations")
+
+	class Meta:
+		ordering = ("id",)
+
+	def __str__(self):
+		return self.name
+
 
 class Order(models.Model):
 	id = models.BigAutoField(primary_key=True)
@@ -34,11 +63,197 @@ class OrderItem(models.Model):
 	quantity = models.PositiveIntegerField(default=1)
 	note_to_chef = models.TextField(blank=True)
 	price_snapshot = models.DecimalField(max_digits=8, decimal_places=2)
+	# copy of item.type taken at insert time, like price_snapshot, so station queries need no join
+	item_type = models.CharField(max_length=10, choices=MenuItem.TYPE_CHOICES, editable=False)
+	# Station.code the item was routed to at insert time
+	station = models.CharField(max_length=20, blank=True, editable=False)
 	status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_WAITING)
+	# when the current status was entered; the time spent in it is logged on the next change
+	status_changed_at = models.DateTimeField(default=timezone.now, editable=False)
 	created_at = models.DateTimeField(default=timezone.now)
+	# bumped on every write (bulk updates must set it explicitly); versions the station lists
+	updated_at = models.DateTimeField(auto_now=True)
 
 	class Meta:
 		ordering = ("created_at",)
+		indexes = [
+			# station queues filtered by status
+			models.Index(fields=["station", "status", "created_at"], name="orderitem_station_status"),
+			# unfiltered station queues
+			models.Index(fields=["station", "created_at"], name="orderitem_station_created"),
+			# station list ETags
+			models.Index(fields=["station", "updated_at"], name="orderitem_station_updated"),
+		]
+
+	@classmethod
+	def from_db(cls, db, field_names, values):
+		instance = super().from_db(db, field_names, values)
+		# remembered so the station counters can be moved when the status changes
+		instance._loaded_status = instance.__dict__.get("status")
+		# remembered so the session's running subtotal can be corrected when they change
+		instance._loaded_line = (instance.__dict__.get("quantity"), instance.__dict__.get("price_snapshot"))
+		return instance
+
+	def save(self, *args, **kwargs):
+		if not self.item_type:
+			self.item_type = self.item.type
+		if not self.station:
+			from .stations import router
+
+			self.station = router.route(self.item)
+		loaded_status = getattr(self, "_loaded_status", None)
+		if loaded_status and loaded_status != self.status:
+			# read by the post_save signal to log the transition
+			self._left_status_at = self.status_changed_at
+			self.status_changed_at = timezone.now()
+		super().save(*args, **kwargs)
 
 	def __str__(self):
 		return f"OrderItem {self.id} - {self.item.name} x{self.quantity} ({self.status})"
+
+
+class OrderItemDeletion(models.Model):
+	"""Tombstone for a deleted OrderItem so station delta syncs can report removals."""
+
+	# tombstones older than this are pruned; clients with an older cursor must reload
+	RETENTION = timedelta(days=1)
+
+	id = models.BigAutoField(primary_key=True)
+	order_item_id = models.BigIntegerField()
+	item_type = models.CharField(max_length=10, blank=True)
+	station = models.CharField(max_length=20, blank=True)
+	session_id = models.BigIntegerField(null=True, blank=True)
+	table_number = models.PositiveIntegerField(null=True, blank=True)
+	deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+	class Meta:
+		ordering = ("deleted_at",)
+
+	def __str__(self):
+		return f"Deleted OrderItem {self.order_item_id}"
+
+
+class OrderItemChange(models.Model):
+	"""One OrderItem create, update or delete, logged in the writing transaction.
+
+	The auto-increment id is the station ``?since=`` cursor: ids are handed out by
+	the database, so cursors from different server processes compare correctly
+	whatever their clocks say. Rows older than ``RETENTION`` are pruned (the
+	newest one is kept); a cursor below the oldest remaining id has expired.
+	"""
+
+	KIND_CREATED = "created"
+	KIND_UPDATED = "updated"
+	KIND_DELETED = "deleted"
+	KIND_CHOICES = [
+		(KIND_CREATED, "Created"),
+		(KIND_UPDATED, "Updated"),
+		(KIND_DELETED, "Deleted"),
+	]
+
+	RETENTION = OrderItemDeletion.RETENTION
+
+	id = models.BigAutoField(primary_key=True)
+	order_item_id = models.BigIntegerField()
+	station = models.CharField(max_length=20, blank=True)
+	kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+	changed_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+	class Meta:
+		ordering = ("id",)
+		indexes = [
+			# ?since= delta sync
+			models.Index(fields=["station", "id"], name="orderitemchange_station"),
+		]
+
+	def __str__(self):
+		return f"OrderItem {self.order_item_id} {self.kind}"
+
+
+class OrderItemTransition(models.Model):
+	"""One OrderItem status change, appended by every status update path.
+
+	Kept compact (plain ids, no foreign keys) so it can grow for months and be
+	scanned by the prep-time analytics. ``duration`` is the seconds spent in
+	``from_status``, ``duration_bin`` its histogram bin and ``hour`` the local hour
+	that state was entered, so the analytics never have to parse timestamps or
+	compute anything per row.
+	"""
+
+	id = models.BigAutoField(primary_key=True)
+	order_item_id = models.BigIntegerField()
+	# menu_app.Item / Category ids at the time of the change
+	item_id = models.BigIntegerField()
+	category_id = models.BigIntegerField(null=True, blank=True)
+	station = models.CharField(max_length=20, blank=True)
+	from_status = models.CharField(max_length=20, choices=OrderItem.STATUS_CHOICES)
+	to_status = models.CharField(max_length=20, choices=OrderItem.STATUS_CHOICES)
+	changed_at = models.DateTimeField(default=timezone.now, db_index=True)
+	hour = models.PositiveSmallIntegerField()
+	duration = models.FloatField()
+	# see orders_app.transitions.duration_bin
+	duration_bin = models.PositiveSmallIntegerField(default=0)
+
+	class Meta:
+		ordering = ("changed_at",)
+		indexes = [
+			# prep-time analytics: the histograms are read from the index alone
+			models.Index(
+				fields=["changed_at", "station", "from_status", "duration_bin", "item_id", "category_id", "hour", "duration"],
+				name="transition_histogram",
+			),
+		]
+
+	def __str__(self):
+		return f"OrderItem {self.order_item_id}: {self.from_status} -> {self.to_status}"
+
+
+class OrderItemTransitionRollup(models.Model):
+	"""Duration histograms of the OrderItemTransitions of one local day, per ``kind``.
+
+	Built by the prep-time analytics the first time they need a day that is over,
+	so a range of days reads a few rows per day instead of every transition.
+	``histograms`` holds [[*key, from_status, [[bin, count, sum of durations], ...]], ...]
+	with the key (item_id, category_id, station) for ``item`` and (hour,) for ``hour``.
+	Delete rows to have them rebuilt from the log.
+	"""
+
+	KIND_ITEM = "item"
+	KIND_HOUR = "hour"
+	KIND_CHOICES = [
+		(KIND_ITEM, "Item, category and station"),
+		(KIND_HOUR, "Hour"),
+	]
+
+	id = models.BigAutoField(primary_key=True)
+	day = models.DateField()
+	kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+	histograms = models.JSONField(default=list)
+
+	class Meta:
+		unique_together = ("day", "kind")
+		ordering = ("day", "kind")
+
+	def __str__(self):
+		return f"{self.day} {self.kind}"
+
+
+class StationCounter(models.Model):
+	"""Running count of OrderItems per (station, status), read by the dashboards.
+
+	Kept in step with every OrderItem insert, status change and delete; rebuild with
+	``manage.py rebuild_station_counters`` if it ever drifts.
+	"""
+
+	id = models.BigAutoField(primary_key=True)
+	# Station.code
+	station = models.CharField(max_length=20)
+	status = models.CharField(max_length=20, choices=OrderItem.STATUS_CHOICES)
+	count = models.IntegerField(default=0)
+
+	class Meta:
+		unique_together = ("station", "status")
+		ordering = ("station", "status")
+
+	def __str__(self):
+		return f"{self.station}/{self.status}: {self.count}"
@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import Order, OrderItem
+from .eta import estimator
+from .models import Order, OrderItem, Station
 from menu_app.serializers import ItemSerializer
 
 # Import the Item model to provide a queryset for PrimaryKeyRelatedField
@@ -9,11 +10,16 @@ from menu_app.models import Item as MenuItem
 class OrderItemSerializer(serializers.ModelSerializer):
     item = ItemSerializer(read_only=True)
     item_id = serializers.PrimaryKeyRelatedField(queryset=MenuItem.objects.all(), write_only=True, source="item")
+    # estimated ready time of waiting / in progress items
+    eta = serializers.SerializerMethodField()
 
     class Meta:
         model = OrderItem
-        fields = ("id", "order", "item", "item_id", "quantity", "note_to_chef", "price_snapshot", "status", "created_at")
-        read_only_fields = ("id", "order", "price_snapshot", "status", "created_at")
+        fields = ("id", "order", "item", "item_id", "quantity", "note_to_chef", "price_snapshot", "item_type", "station", "status", "status_changed_at", "eta", "created_at", "updated_at")
+        read_only_fields = ("id", "order", "price_snapshot", "item_type", "station", "status", "status_changed_at", "created_at", "updated_at")
+
+    def get_eta(self, obj):
+        return estimator.eta(obj.pk)
 
 
 class OrderSerializer(serializers.ModelSerializer):
@@ -22,4 +28,47 @@ class OrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = ("id", "session", "created_by", "created_at", "items")
-        read_only_fields = ("id", "created_by", "created_at", "items")
\ No newline at end of file
+        read_only_fields = ("id", "created_by", "created_at", "items")
+
+
+class OrderItemLineSerializer(serializers.Serializer):
+    """One line of a batch add-items request."""
+
+    item_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, default=1)
+    note_to_chef = serializers.CharField(allow_blank=True, required=False, default="")
+
+
+# Flat OrderItem projection used by ?view=compact and the station streams: read
+# straight from .values_list() without model instances or nested serializers.
+COMPACT_ORDER_ITEM_FIELDS = {
+    "id": "id",
+    "order": "order_id",
+    "session": "order__session_id",
+    "table": "order__session__table__number",
+    "item": "item_id",
+    "item_name": "item__name",
+    "item_type": "item_type",
+    "station": "station",
+    "quantity": "quantity",
+    "note_to_chef": "note_to_chef",
+    "status": "status",
+    "status_changed_at": "status_changed_at",
+    "created_at": "created_at",
+    "updated_at": "updated_at",
+}
+
+
+def compact_order_items(queryset):
+    """Return a list of flat OrderItem dicts for ``queryset`` in one query."""
+    names = tuple(COMPACT_ORDER_ITEM_FIELDS)
+    rows = [dict(zip(names, row)) for row in queryset.values_list(*COMPACT_ORDER_ITEM_FIELDS.values())]
+    for row in rows:
+        row["eta"] = estimator.eta(row["id"])
+    return rows
+
+
+class StationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Station
+        fields = ("id", "code", "name", "item_type")
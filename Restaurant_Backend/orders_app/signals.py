@@ -0,0 +1,85 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .changes import record_changes
+from .counters import adjust_counters, adjust_session_totals, count_status_change, session_totals_created
+from .eta import estimator
+from .events import EVENT_CREATED, EVENT_UPDATED, deleted_event, publish_deleted, publish_order_items
+from .models import OrderItem, OrderItemChange, OrderItemDeletion, OrderItemTransition, Station
+from .stations import router
+from .transitions import forget_rollups, log_transition
+
+
+@receiver(post_save, sender=OrderItem)
+def order_item_saved(sender, instance, created, raw=False, **kwargs):
+	if raw:
+		return
+	if created:
+		adjust_counters({(instance.station, instance.status): 1})
+		adjust_session_totals(session_totals_created(instance.order.session_id, [instance]))
+	else:
+		loaded_status = getattr(instance, "_loaded_status", None)
+		if loaded_status:
+			adjust_counters(count_status_change([(instance.station, loaded_status)], instance.status))
+		left_status_at = getattr(instance, "_left_status_at", None)
+		if loaded_status and left_status_at and loaded_status != instance.status:
+			log_transition(instance, loaded_status, left_status_at)
+		instance._left_status_at = None
+		loaded_quantity, loaded_price = getattr(instance, "_loaded_line", (None, None))
+		if loaded_quantity is not None and loaded_price is not None and (loaded_quantity, loaded_price) != (instance.quantity, instance.price_snapshot):
+			# quantity or price edited (e.g. in the admin): move the session's running totals
+			amount = instance.price_snapshot * instance.quantity - loaded_price * loaded_quantity
+			adjust_session_totals({instance.order.session_id: (amount, instance.quantity - loaded_quantity)})
+	instance._loaded_status = instance.status
+	instance._loaded_line = (instance.quantity, instance.price_snapshot)
+	record_changes(OrderItemChange.KIND_CREATED if created else OrderItemChange.KIND_UPDATED, [(instance.pk, instance.station)])
+	publish_order_items(EVENT_CREATED if created else EVENT_UPDATED, [instance.pk])
+
+
+@receiver(pre_delete, sender=OrderItem)
+def order_item_deleting(sender, instance, **kwargs):
+	adjust_counters({(instance.station, getattr(instance, "_loaded_status", None) or instance.status): -1})
+	event = deleted_event(instance)
+	quantity, price = getattr(instance, "_loaded_line", (None, None))
+	if quantity is None or price is None:
+		quantity, price = instance.quantity, instance.price_snapshot
+	adjust_session_totals({event["session"]: (-price * quantity, -quantity)})
+	now = timezone.now()
+	OrderItemDeletion.objects.filter(deleted_at__lt=now - OrderItemDeletion.RETENTION).delete()
+	OrderItemDeletion.objects.create(
+		order_item_id=instance.pk,
+		item_type=instance.item_type,
+		station=instance.station,
+		session_id=event["session"],
+		table_number=event["table"],
+		deleted_at=now,
+	)
+	record_changes(OrderItemChange.KIND_DELETED, [(instance.pk, instance.station)])
+	publish_deleted([event])
+
+
+@receiver(post_save, sender=Station)
+@receiver(post_delete, sender=Station)
+@receiver(m2m_changed, sender=Station.items.through)
+@receiver(m2m_changed, sender=Station.categories.through)
+@receiver(m2m_changed, sender=Station.roles.through)
+def station_changed(sender, **kwargs):
+	_invalidate_stations()
+	# again after commit, in case another request reloaded the old rows meanwhile
+	transaction.on_commit(_invalidate_stations)
+
+
+def _invalidate_stations():
+	router.invalidate()
+	# capacities feed the ready-time estimates
+	estimator.invalidate()
+
+
+@receiver(post_save, sender=OrderItemTransition)
+@receiver(post_delete, sender=OrderItemTransition)
+def transition_changed(sender, instance, raw=False, **kwargs):
+	# log rows of past days only change through the admin; their rollups are regrouped
+	if not raw:
+		forget_rollups(instance.changed_at)
@@ -0,0 +1,122 @@
+"""Process-local snapshot of the Station routing table.
+
+Routing an ordered item and checking who may see a station happen on every order
+entry and queue poll, so the rules are loaded once (four small queries) and reused.
+Besides ``Station.roles``, a role may be granted one station through the rbac
+permission codes ``<station code>_items_view`` and ``<station code>_items_update``.
+Station signals drop the snapshot in this process; other processes pick up admin
+changes after ``TTL_SECONDS``.
+"""
+import threading
+import time
+from collections import namedtuple
+
+from accounts_app.permissions import user_has_permission
+from .models import Station
+
+
+StationInfo = namedtuple("StationInfo", ("id", "code", "name", "item_type", "capacity", "role_ids"))
+
+
+class StationRouter:
+	TTL_SECONDS = 60
+
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._snapshot = None
+		self._loaded_at = 0.0
+
+	def invalidate(self):
+		with self._lock:
+			self._snapshot = None
+
+	def _load(self):
+		by_code = {}
+		by_item = {}
+		by_category = {}
+		by_type = {}
+		stations = Station.objects.prefetch_related("items", "categories", "roles").order_by("id")
+		for station in stations:
+			info = StationInfo(
+				station.id,
+				station.code,
+				station.name,
+				station.item_type,
+				station.capacity,
+				frozenset(role.id for role in station.roles.all()),
+			)
+			by_code[station.code] = info
+			# first station (lowest id) wins when a rule is listed twice
+			for item in station.items.all():
+				by_item.setdefault(item.id, station.code)
+			for category in station.categories.all():
+				by_category.setdefault(category.id, station.code)
+			if station.item_type:
+				by_type.setdefault(station.item_type, station.code)
+		return {"by_code": by_code, "by_item": by_item, "by_category": by_category, "by_type": by_type}
+
+	def _get(self):
+		with self._lock:
+			snapshot = self._snapshot
+			if snapshot is not None and time.monotonic() - self._loaded_at < self.TTL_SECONDS:
+				return snapshot
+		snapshot = self._load()
+		with self._lock:
+			self._snapshot = snapshot
+			self._loaded_at = time.monotonic()
+		return snapshot
+
+	def route(self, menu_item):
+		"""Return the station code for a menu item ("" when no station takes it)."""
+		snapshot = self._get()
+		return (
+			snapshot["by_item"].get(menu_item.id)
+			or snapshot["by_category"].get(menu_item.category_id)
+			or snapshot["by_type"].get(menu_item.type)
+			or ""
+		)
+
+	def get(self, code):
+		"""Return the StationInfo for ``code`` or None."""
+		return self._get()["by_code"].get(code)
+
+	def all(self):
+		return list(self._get()["by_code"].values())
+
+
+router = StationRouter()
+
+
+def _is_admin(user):
+	if getattr(user, "is_superuser", False):
+		return True
+	role = getattr(user, "role", None)
+	return bool(role and getattr(role, "is_admin", False))
+
+
+def user_can_view_station(user, station):
+	"""Admins, superusers, users whose role is attached to the station and roles
+	granted the ``<station code>_items_view`` permission code (e.g. kitchen_items_view)."""
+	if not user or not user.is_authenticated or station is None:
+		return False
+	if _is_admin(user):
+		return True
+	role = getattr(user, "role", None)
+	if role is None:
+		return False
+	return role.id in station.role_ids or user_has_permission(user, f"{station.code}_items_view")
+
+
+def user_can_update_station(user, code):
+	"""Whether ``user`` may change items routed to station ``code``: admins, the
+	station's roles and roles granted ``<code>_items_update``. Items of unknown or
+	removed stations are left to admins."""
+	if not user or not user.is_authenticated:
+		return False
+	if _is_admin(user):
+		return True
+	station = router.get(code)
+	role = getattr(user, "role", None)
+	if station is None or role is None:
+		return False
+	return role.id in station.role_ids or user_has_permission(user, f"{code}_items_update")
@@ -0,0 +1,671 @@
+import importlib
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.apps import apps
+from django.core.management import call_command
+from django.db import connection
+from django.http import QueryDict
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts_app.models import IdempotencyKey, User
+from menu_app.models import Category, Item
+from menu_app.snapshots import snapshots
+from rbac_app.models import Role
+from tables_app.models import Table, TableSession
+from . import changes, events
+from .counters import station_counts
+from .eta import estimator
+from .serializers import COMPACT_ORDER_ITEM_FIELDS
+from .models import Order, OrderItem, OrderItemChange, OrderItemTransition, OrderItemTransitionRollup, Station, StationCounter
+from .stations import router as station_router
+from .transitions import duration_bin, time_in_state
+from .views import CreateOrderForSessionAPIView, _order_item_event_stream, _stream_filters
+
+
+class OrdersTestCase(TestCase):
+	"""Default roles and stations, a waiter, a chef and a barista, and one open order."""
+
+	def setUp(self):
+		call_command("seed_permissions_roles", stdout=StringIO())
+		self.roles = {role.name: role for role in Role.objects.all()}
+		Station.objects.get(code="kitchen").roles.add(self.roles["chef"], self.roles["waiter"])
+		Station.objects.get(code="barista").roles.add(self.roles["barista"], self.roles["waiter"])
+		self.users = {
+			name: User.objects.create_user(username=name, role=self.roles[name])
+			for name in ("waiter", "chef", "barista", "cashier", "admin")
+		}
+		category = Category.objects.create(name="Mains")
+		self.food = Item.objects.create(category=category, name="Steak", price=Decimal("15.00"), type=Item.TYPE_FOOD)
+		drinks = Category.objects.create(name="Drinks")
+		self.drink = Item.objects.create(category=drinks, name="Latte", price=Decimal("3.25"), type=Item.TYPE_DRINK)
+		self.session = TableSession.open(Table.objects.create(number=1))
+		self.order = Order.objects.create(session=self.session, created_by=self.users["waiter"])
+		# the menu caches are per process and follow changes after commit
+		snapshots.bump()
+
+	def client_for(self, username):
+		client = APIClient()
+		client.force_authenticate(self.users[username])
+		return client
+
+	def add_item(self, item=None, quantity=1):
+		return OrderItem.objects.create(order=self.order, item=item or self.food, quantity=quantity, price_snapshot=(item or self.food).price)
+
+	def assertCountersMatchRows(self):
+		stored = {(c.station, c.status): c.count for c in StationCounter.objects.all() if c.count}
+		actual = {}
+		for station, item_status in OrderItem.objects.values_list("station", "status"):
+			actual[(station, item_status)] = actual.get((station, item_status), 0) + 1
+		self.assertEqual(stored, actual)
+
+
+class AddItemsTests(OrdersTestCase):
+	def url(self):
+		return f"/api/orders/{self.order.pk}/add-items/"
+
+	def test_inserts_every_line(self):
+		lines = [{"item_id": self.food.pk, "quantity": 2, "note_to_chef": "rare"}, {"item_id": self.drink.pk}]
+		response = self.client_for("waiter").post(self.url(), {"items": lines}, format="json")
+		self.assertEqual(response.status_code, 201)
+		self.assertEqual([(row["item"]["id"], row["quantity"], row["station"]) for row in response.data], [(self.food.pk, 2, "kitchen"), (self.drink.pk, 1, "barista")])
+		self.assertEqual(OrderItem.objects.get(item=self.food).price_snapshot, Decimal("15.00"))
+		self.assertCountersMatchRows()
+		self.session.refresh_from_db()
+		self.assertEqual((self.session.subtotal, self.session.item_count), (Decimal("33.25"), 3))
+
+	def test_rejects_the_whole_batch(self):
+		self.drink.available = False
+		with self.captureOnCommitCallbacks(execute=True):
+			self.drink.save()
+		lines = [{"item_id": self.food.pk}, {"item_id": self.drink.pk}, {"item_id": 999}]
+		response = self.client_for("waiter").post(self.url(), lines, format="json")
+		self.assertEqual(response.status_code, 400)
+		self.assertEqual([(error["index"], error["detail"]) for error in response.data["errors"]], [(1, "Item is not available."), (2, "Item not found.")])
+		self.assertFalse(OrderItem.objects.exists())
+
+	def test_requires_a_non_empty_list(self):
+		waiter = self.client_for("waiter")
+		for body in ({"items": []}, {"items": "x"}, {}):
+			self.assertEqual(waiter.post(self.url(), body, format="json").status_code, 400)
+		self.assertEqual(waiter.post(self.url(), {"items": [{"quantity": 0, "item_id": self.food.pk}]}, format="json").status_code, 400)
+
+	def test_requires_the_permission_code(self):
+		response = self.client_for("chef").post(self.url(), [{"item_id": self.food.pk}], format="json")
+		self.assertEqual(response.status_code, 403)
+
+
+class StationStreamTests(OrdersTestCase):
+	def test_stream_requires_a_token_and_the_station(self):
+		self.assertEqual(self.client.get("/api/kitchen/stream/").status_code, 401)
+		self.assertEqual(self.client.get("/api/kitchen/stream/", {"token": "junk"}).status_code, 401)
+		token = str(AccessToken.for_user(self.users["chef"]))
+		self.assertEqual(self.client.get("/api/barista/stream/", {"token": token}).status_code, 403)
+		response = self.client.get("/api/kitchen/stream/", {"token": token})
+		self.assertEqual((response.status_code, response["Content-Type"]), (200, "text/event-stream"))
+		response.close()
+
+	def test_writes_are_published_after_commit(self):
+		with mock.patch.object(events.broker, "publish") as publish:
+			with self.captureOnCommitCallbacks() as callbacks:
+				order_item = self.add_item()
+			publish.assert_not_called()
+			for callback in callbacks:
+				callback()
+		(published,) = publish.call_args.args
+		self.assertEqual([(event["type"], event["id"], event["station"]) for event in published], [("created", order_item.pk, "kitchen")])
+
+	async def test_stream_sends_matching_events(self):
+		stream = _order_item_event_stream("kitchen", _stream_filters(QueryDict("status=waiting&table=1")))
+		with mock.patch.object(events.poller, "ensure_running"):
+			self.assertEqual(await anext(stream), "retry: 3000\n\n")
+			events.broker.publish([
+				{"type": "created", "id": 1, "station": "barista", "table": 1, "status": "waiting"},
+				{"type": "created", "id": 2, "station": "kitchen", "table": 2, "status": "waiting"},
+				# status filters only scope created events
+				{"type": "created", "id": 3, "station": "kitchen", "table": 1, "status": "ready"},
+				{"type": "updated", "id": 4, "station": "kitchen", "table": 1, "status": "ready"},
+			])
+			frame = await anext(stream)
+		await stream.aclose()
+		self.assertTrue(frame.startswith("event: updated\ndata: "))
+		self.assertIn('"id": 4', frame)
+
+
+class StationQueueTests(OrdersTestCase):
+	def test_type_and_station_are_copied_at_insert(self):
+		order_item = self.add_item()
+		self.assertEqual((order_item.item_type, order_item.station), ("food", "kitchen"))
+		self.food.type = Item.TYPE_DRINK
+		self.food.save()
+		order_item.refresh_from_db()
+		self.assertEqual((order_item.item_type, order_item.station), ("food", "kitchen"))
+
+	def test_lists_are_scoped_by_station_and_status(self):
+		waiting, ready = self.add_item(), self.add_item()
+		OrderItem.objects.filter(pk=ready.pk).update(status=OrderItem.STATUS_READY)
+		self.add_item(self.drink)
+		chef = self.client_for("chef")
+		self.assertEqual([row["id"] for row in chef.get("/api/kitchen/items/").data], [waiting.pk, ready.pk])
+		self.assertEqual([row["id"] for row in chef.get("/api/kitchen/items/", {"status": "ready"}).data], [ready.pk])
+		self.assertEqual(chef.get("/api/barista/items/").status_code, 403)
+
+
+class OrderReadTests(OrdersTestCase):
+	def count_queries(self, client, url, params=None):
+		# warm the per-process caches (estimates, menu version) first
+		client.get(url, params)
+		with CaptureQueriesContext(connection) as queries:
+			response = client.get(url, params)
+		self.assertEqual(response.status_code, 200)
+		return len(queries)
+
+	def test_compact_rows_are_flat(self):
+		order_item = self.add_item(quantity=3)
+		(row,) = self.client_for("chef").get("/api/kitchen/items/", {"view": "compact"}).data
+		self.assertEqual(set(row), {*COMPACT_ORDER_ITEM_FIELDS, "eta"})
+		self.assertEqual(
+			(row["id"], row["order"], row["session"], row["table"], row["item"], row["item_name"], row["quantity"]),
+			(order_item.pk, self.order.pk, self.session.pk, 1, self.food.pk, "Steak", 3),
+		)
+
+	def assertQueriesDoNotGrow(self, client, requests):
+		self.add_item()
+		few = [self.count_queries(client, url, params) for url, params in requests]
+		for _ in range(5):
+			self.add_item()
+			self.add_item(self.drink)
+		self.assertEqual([self.count_queries(client, url, params) for url, params in requests], few)
+
+	def test_station_list_queries_do_not_grow_with_items(self):
+		self.assertQueriesDoNotGrow(self.client_for("chef"), [("/api/kitchen/items/", None), ("/api/kitchen/items/", {"view": "compact"})])
+
+	def test_order_queries_do_not_grow_with_items(self):
+		url = f"/api/orders/{self.order.pk}/"
+		self.assertQueriesDoNotGrow(self.client_for("waiter"), [
+			(url, None),
+			(url, {"view": "compact"}),
+			("/api/orders/", {"ids": str(self.order.pk)}),
+			(f"/api/sessions/{self.session.pk}/orders/", None),
+		])
+
+	def test_order_list_needs_integer_ids(self):
+		waiter = self.client_for("waiter")
+		self.assertEqual(waiter.get("/api/orders/").status_code, 400)
+		self.assertEqual(waiter.get("/api/orders/", {"ids": "1,x"}).status_code, 400)
+		self.add_item()
+		(order,) = waiter.get("/api/orders/", {"ids": f"{self.order.pk},999"}).data
+		self.assertEqual(len(order["items"]), 1)
+
+
+class IdempotencyKeyTests(OrdersTestCase):
+	def post(self, username, url, body=None, key="key-1"):
+		return self.client_for(username).post(url, body, format="json", HTTP_IDEMPOTENCY_KEY=key)
+
+	def test_retry_replays_the_first_response(self):
+		url = f"/api/sessions/{self.session.pk}/orders/"
+		first = self.post("waiter", url)
+		retry = self.post("waiter", url)
+		self.assertEqual((first.status_code, retry.status_code), (201, 201))
+		self.assertEqual(retry.data, first.data)
+		self.assertEqual(retry["Idempotent-Replayed"], "true")
+		self.assertFalse(first.has_header("Idempotent-Replayed"))
+		self.assertEqual(Order.objects.count(), 2)
+
+	def test_keys_are_per_user_and_per_request(self):
+		url = f"/api/orders/{self.order.pk}/add-item/"
+		self.assertEqual(self.post("waiter", url, {"item_id": self.food.pk}).status_code, 201)
+		response = self.post("waiter", url, {"item_id": self.drink.pk})
+		self.assertEqual(response.status_code, 422)
+		self.post("admin", url, {"item_id": self.food.pk})
+		self.assertEqual(OrderItem.objects.count(), 2)
+		self.assertEqual(self.post("waiter", url, {"item_id": self.food.pk}, key="k" * 256).status_code, 400)
+
+	def test_client_errors_are_replayed(self):
+		url = f"/api/orders/{self.order.pk}/add-item/"
+		self.assertEqual(self.post("waiter", url, {"item_id": 999}).status_code, 404)
+		self.assertEqual(self.post("waiter", url, {"item_id": 999}).status_code, 404)
+		self.assertEqual(IdempotencyKey.objects.get().status_code, 404)
+
+	def test_server_errors_release_the_key_and_roll_back(self):
+		url = f"/api/sessions/{self.session.pk}/orders/"
+
+		def failing_post(view, request, pk):
+			Order.objects.create(session=self.session, created_by=request.user)
+			return Response({"detail": "Unavailable."}, status=503)
+
+		with mock.patch.object(CreateOrderForSessionAPIView, "post", failing_post):
+			self.assertEqual(self.post("waiter", url).status_code, 503)
+		self.assertEqual((Order.objects.count(), IdempotencyKey.objects.count()), (1, 0))
+		self.assertEqual(self.post("waiter", url).status_code, 201)
+		self.assertEqual(Order.objects.count(), 2)
+
+
+class OrderItemStatusUpdateTests(OrdersTestCase):
+	def test_counters_follow_the_stored_status(self):
+		order_item = self.add_item()
+		chef = self.client_for("chef")
+		url = f"/api/orders/items/{order_item.pk}/status/"
+		self.assertEqual(chef.patch(url, {"status": "served"}, format="json").status_code, 200)
+		self.assertEqual(chef.patch(url, {"status": "ready"}, format="json").status_code, 200)
+		self.assertEqual(station_counts("kitchen").get("served"), 0)
+		self.assertEqual(station_counts("kitchen").get("ready"), 1)
+		self.assertCountersMatchRows()
+
+	def test_other_station_is_forbidden(self):
+		order_item = self.add_item(self.drink)
+		response = self.client_for("chef").patch(f"/api/orders/items/{order_item.pk}/status/", {"status": "ready"}, format="json")
+		self.assertEqual(response.status_code, 403)
+		order_item.refresh_from_db()
+		self.assertEqual(order_item.status, OrderItem.STATUS_WAITING)
+
+	def test_invalid_status(self):
+		order_item = self.add_item()
+		response = self.client_for("chef").patch(f"/api/orders/items/{order_item.pk}/status/", {"status": "eaten"}, format="json")
+		self.assertEqual(response.status_code, 400)
+
+	def test_delete_after_update_keeps_counters(self):
+		order_item = self.add_item()
+		self.client_for("chef").patch(f"/api/orders/items/{order_item.pk}/status/", {"status": "ready"}, format="json")
+		response = self.client_for("admin").delete(f"/api/orders/items/{order_item.pk}/")
+		self.assertEqual(response.status_code, 204)
+		self.assertCountersMatchRows()
+		self.session.refresh_from_db()
+		self.assertEqual((self.session.subtotal, self.session.item_count), (Decimal("0.00"), 0))
+
+
+class SessionTotalsTests(OrdersTestCase):
+	def totals(self, session=None):
+		session = session or self.session
+		session.refresh_from_db()
+		return session.subtotal, session.item_count
+
+	def test_edits_adjust_the_running_totals(self):
+		order_item = self.add_item(quantity=2)
+		self.add_item(self.drink)
+		self.assertEqual(self.totals(), (Decimal("33.25"), 3))
+		order_item.quantity = 3
+		order_item.save()
+		self.assertEqual(self.totals(), (Decimal("48.25"), 4))
+		order_item.delete()
+		self.assertEqual(self.totals(), (Decimal("3.25"), 1))
+
+	def test_reconcile_command(self):
+		self.add_item(quantity=2)
+		empty = TableSession.open(Table.objects.create(number=2))
+		TableSession.objects.filter(pk=self.session.pk).update(subtotal=Decimal("1.00"), item_count=9)
+		TableSession.objects.filter(pk=empty.pk).update(subtotal=Decimal("5.00"))
+
+		out = StringIO()
+		call_command("reconcile_session_totals", "--check", stdout=out)
+		self.assertIn(f"session {self.session.pk}: stored 1.00 / 9 items, actual 30.00 / 2 items", out.getvalue())
+		self.assertIn("2 session(s) out of date.", out.getvalue())
+		self.assertEqual(self.totals(), (Decimal("1.00"), 9))
+
+		out = StringIO()
+		call_command("reconcile_session_totals", stdout=out)
+		self.assertIn("2 session(s) repaired.", out.getvalue())
+		self.assertEqual(self.totals(), (Decimal("30.00"), 2))
+		self.assertEqual(self.totals(empty), (Decimal("0.00"), 0))
+
+		out = StringIO()
+		call_command("reconcile_session_totals", stdout=out)
+		self.assertIn("All session totals match their order items.", out.getvalue())
+
+
+class StationDeltaSyncTests(OrdersTestCase):
+	def sync(self, since, **params):
+		response = self.client_for("chef").get("/api/kitchen/items/", {"since": since, **params})
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response["X-Sync-Cursor"], response.data["cursor"])
+		return response.data
+
+	def test_changes_after_the_cursor(self):
+		first, second = self.add_item(), self.add_item()
+		cursor = self.client_for("chef").get("/api/kitchen/items/")["X-Sync-Cursor"]
+		self.assertEqual(self.sync(cursor), {"cursor": cursor, "changed": [], "deleted": []})
+
+		third = self.add_item()
+		self.client_for("chef").patch("/api/orders/items/status/", {"ids": [first.pk], "status": "ready"}, format="json")
+		self.client_for("admin").delete(f"/api/orders/items/{second.pk}/")
+		self.add_item(self.drink)
+		data = self.sync(cursor)
+		self.assertEqual({row["id"] for row in data["changed"]}, {first.pk, third.pk})
+		self.assertEqual(data["deleted"], [second.pk])
+		self.assertEqual(int(data["cursor"]), OrderItemChange.objects.latest("id").pk)
+		self.assertEqual(self.sync(data["cursor"])["changed"], [])
+
+	def test_status_filter_is_ignored_and_table_filter_applies(self):
+		order_item = self.add_item()
+		cursor = changes.current_cursor()
+		self.client_for("chef").patch(f"/api/orders/items/{order_item.pk}/status/", {"status": "ready"}, format="json")
+		self.assertEqual([row["id"] for row in self.sync(cursor, status="waiting")["changed"]], [order_item.pk])
+		self.assertEqual(self.sync(cursor, table=2)["changed"], [])
+
+	def test_invalid_and_expired_cursors(self):
+		chef = self.client_for("chef")
+		for since in ("junk", "-1", "2020-01-01T00:00:00Z"):
+			self.assertEqual(chef.get("/api/kitchen/items/", {"since": since}).status_code, 400)
+		self.add_item()
+		cursor = changes.current_cursor()
+		self.add_item()
+		self.add_item()
+		OrderItemChange.objects.filter(pk__lte=cursor + 1).delete()
+		self.assertEqual(chef.get("/api/kitchen/items/", {"since": cursor}).status_code, 410)
+		self.assertEqual(chef.get("/api/kitchen/items/", {"since": cursor + 1}).status_code, 200)
+
+	def test_prune_keeps_the_newest_change(self):
+		self.add_item()
+		OrderItemChange.objects.update(changed_at=timezone.now() - OrderItemChange.RETENTION * 2)
+		cursor = changes.current_cursor()
+		with mock.patch.object(changes, "_pruned_at", 0.0):
+			changes.record_changes(OrderItemChange.KIND_UPDATED, [])
+		self.assertEqual(list(OrderItemChange.objects.values_list("pk", flat=True)), [cursor])
+		self.assertFalse(changes.cursor_expired(cursor))
+
+	def test_poller_publishes_logged_changes(self):
+		kept, removed = self.add_item(), self.add_item()
+		cursor = changes.current_cursor()
+		created = self.add_item()
+		self.client_for("chef").patch(f"/api/orders/items/{kept.pk}/status/", {"status": "ready"}, format="json")
+		removed_id = removed.pk
+		removed.delete()
+		with mock.patch.object(events.broker, "publish") as publish:
+			self.assertEqual(events.poller.poll(cursor), changes.current_cursor())
+		published = {(event["type"], event["id"]) for call in publish.call_args_list for event in call.args[0]}
+		self.assertEqual(published, {("created", created.pk), ("updated", kept.pk), ("deleted", removed_id)})
+
+
+class SyncOperationsTests(OrdersTestCase):
+	def sync(self, *operations):
+		response = self.client_for("waiter").post("/api/sync/", {"operations": list(operations)}, format="json")
+		self.assertEqual(response.status_code, 200)
+		return response.data
+
+	def test_replays_with_temp_ids(self):
+		table = Table.objects.create(number=2)
+		data = self.sync(
+			{"op": "open_session", "id": "s1", "table": table.pk},
+			{"op": "create_order", "id": "o1", "session": "s1"},
+			{"op": "add_items", "order": "o1", "items": [{"item_id": self.food.pk, "quantity": 2}]},
+			{"op": "request_bill", "session": "s1"},
+		)
+		self.assertEqual([result["status"] for result in data["results"]], [201, 201, 201, 200])
+		self.assertEqual(set(data["ids"]), {"s1", "o1"})
+		self.assertEqual(OrderItem.objects.get(order_id=data["ids"]["o1"]).quantity, 2)
+
+	def test_malformed_operations_get_fixed_messages(self):
+		table = Table.objects.create(number=2)
+		cases = [
+			(["open_session"], "Operation must be an object."),
+			({"op": ["open_session"], "table": table.pk}, "Unknown operation."),
+			({"op": "open_session", "id": 7, "table": table.pk}, "id must be a non-empty string temp id."),
+			({"op": "open_session", "id": "", "table": table.pk}, "id must be a non-empty string temp id."),
+			({"op": "open_session", "table": "t1"}, "table must be an id."),
+			({"op": "request_bill", "session": True}, "session must be an id or a temp id."),
+			({"op": "request_bill", "session": 2**64}, "session must be an id or a temp id."),
+			({"op": "add_item", "id": "x", "order": self.order.pk, "item_id": self.food.pk}, "add_item accepts only: item_id, note_to_chef, op, order, quantity."),
+		]
+		data = self.sync(*(operation for operation, _ in cases))
+		for result, (_, detail) in zip(data["results"], cases):
+			self.assertEqual((result["status"], result["data"]), (400, {"detail": detail}))
+		self.assertFalse(TableSession.objects.filter(table=table).exists())
+
+	def test_temp_ids_cannot_be_redefined(self):
+		first, second = Table.objects.create(number=2), Table.objects.create(number=3)
+		data = self.sync(
+			{"op": "open_session", "id": "s1", "table": first.pk},
+			{"op": "open_session", "id": "s1", "table": second.pk},
+			{"op": "create_order", "session": "s1"},
+		)
+		self.assertEqual([result["status"] for result in data["results"]], [201, 400, 201])
+		self.assertEqual(data["results"][1]["data"], {"detail": "Temp id 's1' is already defined."})
+		self.assertEqual(Order.objects.filter(session__table=first).count(), 1)
+
+	def test_invalid_body_values_are_reported_by_the_view(self):
+		data = self.sync({"op": "add_item", "order": self.order.pk, "item_id": self.food.pk, "quantity": "many"})
+		(result,) = data["results"]
+		self.assertEqual(result["status"], 400)
+		self.assertIn("quantity", result["data"])
+
+
+class StationRoutingTests(OrdersTestCase):
+	def setUp(self):
+		super().setUp()
+		self.grill = Station.objects.create(code="grill", name="Grill")
+		self.grill.categories.add(self.food.category)
+		self.grill.roles.add(self.roles["chef"])
+		self.pastry = Station.objects.create(code="pastry", name="Pastry")
+		self.pastry.items.add(self.food)
+
+	def test_item_beats_category_beats_type(self):
+		fries = Item.objects.create(category=self.food.category, name="Fries", price=Decimal("4.00"), type=Item.TYPE_FOOD)
+		soup = Item.objects.create(category=Category.objects.create(name="Soups"), name="Soup", price=Decimal("6.00"), type=Item.TYPE_FOOD)
+		self.assertEqual([self.add_item(item).station for item in (self.food, fries, soup, self.drink)], ["pastry", "grill", "kitchen", "barista"])
+
+	def test_routing_changes_apply_to_new_orders(self):
+		order_item = self.add_item()
+		self.pastry.items.remove(self.food)
+		self.assertEqual(self.add_item().station, "grill")
+		order_item.refresh_from_db()
+		self.assertEqual(order_item.station, "pastry")
+
+	def test_generic_station_endpoints(self):
+		chef = self.client_for("chef")
+		fries = Item.objects.create(category=self.food.category, name="Fries", price=Decimal("4.00"), type=Item.TYPE_FOOD)
+		order_item = self.add_item(fries)
+		self.assertEqual({row["code"] for row in chef.get("/api/stations/").data}, {"kitchen", "grill"})
+		self.assertEqual([row["id"] for row in chef.get("/api/stations/grill/items/").data], [order_item.pk])
+		self.assertEqual(chef.get("/api/stations/grill/dashboard/").data["grill"]["waiting"], 1)
+		self.assertEqual(chef.get("/api/stations/pastry/items/").status_code, 403)
+		self.assertEqual(chef.get("/api/stations/nope/items/").status_code, 404)
+		# the seeded admin role holds every code but is not is_admin
+		self.assertEqual({row["code"] for row in self.client_for("admin").get("/api/stations/").data}, {"kitchen", "barista"})
+		superuser = APIClient()
+		superuser.force_authenticate(User.objects.create_user(username="root", is_superuser=True))
+		self.assertEqual(len(superuser.get("/api/stations/").data), 4)
+
+
+class DefaultStationMigrationTests(TestCase):
+	def test_roles_are_matched_case_insensitively(self):
+		chef, waiter, barista = (Role.objects.create(name=name) for name in ("Chef", "WAITER", "barista"))
+		migration = importlib.import_module("orders_app.migrations.0005_station")
+		migration.create_default_stations(apps, None)
+		self.assertEqual(set(Station.objects.get(code="kitchen").roles.all()), {chef, waiter})
+		self.assertEqual(set(Station.objects.get(code="barista").roles.all()), {barista, waiter})
+
+
+class OrderItemBulkStatusUpdateTests(OrdersTestCase):
+	url = "/api/orders/items/status/"
+
+	def test_body_must_be_an_object(self):
+		chef = self.client_for("chef")
+		for body in ([1, 2], "ready", 3):
+			response = chef.patch(self.url, body, format="json")
+			self.assertEqual(response.status_code, 400)
+			self.assertEqual(response.data, {"detail": "Body must be an object with ids and status."})
+
+	def test_updates_allowed_rows_and_logs_transitions(self):
+		food, drink = self.add_item(), self.add_item(self.drink)
+		response = self.client_for("chef").patch(self.url, {"ids": [food.pk, drink.pk, 999], "status": "ready"}, format="json")
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response.data["updated"], [food.pk])
+		self.assertEqual([row["id"] for row in response.data["rejected"]], [drink.pk, 999])
+		self.assertCountersMatchRows()
+		transition = OrderItemTransition.objects.get()
+		self.assertEqual(
+			(transition.order_item_id, transition.item_id, transition.category_id, transition.station, transition.from_status, transition.to_status),
+			(food.pk, self.food.pk, self.food.category_id, "kitchen", "waiting", "ready"),
+		)
+
+
+class EtaEstimatorTests(OrdersTestCase):
+	def setUp(self):
+		super().setUp()
+		Station.objects.filter(code="kitchen").update(capacity=1)
+		now = timezone.now()
+		OrderItemTransition.objects.bulk_create(
+			OrderItemTransition(
+				order_item_id=1000 + i, item_id=self.food.pk, category_id=self.food.category_id, station="kitchen",
+				from_status="in_progress", to_status="ready", changed_at=now, hour=12, duration=duration,
+				duration_bin=duration_bin(duration),
+			)
+			for i, duration in enumerate((200.0, 400.0))
+		)
+		self.addCleanup(estimator.invalidate)
+		station_router.invalidate()
+		estimator.invalidate()
+
+	def test_queue_is_simulated_with_the_station_capacity(self):
+		started = self.add_item()
+		OrderItem.objects.filter(pk=started.pk).update(status="in_progress", status_changed_at=timezone.now() - timedelta(seconds=100))
+		first, second = self.add_item(), self.add_item()
+		estimator.invalidate()
+		now = timezone.now()
+		etas = [(estimator.eta(order_item.pk) - now).total_seconds() for order_item in (started, first, second)]
+		for eta, expected in zip(etas, (200, 500, 800)):
+			self.assertAlmostEqual(eta, expected, delta=5)
+
+	def test_finished_items_have_no_eta(self):
+		order_item = self.add_item()
+		self.client_for("chef").patch(f"/api/orders/items/{order_item.pk}/status/", {"status": "ready"}, format="json")
+		estimator.invalidate()
+		self.assertIsNone(estimator.eta(order_item.pk))
+		self.assertIsNone(self.client_for("chef").get("/api/kitchen/items/").data[0]["eta"])
+
+
+class StationETagTests(OrdersTestCase):
+	def assertNotModified(self, client, url, etag, params=None):
+		response = client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(response.status_code, 304)
+		self.assertEqual(response["ETag"], etag)
+
+	def test_station_list_etag_follows_writes(self):
+		chef = self.client_for("chef")
+		order_item = self.add_item()
+		etag = chef.get("/api/kitchen/items/")["ETag"]
+		self.assertNotModified(chef, "/api/kitchen/items/", etag)
+		self.assertNotEqual(chef.get("/api/kitchen/items/", {"status": "waiting"})["ETag"], etag)
+
+		self.add_item(self.drink)
+		self.assertNotModified(chef, "/api/kitchen/items/", etag)
+		chef.patch(f"/api/orders/items/{order_item.pk}/status/", {"status": "ready"}, format="json")
+		response = chef.get("/api/kitchen/items/", HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(response.status_code, 200)
+
+		etag = response["ETag"]
+		order_item.delete()
+		self.assertEqual(chef.get("/api/kitchen/items/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+	def test_dashboard_etag_follows_counts(self):
+		chef = self.client_for("chef")
+		etag = chef.get("/api/kitchen/dashboard/")["ETag"]
+		self.assertNotModified(chef, "/api/kitchen/dashboard/", etag)
+		self.add_item()
+		self.assertEqual(chef.get("/api/kitchen/dashboard/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class StationDashboardTests(OrdersTestCase):
+	def test_counts_come_from_the_counters(self):
+		first, second = self.add_item(), self.add_item()
+		self.add_item(self.drink)
+		self.client_for("chef").patch("/api/orders/items/status/", {"ids": [first.pk], "status": "in_progress"}, format="json")
+		second.delete()
+		chef = self.client_for("chef")
+		with self.assertNumQueries(1):
+			response = chef.get("/api/kitchen/dashboard/")
+		self.assertEqual(response.data["food"], {"waiting": 0, "in_progress": 1, "ready": 0, "total_pending": 1})
+		self.assertEqual(chef.get("/api/stations/kitchen/dashboard/", {"status": "waiting"}).data["kitchen"]["in_progress"], 0)
+		self.assertCountersMatchRows()
+
+	def test_rebuild_command_repairs_drift(self):
+		self.add_item()
+		StationCounter.objects.filter(station="kitchen").update(count=7)
+		call_command("rebuild_station_counters", stdout=StringIO())
+		self.assertCountersMatchRows()
+
+
+class PrepTimeAnalyticsAPITests(OrdersTestCase):
+	url = "/api/analytics/prep-times/"
+
+	def test_status_updates_are_measured(self):
+		order_item = self.add_item()
+		chef = self.client_for("chef")
+		chef.patch(f"/api/orders/items/{order_item.pk}/status/", {"status": "in_progress"}, format="json")
+		chef.patch("/api/orders/items/status/", {"ids": [order_item.pk], "status": "ready"}, format="json")
+		superuser = APIClient()
+		superuser.force_authenticate(User.objects.create_user(username="root", is_superuser=True))
+		response = superuser.get(self.url, {"by": "station"})
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(set(response.data), {"from", "to", "station"})
+		self.assertEqual(
+			sorted((row["station"], row["status"], row["count"]) for row in response.data["station"]),
+			[("kitchen", "in_progress", 1), ("kitchen", "waiting", 1)],
+		)
+		(row,) = superuser.get(self.url, {"by": "item", "status": "waiting"}).data["item"]
+		self.assertEqual((row["item"], row["count"]), (self.food.pk, 1))
+
+	def test_admin_only_and_validated(self):
+		self.assertEqual(self.client_for("chef").get(self.url).status_code, 403)
+		superuser = APIClient()
+		superuser.force_authenticate(User.objects.create_user(username="root", is_superuser=True))
+		for params in ({"from": "2026-02-01", "to": "2026-01-01"}, {"from": "yesterday"}, {"by": "table"}):
+			self.assertEqual(superuser.get(self.url, params).status_code, 400)
+
+
+class PrepTimeAnalyticsTests(TestCase):
+	def setUp(self):
+		self.now = timezone.now()
+		self.transitions = []
+		for day in range(4):
+			for i in range(50):
+				duration = 60.0 + 10 * i + day
+				self.transitions.append(OrderItemTransition(
+					order_item_id=day * 100 + i,
+					item_id=1 + i % 2,
+					category_id=1,
+					station="kitchen",
+					from_status="in_progress",
+					to_status="ready",
+					changed_at=self.now - timedelta(days=day, minutes=i),
+					hour=12,
+					duration=duration,
+					duration_bin=duration_bin(duration),
+				))
+		OrderItemTransition.objects.bulk_create(self.transitions)
+
+	def exact(self, durations, p):
+		durations = sorted(durations)
+		return durations[max(1, -(-p * len(durations) // 100)) - 1]
+
+	def test_closed_days_are_rolled_up_once(self):
+		since = self.now - timedelta(days=10)
+		result = time_in_state(since, self.now + timedelta(seconds=1))
+		self.assertTrue(OrderItemTransitionRollup.objects.exists())
+		self.assertEqual(sum(row["count"] for row in result["item"]), 200)
+		self.assertEqual(time_in_state(since, self.now + timedelta(seconds=1)), result)
+
+		(station,) = result["station"]
+		durations = [t.duration for t in self.transitions]
+		for p in (50, 90, 99):
+			self.assertAlmostEqual(station[f"p{p}"], self.exact(durations, p), delta=self.exact(durations, p) * 0.05)
+
+	def test_statuses_filter_rollups(self):
+		since = self.now - timedelta(days=10)
+		time_in_state(since, self.now)
+		result = time_in_state(since, self.now, statuses=["waiting"])
+		self.assertEqual(result["item"], [])
+
+	def test_editing_a_past_transition_rebuilds_its_day(self):
+		since = self.now - timedelta(days=10)
+		before = time_in_state(since, self.now + timedelta(seconds=1), groupings=("station",))
+		OrderItemTransition.objects.filter(changed_at__lt=self.now - timedelta(days=2)).first().delete()
+		after = time_in_state(since, self.now + timedelta(seconds=1), groupings=("station",))
+		self.assertEqual(after["station"][0]["count"], before["station"][0]["count"] - 1)
@@ -0,0 +1,264 @@
+"""OrderItem status transition log and the prep-time percentiles built from it.
+
+Writers append one OrderItemTransition per status change inside the transaction
+that changes the status, with the logarithmic duration bin it falls in. The
+analytics never load the log itself: they work on duration histograms (row count
+and summed duration per bin) per item, category, station and status, and per
+hour and status. Every local day that is over is grouped once into an
+OrderItemTransitionRollup; the partial days at either end of a range are grouped
+by the database from the ``transition_histogram`` index. Percentiles are read
+off the cumulative bin counts, so the work depends on the number of days, keys
+and bins, not on the number of transitions.
+"""
+import math
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from menu_app.models import Category, Item as MenuItem
+from .models import OrderItemTransition, OrderItemTransitionRollup
+
+
+PERCENTILES = (50, 90, 99)
+# grouping name -> transition column it groups by
+GROUPINGS = {"item": "item_id", "category": "category_id", "station": "station", "hour": "hour"}
+# rollup kind -> transition columns its histograms are keyed by
+ROLLUP_COLUMNS = {
+	OrderItemTransitionRollup.KIND_ITEM: ("item_id", "category_id", "station"),
+	OrderItemTransitionRollup.KIND_HOUR: ("hour",),
+}
+# histogram bins per unit of ln(1 + seconds): each bin spans about 5% of its durations
+BINS_PER_LOG_UNIT = 20
+# a day is rolled up once it has been over this long, so transactions open at midnight are in
+ROLLUP_DELAY = timedelta(minutes=10)
+
+
+def duration_bin(duration):
+	"""Histogram bin of a duration in seconds, stored on the transition when it is logged."""
+	return math.floor(math.log1p(max(duration, 0.0)) * BINS_PER_LOG_UNIT)
+
+
+def _transition(order_item_id, item_id, category_id, station, from_status, to_status, entered_at, changed_at):
+	duration = (changed_at - entered_at).total_seconds()
+	return OrderItemTransition(
+		order_item_id=order_item_id,
+		item_id=item_id,
+		category_id=category_id,
+		station=station,
+		from_status=from_status,
+		to_status=to_status,
+		changed_at=changed_at,
+		hour=timezone.localtime(entered_at).hour,
+		duration=duration,
+		duration_bin=duration_bin(duration),
+	)
+
+
+def log_transition(order_item, from_status, left_status_at):
+	"""Append the transition of a saved OrderItem from ``from_status`` to its current status."""
+	_transition(
+		order_item.pk,
+		order_item.item_id,
+		order_item.item.category_id,
+		order_item.station,
+		from_status,
+		order_item.status,
+		left_status_at,
+		order_item.status_changed_at,
+	).save()
+
+
+def log_bulk_transitions(rows, new_status, changed_at):
+	"""Append transitions for OrderItem ``rows`` read before a bulk status update.
+
+	Rows are named tuples (``values_list(..., named=True)``) with the item's ``id``,
+	``item_id``, ``category_id``, ``station``, ``status`` and ``status_changed_at``.
+	"""
+	OrderItemTransition.objects.bulk_create(
+		_transition(row.id, row.item_id, row.category_id, row.station, row.status, new_status, row.status_changed_at, changed_at)
+		for row in rows
+		if row.status != new_status
+	)
+
+
+def _histograms(qs, columns, histograms):
+	"""Add the histograms of ``qs`` keyed by (*columns values, from_status) to ``histograms``."""
+	rows = qs.values(*columns, "from_status", "duration_bin").annotate(count=Count("*"), total=Sum("duration"))
+	sparse = defaultdict(dict)
+	for *key, from_status, bin_, count, total in rows.values_list(*columns, "from_status", "duration_bin", "count", "total"):
+		sparse[(*key, from_status)][bin_] = (count, total)
+	for key, bins in sparse.items():
+		first = min(bins)
+		counts = [0] * (max(bins) - first + 1)
+		sums = [0.0] * len(counts)
+		for bin_, (count, total) in bins.items():
+			counts[bin_ - first] = count
+			sums[bin_ - first] = total
+		_add(histograms, key, first, counts, sums)
+
+
+def _add(histograms, key, first, counts, sums):
+	"""Add a histogram to ``histograms[key]``.
+
+	Histograms are dense: [first bin, row count per bin from it, summed duration per bin].
+	"""
+	entry = histograms.get(key)
+	if entry is None:
+		histograms[key] = [first, list(counts), list(sums)]
+		return
+	start, have_counts, have_sums = entry
+	if first < start:
+		have_counts[:0] = [0] * (start - first)
+		have_sums[:0] = [0.0] * (start - first)
+		entry[0] = start = first
+	missing = first + len(counts) - start - len(have_counts)
+	if missing > 0:
+		have_counts.extend([0] * missing)
+		have_sums.extend([0.0] * missing)
+	window = slice(first - start, first - start + len(counts))
+	have_counts[window] = [a + b for a, b in zip(have_counts[window], counts)]
+	have_sums[window] = [a + b for a, b in zip(have_sums[window], sums)]
+
+
+def _merge(histograms, position):
+	"""Sum the histograms whose keys share the value at ``position`` (and the status)."""
+	merged = {}
+	for key, (first, counts, sums) in histograms.items():
+		_add(merged, (key[position], key[-1]), first, counts, sums)
+	return merged
+
+
+def _kind(grouping):
+	"""The rollup kind whose histograms are keyed by ``grouping``."""
+	return OrderItemTransitionRollup.KIND_HOUR if grouping == "hour" else OrderItemTransitionRollup.KIND_ITEM
+
+
+def _day_start(day):
+	return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _closed_days(since, until):
+	"""(first, last) local days lying entirely in [since, until) and over for ROLLUP_DELAY, or None."""
+	first = timezone.localtime(since).date()
+	if _day_start(first) < since:
+		first += timedelta(days=1)
+	last = timezone.localtime(min(until, timezone.now() - ROLLUP_DELAY)).date() - timedelta(days=1)
+	return (first, last) if first <= last else None
+
+
+def forget_rollups(changed_at):
+	"""Drop the rollups of the day ``changed_at`` falls in if it is over, so they are rebuilt."""
+	day = timezone.localtime(changed_at).date()
+	if day < timezone.localdate():
+		OrderItemTransitionRollup.objects.filter(day=day).delete()
+
+
+def _build_rollups(kind, days):
+	"""Group the transitions of each local day in ``days`` into a ``kind`` rollup."""
+	rollups = []
+	for day in days:
+		histograms = {}
+		qs = OrderItemTransition.objects.filter(
+			changed_at__gte=_day_start(day), changed_at__lt=_day_start(day + timedelta(days=1))
+		).order_by()
+		_histograms(qs, ROLLUP_COLUMNS[kind], histograms)
+		# sums to a tenth of a second keep the JSON short
+		data = [[*key, first, counts, [round(total, 1) for total in sums]] for key, (first, counts, sums) in histograms.items()]
+		rollups.append(OrderItemTransitionRollup(day=day, kind=kind, histograms=data))
+	# another request may have built the same days meanwhile
+	OrderItemTransitionRollup.objects.bulk_create(rollups, ignore_conflicts=True)
+
+
+def _add_rollups(kind, first, last, statuses, histograms):
+	"""Add the ``kind`` rollups of the days ``first`` to ``last`` to ``histograms``, building missing ones."""
+	rollups = OrderItemTransitionRollup.objects.filter(kind=kind, day__range=(first, last))
+	built = set(rollups.values_list("day", flat=True))
+	days = (first + timedelta(days=offset) for offset in range((last - first).days + 1))
+	missing = [day for day in days if day not in built]
+	if missing:
+		_build_rollups(kind, missing)
+	for data in rollups.values_list("histograms", flat=True):
+		for *key, from_status, first_bin, counts, sums in data:
+			if statuses and from_status not in statuses:
+				continue
+			_add(histograms, (*key, from_status), first_bin, counts, sums)
+
+
+def _percentiles(histogram):
+	"""Count and nearest-rank percentiles of a dense histogram (see ``_add``).
+
+	The value reported for a rank is the mean duration of its bin, within about 5%
+	of the exact percentile.
+	"""
+	_first, counts, sums = histogram
+	total = sum(counts)
+	ranks = sorted((max(1, math.ceil(p / 100 * total)), p) for p in PERCENTILES)
+	values = {}
+	seen = 0
+	for count, duration_sum in zip(counts, sums):
+		if not count:
+			continue
+		seen += count
+		while ranks and ranks[0][0] <= seen:
+			values[ranks.pop(0)[1]] = duration_sum / count
+	return total, values
+
+
+def _sort_key(entry):
+	key, from_status = entry[0]
+	return (key is None, 0 if key is None else key, from_status)
+
+
+def time_in_state(since, until, statuses=None, groupings=tuple(GROUPINGS)):
+	"""Return {grouping: [row, ...]} with count and p50/p90/p99 seconds spent per status.
+
+	Rows are keyed by the grouping value (menu item id, category id, station code or
+	local hour of day the state was entered) and the status the item was in.
+	"""
+	qs = OrderItemTransition.objects.order_by()
+	if statuses:
+		qs = qs.filter(from_status__in=statuses)
+	# whole days that are over come from the rollups, the rest of the range from the log
+	days = _closed_days(since, until)
+	if days:
+		first, last = days
+		qs = qs.filter(
+			Q(changed_at__gte=since, changed_at__lt=_day_start(first))
+			| Q(changed_at__gte=_day_start(last + timedelta(days=1)), changed_at__lt=until)
+		)
+	else:
+		qs = qs.filter(changed_at__gte=since, changed_at__lt=until)
+
+	# item, category and station share one histogram per item: an item rarely changes category or station
+	by_kind = {}
+	for kind in {_kind(grouping) for grouping in groupings}:
+		by_kind[kind] = {}
+		_histograms(qs, ROLLUP_COLUMNS[kind], by_kind[kind])
+		if days:
+			_add_rollups(kind, first, last, statuses, by_kind[kind])
+	histograms = {}
+	for grouping in groupings:
+		kind = _kind(grouping)
+		histograms[grouping] = _merge(by_kind[kind], ROLLUP_COLUMNS[kind].index(GROUPINGS[grouping]))
+
+	names = {}
+	if "item" in groupings:
+		names["item"] = dict(MenuItem.objects.values_list("id", "name"))
+	if "category" in groupings:
+		names["category"] = dict(Category.objects.values_list("id", "name"))
+
+	result = {}
+	for grouping in groupings:
+		summary = []
+		for (key, from_status), histogram in sorted(histograms[grouping].items(), key=_sort_key):
+			count, values = _percentiles(histogram)
+			row = {grouping: key, "status": from_status, "count": count}
+			if grouping in names:
+				row["name"] = names[grouping].get(key)
+			for p in PERCENTILES:
+				row[f"p{p}"] = round(values[p], 1)
+			summary.append(row)
+		result[grouping] = summary
+	return result
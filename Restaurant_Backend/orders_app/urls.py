@@ -3,12 +3,23 @@ from . import views
 
 urlpatterns = [
     path("sessions/<int:pk>/orders/", views.CreateOrderForSessionAPIView.as_view(), name="create-order-for-session"),
+    path("orders/", views.OrderListAPIView.as_view(), name="order-list"),
     path("orders/<int:pk>/", views.OrderRetrieveAPIView.as_view(), name="order-detail"),
     path("orders/<int:pk>/add-item/", views.AddItemToOrderAPIView.as_view(), name="order-add-item"),
+    path("orders/<int:pk>/add-items/", views.AddItemsToOrderAPIView.as_view(), name="order-add-items"),
+    path("orders/items/status/", views.OrderItemBulkStatusUpdateAPIView.as_view(), name="order-items-status"),
     path("orders/items/<int:pk>/status/", views.OrderItemStatusUpdateAPIView.as_view(), name="order-item-status"),
     path("orders/items/<int:pk>/", views.OrderItemDeleteAPIView.as_view(), name="order-item-delete"),
     path("kitchen/items/", views.KitchenOrderItemListAPIView.as_view(), name="kitchen-items"),
     path("kitchen/dashboard/", views.KitchenDashboardAPIView.as_view(), name="kitchen-dashboard"),
+    path("kitchen/stream/", views.KitchenOrderItemStreamView.as_view(), name="kitchen-stream"),
     path("barista/items/", views.BaristaOrderItemListAPIView.as_view(), name="barista-items"),
     path("barista/dashboard/", views.BaristaDashboardAPIView.as_view(), name="barista-dashboard"),
+    path("barista/stream/", views.BaristaOrderItemStreamView.as_view(), name="barista-stream"),
+    path("sync/", views.SyncOperationsAPIView.as_view(), name="sync-operations"),
+    path("analytics/prep-times/", views.PrepTimeAnalyticsAPIView.as_view(), name="prep-time-analytics"),
+    path("stations/", views.StationListAPIView.as_view(), name="station-list"),
+    path("stations/<slug:code>/items/", views.StationOrderItemListAPIView.as_view(), name="station-items"),
+    path("stations/<slug:code>/dashboard/", views.StationDashboardAPIView.as_view(), name="station-dashboard"),
+    path("stations/<slug:code>/stream/", views.StationOrderItemStreamView.as_view(), name="station-stream"),
 ]
@@ -1,36 +1,135 @@
+import asyncio
+import json
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import APIException, AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken
 from django.shortcuts import get_object_or_404
 from rest_framework.views import APIView
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
-from django.db.models import Count
-
-from accounts_app.permissions import IsAdminRole
-from .models import Order, OrderItem
-from .serializers import OrderSerializer, OrderItemSerializer
+from django.utils.dateparse import parse_date, parse_datetime
+from django.views import View
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Max, Prefetch, Q, Value, When
+
+from accounts_app.authentication import CachedJWTAuthentication
+from accounts_app.permissions import HasPermissionCode, IsAdminRole
+from menu_app.catalog import catalog as menu_catalog
+from menu_app.models import menu_version
+from Restaurant_Backend.etags import make_etag, not_modified
+from Restaurant_Backend.idempotency import IdempotentAPIViewMixin
+from .changes import changes_since, current_cursor, cursor_expired, record_changes
+from .counters import adjust_counters, adjust_session_totals, count_created, count_status_change, session_totals_created, station_counts
+from .eta import estimator
+from .events import EVENT_CREATED, EVENT_RESYNC, EVENT_UPDATED, broker, poller, publish_order_items
+from .models import Order, OrderItem, OrderItemChange, OrderItemDeletion
+from .serializers import OrderSerializer, OrderItemSerializer, OrderItemLineSerializer, StationSerializer, compact_order_items
+from .stations import router as station_router, user_can_update_station, user_can_view_station
+from .transitions import GROUPINGS, log_bulk_transitions, time_in_state
 from tables_app.models import TableSession
-from menu_app.models import Item as MenuItem
+from tables_app.views import OpenSessionAPIView, RequestBillAPIView
+
+
+def _wants_compact(request):
+	"""?view=compact selects the flat .values() projection instead of nested serializers."""
+	return request.query_params.get("view") == "compact"
+
+
+def _order_item_rows(request, qs):
+	if _wants_compact(request):
+		return compact_order_items(qs)
+	return OrderItemSerializer(qs, many=True).data
+
+
+def _since_param(request):
+	"""Return (since, error_response) for the optional ?since= cursor (an OrderItemChange id)."""
+	since_param = request.query_params.get("since")
+	if not since_param:
+		return None, None
+	try:
+		since = int(since_param)
+	except ValueError:
+		since = -1
+	if since < 0:
+		return None, Response({"detail": "Invalid since cursor."}, status=status.HTTP_400_BAD_REQUEST)
+	if cursor_expired(since):
+		return None, Response({"detail": "Cursor expired, reload the full list."}, status=status.HTTP_410_GONE)
+	return since, None
+
+
+def _station_list_etag(request, code):
+	"""ETag for a full station list: latest change and deletion at the station, the menu
+	(nested item data), the station's ready-time estimates (they move with time, not
+	only with writes) and the query string. Both aggregates are index-only."""
+	changed = OrderItem.objects.filter(station=code).aggregate(m=Max("updated_at"))["m"]
+	deleted = OrderItemDeletion.objects.filter(station=code).aggregate(m=Max("deleted_at"))["m"]
+	etas = estimator.station_version(code)
+	return make_etag("station-items", code, changed, deleted, menu_version(), etas, request.query_params.urlencode())
+
+
+def _station_changes_response(request, code, qs, deletions, since, cursor):
+	changed_ids, deleted_ids = changes_since(since, cursor, stations=[code])
+	changed = qs.filter(pk__in=list(changed_ids)).order_by("updated_at")
+	# the tombstones carry the session and table the filters need
+	deleted = deletions.filter(order_item_id__in=deleted_ids).values_list("order_item_id", flat=True)
+	data = {
+		"cursor": str(cursor),
+		"changed": _order_item_rows(request, changed),
+		"deleted": list(deleted),
+	}
+	response = Response(data, status=status.HTTP_200_OK)
+	response["X-Sync-Cursor"] = data["cursor"]
+	return response
+
+
+def _orders_with_items(queryset):
+	"""Attach items (with item and category) so an order tree serializes in a fixed number of queries."""
+	return queryset.prefetch_related(
+		Prefetch("items", queryset=OrderItem.objects.select_related("item__category").order_by("created_at"))
+	)
+
+
+def _compact_orders(orders):
+	"""Flat payload for ?view=compact: one query for all the orders' items."""
+	orders = list(orders)
+	by_order = {order.id: [] for order in orders}
+	for row in compact_order_items(OrderItem.objects.filter(order_id__in=list(by_order)).order_by("created_at")):
+		by_order[row["order"]].append(row)
+	return [
+		{
+			"id": order.id,
+			"session": order.session_id,
+			"created_by": order.created_by_id,
+			"created_at": order.created_at,
+			"items": by_order[order.id],
+		}
+		for order in orders
+	]
 
 
-def _user_has_role(user, role_name):
-	if not user or not user.is_authenticated:
-		return False
-	if getattr(user, "is_superuser", False):
-		return True
-	role = getattr(user, "role", None)
-	return bool(role and getattr(role, "name", "").lower() == role_name.lower())
-
+class CreateOrderForSessionAPIView(IdempotentAPIViewMixin, generics.ListCreateAPIView):
+	"""GET lists every order of the session with its items; POST opens a new order."""
 
-class CreateOrderForSessionAPIView(generics.CreateAPIView):
 	serializer_class = OrderSerializer
-	permission_classes = (IsAuthenticated,)
+	permission_classes = (IsAuthenticated, HasPermissionCode)
+	required_permission = {"POST": "orders_create"}
+	permission_denied_message = "You do not have permission to create orders."
 
-	def post(self, request, pk):
-		# Only waiters (or admin) can create orders for a session
-		if not _user_has_role(request.user, "waiter") and not getattr(request.user, "is_superuser", False) and not getattr(getattr(request.user, 'role', None), 'is_admin', False):
-			return Response({"detail": "You do not have permission to create orders."}, status=status.HTTP_403_FORBIDDEN)
+	def get(self, request, pk):
+		session = get_object_or_404(TableSession, pk=pk)
+		orders = Order.objects.filter(session=session)
+		if _wants_compact(request):
+			return Response(_compact_orders(orders), status=status.HTTP_200_OK)
+		serializer = OrderSerializer(_orders_with_items(orders), many=True)
+		return Response(serializer.data, status=status.HTTP_200_OK)
 
+	def post(self, request, pk):
 		session = get_object_or_404(TableSession, pk=pk)
 		if session.status != TableSession.STATUS_ACTIVE:
 			return Response({"detail": "Session is not active."}, status=status.HTTP_400_BAD_REQUEST)
@@ -41,104 +140,300 @@ class CreateOrderForSessionAPIView(generics.CreateAPIView):
 		return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
+class OrderListAPIView(generics.ListAPIView):
+	"""GET /api/orders/?ids=1,2,3 - several orders with their items in one call."""
+
+	serializer_class = OrderSerializer
+	permission_classes = (IsAuthenticated,)
+
+	def get(self, request):
+		ids_param = request.query_params.get("ids", "")
+		try:
+			ids = [int(i) for i in ids_param.split(",") if i.strip()]
+		except ValueError:
+			return Response({"detail": "ids must be a comma separated list of integers."}, status=status.HTTP_400_BAD_REQUEST)
+		if not ids:
+			return Response({"detail": "ids is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+		orders = Order.objects.filter(pk__in=ids)
+		if _wants_compact(request):
+			return Response(_compact_orders(orders), status=status.HTTP_200_OK)
+		serializer = OrderSerializer(_orders_with_items(orders), many=True)
+		return Response(serializer.data, status=status.HTTP_200_OK)
+
+
 class OrderRetrieveAPIView(generics.RetrieveAPIView):
-	queryset = Order.objects.all()
+	queryset = _orders_with_items(Order.objects.all())
 	serializer_class = OrderSerializer
 	permission_classes = (IsAuthenticated,)
 
+	def retrieve(self, request, *args, **kwargs):
+		if not _wants_compact(request):
+			return super().retrieve(request, *args, **kwargs)
+		order = get_object_or_404(Order, pk=kwargs["pk"])
+		return Response(_compact_orders([order])[0], status=status.HTTP_200_OK)
 
-class AddItemToOrderAPIView(generics.CreateAPIView):
+
+class AddItemToOrderAPIView(IdempotentAPIViewMixin, generics.CreateAPIView):
 	serializer_class = OrderItemSerializer
-	permission_classes = (IsAuthenticated,)
+	permission_classes = (IsAuthenticated, HasPermissionCode)
+	required_permission = "orders_add_item"
+	permission_denied_message = "You do not have permission to add items."
 
 	def post(self, request, pk):
 		# pk is order id
 		order = get_object_or_404(Order, pk=pk)
 
-		# Only waiter or admin can add items
-		if not _user_has_role(request.user, "waiter") and not getattr(request.user, "is_superuser", False) and not getattr(getattr(request.user, 'role', None), 'is_admin', False):
-			return Response({"detail": "You do not have permission to add items."}, status=status.HTTP_403_FORBIDDEN)
+		# same line rules as add-items (integer item_id, quantity >= 1)
+		line_serializer = OrderItemLineSerializer(data=request.data)
+		line_serializer.is_valid(raise_exception=True)
+		line = line_serializer.validated_data
 
-		item_id = request.data.get("item_id")
-		quantity = int(request.data.get("quantity", 1))
-		note = request.data.get("note_to_chef", "")
-
-		menu_item = get_object_or_404(MenuItem, pk=item_id)
+		# availability, price and type come from the in-process menu catalog
+		menu_item = menu_catalog.get(line["item_id"])
+		if menu_item is None:
+			raise Http404("No Item matches the given query.")
 		if not menu_item.available:
 			return Response({"detail": "Item is not available."}, status=status.HTTP_400_BAD_REQUEST)
 
 		order_item = OrderItem(
 			order=order,
-			item=menu_item,
-			quantity=quantity,
-			note_to_chef=note,
+			item=menu_item.to_instance(),
+			quantity=line["quantity"],
+			note_to_chef=line["note_to_chef"],
 			price_snapshot=menu_item.price,
+			item_type=menu_item.type,
+			station=station_router.route(menu_item),
 		)
-		order_item.save()
+		with transaction.atomic():
+			order_item.save()
 
 		serializer = OrderItemSerializer(order_item)
 		return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
-class OrderItemStatusUpdateAPIView(generics.UpdateAPIView):
+class AddItemsToOrderAPIView(IdempotentAPIViewMixin, generics.CreateAPIView):
+	"""POST /api/orders/{id}/add-items/ - add several lines to an order at once.
+
+	Body is a list of {"item_id", "quantity", "note_to_chef"} objects (or {"items": [...]}).
+	All lines are validated up front and inserted in one transaction; if any line is
+	rejected nothing is written.
+	"""
+
+	serializer_class = OrderItemLineSerializer
+	permission_classes = (IsAuthenticated, HasPermissionCode)
+	required_permission = "orders_add_item"
+	permission_denied_message = "You do not have permission to add items."
+
+	def post(self, request, pk):
+		lines = request.data.get("items") if isinstance(request.data, dict) else request.data
+		if not isinstance(lines, list) or not lines:
+			return Response({"detail": "items must be a non-empty list."}, status=status.HTTP_400_BAD_REQUEST)
+
+		line_serializer = OrderItemLineSerializer(data=lines, many=True)
+		line_serializer.is_valid(raise_exception=True)
+		lines = line_serializer.validated_data
+
+		order = get_object_or_404(Order, pk=pk)
+
+		# Resolve every referenced menu item from the catalog (unknown ids with a single IN query)
+		menu_items = menu_catalog.get_many({line["item_id"] for line in lines})
+		errors = []
+		for index, line in enumerate(lines):
+			menu_item = menu_items.get(line["item_id"])
+			if menu_item is None:
+				errors.append({"index": index, "item_id": line["item_id"], "detail": "Item not found."})
+			elif not menu_item.available:
+				errors.append({"index": index, "item_id": line["item_id"], "detail": "Item is not available."})
+		if errors:
+			return Response({"detail": "Some items could not be added.", "errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+		instances = {item_id: menu_item.to_instance() for item_id, menu_item in menu_items.items()}
+		order_items = [
+			OrderItem(
+				order=order,
+				item=instances[line["item_id"]],
+				quantity=line["quantity"],
+				note_to_chef=line["note_to_chef"],
+				price_snapshot=menu_items[line["item_id"]].price,
+				item_type=menu_items[line["item_id"]].type,
+				station=station_router.route(menu_items[line["item_id"]]),
+			)
+			for line in lines
+		]
+		with transaction.atomic():
+			OrderItem.objects.bulk_create(order_items)
+			adjust_counters(count_created(order_items))
+			adjust_session_totals(session_totals_created(order.session_id, order_items))
+			record_changes(OrderItemChange.KIND_CREATED, [(oi.pk, oi.station) for oi in order_items])
+			publish_order_items(EVENT_CREATED, [oi.pk for oi in order_items])
+
+		serializer = OrderItemSerializer(order_items, many=True)
+		return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class OrderItemStatusUpdateAPIView(IdempotentAPIViewMixin, generics.UpdateAPIView):
 	queryset = OrderItem.objects.all()
 	serializer_class = OrderItemSerializer
-	permission_classes = (IsAuthenticated,)
+	permission_classes = (IsAuthenticated, HasPermissionCode)
+	required_permission = "orders_update_item_status"
+	permission_denied_message = "You do not have permission to update item status."
 	http_method_names = ["patch"]
 
 	def patch(self, request, pk):
-		order_item = get_object_or_404(OrderItem, pk=pk)
-		# Only chef, barista, waiter, or admin can update statuses
-		if not (_user_has_role(request.user, "chef") or _user_has_role(request.user, "barista") or _user_has_role(request.user, "waiter") or getattr(request.user, "is_superuser", False) or getattr(getattr(request.user, 'role', None), 'is_admin', False)):
-			return Response({"detail": "You do not have permission to update item status."}, status=status.HTTP_403_FORBIDDEN)
-
-		# Role-based domain restriction
-		item_type = order_item.item.type
-		if _user_has_role(request.user, "chef") and item_type != MenuItem.TYPE_FOOD:
-			return Response({"detail": "Chefs can only update food items."}, status=status.HTTP_403_FORBIDDEN)
-		if _user_has_role(request.user, "barista") and item_type != MenuItem.TYPE_DRINK:
-			return Response({"detail": "Baristas can only update drink items."}, status=status.HTTP_403_FORBIDDEN)
+		with transaction.atomic():
+			# locked so the counters move from the status the row really has
+			order_item = get_object_or_404(OrderItem.objects.select_for_update(), pk=pk)
+
+			# Only the roles of the station the item was routed to
+			if not user_can_update_station(request.user, order_item.station):
+				return Response({"detail": "You can only update items of your stations."}, status=status.HTTP_403_FORBIDDEN)
+
+			status_value = request.data.get("status")
+			if status_value not in dict(OrderItem.STATUS_CHOICES):
+				return Response({"detail": "Invalid status."}, status=status.HTTP_400_BAD_REQUEST)
+
+			order_item.status = status_value
+			order_item.save()
+		serializer = OrderItemSerializer(order_item)
+		return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class OrderItemBulkStatusUpdateAPIView(IdempotentAPIViewMixin, APIView):
+	"""PATCH /api/orders/items/status/ - move many order items to one status.
+
+	Body: {"ids": [1, 2, 3], "status": "in_progress"}. Items the caller may not touch
+	(unknown ids, items routed to a station the caller's role is not attached to) are
+	listed in ``rejected``; the rest are updated with a single UPDATE.
+	"""
 
+	permission_classes = (IsAuthenticated, HasPermissionCode)
+	required_permission = "orders_update_item_status"
+	permission_denied_message = "You do not have permission to update item status."
+
+	def patch(self, request):
+		if not isinstance(request.data, dict):
+			return Response({"detail": "Body must be an object with ids and status."}, status=status.HTTP_400_BAD_REQUEST)
 		status_value = request.data.get("status")
 		if status_value not in dict(OrderItem.STATUS_CHOICES):
 			return Response({"detail": "Invalid status."}, status=status.HTTP_400_BAD_REQUEST)
 
-		order_item.status = status_value
-		order_item.save()
-		serializer = OrderItemSerializer(order_item)
-		return Response(serializer.data, status=status.HTTP_200_OK)
+		ids = request.data.get("ids")
+		if not isinstance(ids, list) or not ids:
+			return Response({"detail": "ids must be a non-empty list."}, status=status.HTTP_400_BAD_REQUEST)
+		try:
+			ids = list(dict.fromkeys(int(i) for i in ids))
+		except (TypeError, ValueError):
+			return Response({"detail": "ids must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+
+		updated = []
+		rejected = []
+		# station code -> whether the caller may update its items
+		allowed = {}
+		with transaction.atomic():
+			# Station restriction, checked for the whole set in one query
+			rows = {
+				row.id: row
+				for row in OrderItem.objects.select_for_update()
+				.filter(pk__in=ids)
+				.annotate(category_id=F("item__category_id"))
+				.values_list("id", "station", "status", "item_id", "category_id", "status_changed_at", named=True)
+			}
+			for order_item_id in ids:
+				row = rows.get(order_item_id)
+				if row is not None and row.station not in allowed:
+					allowed[row.station] = user_can_update_station(request.user, row.station)
+				if row is None:
+					rejected.append({"id": order_item_id, "detail": "Order item not found."})
+				elif not allowed[row.station]:
+					rejected.append({"id": order_item_id, "detail": "You can only update items of your stations."})
+				else:
+					updated.append(order_item_id)
+
+			if updated:
+				now = timezone.now()
+				OrderItem.objects.filter(pk__in=updated).update(
+					status=status_value,
+					# only rows actually changing status enter a new state
+					status_changed_at=Case(
+						When(~Q(status=status_value), then=Value(now)),
+						default=F("status_changed_at"),
+					),
+					updated_at=now,
+				)
+				updated_rows = [rows[i] for i in updated]
+				adjust_counters(count_status_change([(row.station, row.status) for row in updated_rows], status_value))
+				log_bulk_transitions(updated_rows, status_value, now)
+				record_changes(OrderItemChange.KIND_UPDATED, [(row.id, row.station) for row in updated_rows])
+				publish_order_items(EVENT_UPDATED, updated)
+
+		data = {"status": status_value, "updated": updated, "rejected": rejected}
+		return Response(data, status=status.HTTP_200_OK)
 
 
-class OrderItemDeleteAPIView(generics.DestroyAPIView):
+class OrderItemDeleteAPIView(IdempotentAPIViewMixin, generics.DestroyAPIView):
 	queryset = OrderItem.objects.all()
-	permission_classes = (IsAuthenticated,)
+	permission_classes = (IsAuthenticated, HasPermissionCode)
+	required_permission = "orders_delete_item"
+	permission_denied_message = "You do not have permission to delete order items."
 
 	def delete(self, request, pk):
-		# admin only
-		if not getattr(request.user, "is_superuser", False) and not getattr(getattr(request.user, 'role', None), 'is_admin', False):
-			return Response({"detail": "You do not have permission to delete order items."}, status=status.HTTP_403_FORBIDDEN)
-
-		order_item = get_object_or_404(OrderItem, pk=pk)
-		order_item.delete()
+		with transaction.atomic():
+			order_item = get_object_or_404(OrderItem.objects.select_for_update(), pk=pk)
+			order_item.delete()
 		return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class KitchenOrderItemListAPIView(generics.ListAPIView):
-	serializer_class = OrderItemSerializer
+class StationListAPIView(generics.ListAPIView):
+	"""GET /api/stations/ - the configured stations, for screens to pick their queue."""
+
+	serializer_class = StationSerializer
 	permission_classes = (IsAuthenticated,)
 
 	def get(self, request):
-		# Allow chef, waiter, or admin to view kitchen items
-		if not (_user_has_role(request.user, "chef") or _user_has_role(request.user, "waiter") or getattr(request.user, "is_superuser", False) or getattr(getattr(request.user, 'role', None), 'is_admin', False)):
-			return Response({"detail": "You do not have permission to view kitchen items."}, status=status.HTTP_403_FORBIDDEN)
+		stations = [info for info in station_router.all() if user_can_view_station(request.user, info)]
+		return Response(self.get_serializer(stations, many=True).data, status=status.HTTP_200_OK)
 
-		qs = OrderItem.objects.select_related("order", "item", "order__session", "order__session__table").filter(
-			item__type=MenuItem.TYPE_FOOD
+
+class StationOrderItemListAPIView(generics.ListAPIView):
+	"""GET /api/stations/{code}/items/ - the order items routed to one station."""
+
+	serializer_class = OrderItemSerializer
+	permission_classes = (IsAuthenticated,)
+	# set by the kitchen/barista aliases; otherwise taken from the URL
+	station_code = None
+
+	def get(self, request, code=None):
+		code = self.station_code or code
+		station = station_router.get(code)
+		if station is None:
+			return Response({"detail": "Station not found."}, status=status.HTTP_404_NOT_FOUND)
+		# Allow the station's roles or admin to view its items
+		if not user_can_view_station(request.user, station):
+			return Response({"detail": f"You do not have permission to view {code} items."}, status=status.HTTP_403_FORBIDDEN)
+
+		# ?since=<cursor> returns only rows changed or deleted after the cursor
+		since, error = _since_param(request)
+		if error is not None:
+			return error
+		# read first: anything logged after it is left for the next poll
+		cursor = current_cursor()
+		etag = None
+		if since is None:
+			etag = _station_list_etag(request, code)
+			response = not_modified(request, etag)
+			if response is not None:
+				return response
+
+		qs = OrderItem.objects.select_related("order", "item__category", "order__session__table").filter(
+			station=code
 		)
+		deletions = OrderItemDeletion.objects.filter(station=code)
 
 		# Filters
 		status_param = request.query_params.get("status")
-		if status_param:
+		# in delta mode rows leaving the status filter must still be reported
+		if status_param and since is None:
 			allowed_statuses = set(dict(OrderItem.STATUS_CHOICES).keys())
 			requested = {s.strip() for s in status_param.split(",") if s.strip()}
 			valid = list(requested & allowed_statuses)
@@ -149,6 +444,7 @@ class KitchenOrderItemListAPIView(generics.ListAPIView):
 		if table_param:
 			try:
 				qs = qs.filter(order__session__table__number=int(table_param))
+				deletions = deletions.filter(table_number=int(table_param))
 			except ValueError:
 				pass
 
@@ -156,23 +452,39 @@ class KitchenOrderItemListAPIView(generics.ListAPIView):
 		if session_param:
 			try:
 				qs = qs.filter(order__session_id=int(session_param))
+				deletions = deletions.filter(session_id=int(session_param))
 			except ValueError:
 				pass
 
+		if since is not None:
+			return _station_changes_response(request, code, qs, deletions, since, cursor)
+
 		qs = qs.order_by("created_at")
-		serializer = OrderItemSerializer(qs, many=True)
-		return Response(serializer.data, status=status.HTTP_200_OK)
+		response = Response(_order_item_rows(request, qs), status=status.HTTP_200_OK)
+		response["X-Sync-Cursor"] = str(cursor)
+		response["ETag"] = etag
+		return response
 
 
-class KitchenDashboardAPIView(APIView):
-	permission_classes = (IsAuthenticated,)
+class StationDashboardAPIView(APIView):
+	"""GET /api/stations/{code}/dashboard/ - per-status counts for one station."""
 
-	def get(self, request):
-		# Allow chef, waiter, or admin to view dashboard
-		if not (_user_has_role(request.user, "chef") or _user_has_role(request.user, "waiter") or getattr(request.user, "is_superuser", False) or getattr(getattr(request.user, 'role', None), 'is_admin', False)):
-			return Response({"detail": "You do not have permission to view the kitchen dashboard."}, status=status.HTTP_403_FORBIDDEN)
-
-		base_qs = OrderItem.objects.filter(item__type=MenuItem.TYPE_FOOD)
+	permission_classes = (IsAuthenticated,)
+	station_code = None
+	# top-level key of the counts in the payload; defaults to the station code
+	payload_key = None
+
+	def get(self, request, code=None):
+		code = self.station_code or code
+		station = station_router.get(code)
+		if station is None:
+			return Response({"detail": "Station not found."}, status=status.HTTP_404_NOT_FOUND)
+		# Allow the station's roles or admin to view dashboard
+		if not user_can_view_station(request.user, station):
+			return Response({"detail": f"You do not have permission to view the {code} dashboard."}, status=status.HTTP_403_FORBIDDEN)
+
+		# Maintained per-status counters, no scan of the order items
+		station_counts_by_status = station_counts(code)
 
 		# Optional status filter (same as list endpoint) to scope dashboard
 		status_param = request.query_params.get("status")
@@ -181,16 +493,20 @@ class KitchenDashboardAPIView(APIView):
 			requested = {s.strip() for s in status_param.split(",") if s.strip()}
 			valid = list(requested & allowed_statuses)
 			if valid:
-				base_qs = base_qs.filter(status__in=valid)
+				station_counts_by_status = {s: c for s, c in station_counts_by_status.items() if s in valid}
 
 		counts = {OrderItem.STATUS_WAITING: 0, OrderItem.STATUS_IN_PROGRESS: 0, OrderItem.STATUS_READY: 0}
-		for row in base_qs.values("status").annotate(c=Count("id")):
-			s = row["status"]
+		for s, c in station_counts_by_status.items():
 			if s in counts:
-				counts[s] = row["c"]
+				counts[s] = c
+
+		etag = make_etag("station-dashboard", code, sorted(counts.items()))
+		response = not_modified(request, etag)
+		if response is not None:
+			return response
 
 		data = {
-			"food": {
+			self.payload_key or code: {
 				"waiting": counts[OrderItem.STATUS_WAITING],
 				"in_progress": counts[OrderItem.STATUS_IN_PROGRESS],
 				"ready": counts[OrderItem.STATUS_READY],
@@ -198,82 +514,326 @@ class KitchenDashboardAPIView(APIView):
 			},
 			"updated_at": timezone.now(),
 		}
-		return Response(data, status=status.HTTP_200_OK)
+		response = Response(data, status=status.HTTP_200_OK)
+		response["ETag"] = etag
+		return response
 
 
-class BaristaOrderItemListAPIView(generics.ListAPIView):
-	serializer_class = OrderItemSerializer
-	permission_classes = (IsAuthenticated,)
+# The original kitchen/barista endpoints serve the default "kitchen" and "barista" stations
+class KitchenOrderItemListAPIView(StationOrderItemListAPIView):
+	station_code = "kitchen"
 
-	def get(self, request):
-		# Allow barista, waiter, or admin to view barista items
-		if not (_user_has_role(request.user, "barista") or _user_has_role(request.user, "waiter") or getattr(request.user, "is_superuser", False) or getattr(getattr(request.user, 'role', None), 'is_admin', False)):
-			return Response({"detail": "You do not have permission to view barista items."}, status=status.HTTP_403_FORBIDDEN)
 
-		qs = OrderItem.objects.select_related("order", "item", "order__session", "order__session__table").filter(
-			item__type=MenuItem.TYPE_DRINK
-		)
+class KitchenDashboardAPIView(StationDashboardAPIView):
+	station_code = "kitchen"
+	payload_key = "food"
 
-		# Filters
+
+class BaristaOrderItemListAPIView(StationOrderItemListAPIView):
+	station_code = "barista"
+
+
+class BaristaDashboardAPIView(StationDashboardAPIView):
+	station_code = "barista"
+	payload_key = "drink"
+
+
+class _OperationRequest:
+	"""The sync request as seen by one operation: same user and headers, the operation's body."""
+
+	def __init__(self, request, data):
+		self._request = request
+		self.data = data
+
+	def __getattr__(self, name):
+		return getattr(self._request, name)
+
+
+def _run_view(view_class, request, data, **kwargs):
+	"""Run ``view_class.post`` for one sync operation, turning exceptions into responses."""
+	view = view_class()
+	view.setup(request._request, **kwargs)
+	view.request = request
+	view.format_kwarg = None
+	op_request = _OperationRequest(request, data)
+	try:
+		view.check_permissions(op_request)
+		return view.post(op_request, **kwargs)
+	except Http404:
+		return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+	except APIException as exc:
+		detail = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+		return Response(detail, status=exc.status_code)
+	except IntegrityError:
+		# the caller rolls the operation's savepoint back
+		return Response({"detail": "Operation conflicts with existing data."}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class SyncOperationsAPIView(IdempotentAPIViewMixin, APIView):
+	"""POST /api/sync/ - replay a device's queued operations in one request.
+
+	Body: {"operations": [{"op": "open_session", "id": "tmp-s1", "table": 4},
+	{"op": "create_order", "id": "tmp-o1", "session": "tmp-s1"},
+	{"op": "add_items", "order": "tmp-o1", "items": [...]},
+	{"op": "request_bill", "session": "tmp-s1"}]}. References are real (integer)
+	ids or the string temp ids given by earlier operations. Each operation's shape is
+	checked before it runs (only its own keys, string temp ids). Every operation runs the matching view
+	(same permissions and rules) inside its own savepoint of one transaction: a
+	failed operation is rolled back and reported, and operations referring to its
+	temp id fail too.
+	"""
+
+	permission_classes = (IsAuthenticated,)
+	MAX_OPERATIONS = 200
+	# largest primary key a reference may hold (BigAutoField)
+	MAX_ID = 2**63 - 1
+
+	# op -> (view, operation key holding the view's pk, temp id namespace that key may
+	# refer to, keys of the view's body)
+	OPERATIONS = {
+		"open_session": (OpenSessionAPIView, "table", None, ()),
+		"create_order": (CreateOrderForSessionAPIView, "session", "session", ()),
+		"add_item": (AddItemToOrderAPIView, "order", "order", ("item_id", "quantity", "note_to_chef")),
+		"add_items": (AddItemsToOrderAPIView, "order", "order", ("items",)),
+		"request_bill": (RequestBillAPIView, "session", "session", ()),
+	}
+	# namespace of the temp id an operation's "id" defines
+	CREATES = {"open_session": "session", "create_order": "order"}
+
+	def _shape_error(self, operation):
+		"""Return why ``operation`` is malformed, or None."""
+		if not isinstance(operation, dict):
+			return "Operation must be an object."
+		op = operation.get("op")
+		if not isinstance(op, str) or op not in self.OPERATIONS:
+			return "Unknown operation."
+		_, reference_key, namespace, body_keys = self.OPERATIONS[op]
+		allowed = {"op", reference_key, *body_keys}
+		if op in self.CREATES:
+			allowed.add("id")
+		if not set(operation) <= allowed:
+			return f"{op} accepts only: {', '.join(sorted(allowed))}."
+		temp_id = operation.get("id")
+		if "id" in operation and (not isinstance(temp_id, str) or not temp_id):
+			return "id must be a non-empty string temp id."
+		reference = operation.get(reference_key)
+		if isinstance(reference, int) and not isinstance(reference, bool) and 0 < reference <= self.MAX_ID:
+			return None
+		if namespace is not None and isinstance(reference, str) and reference:
+			return None
+		if namespace is None:
+			return f"{reference_key} must be an id."
+		return f"{reference_key} must be an id or a temp id."
+
+	def post(self, request):
+		operations = request.data.get("operations") if isinstance(request.data, dict) else request.data
+		if not isinstance(operations, list) or not operations:
+			return Response({"detail": "operations must be a non-empty list."}, status=status.HTTP_400_BAD_REQUEST)
+		if len(operations) > self.MAX_OPERATIONS:
+			return Response({"detail": f"At most {self.MAX_OPERATIONS} operations per request."}, status=status.HTTP_400_BAD_REQUEST)
+
+		temp_ids = {"session": {}, "order": {}}
+		results = []
+		with transaction.atomic():
+			for index, operation in enumerate(operations):
+				error = self._shape_error(operation)
+				result = {"index": index, "op": operation["op"] if error is None else None}
+				results.append(result)
+				if error is not None:
+					result.update(status=status.HTTP_400_BAD_REQUEST, data={"detail": error})
+					continue
+				view_class, reference_key, namespace, _ = self.OPERATIONS[result["op"]]
+
+				temp_id = operation.get("id")
+				if temp_id is not None and temp_id in temp_ids[self.CREATES[result["op"]]]:
+					result.update(status=status.HTTP_400_BAD_REQUEST, data={"detail": f"Temp id {temp_id!r} is already defined."})
+					continue
+
+				reference = operation[reference_key]
+				if isinstance(reference, str):
+					if reference not in temp_ids[namespace]:
+						detail = f"Unknown or failed temp id {reference!r}."
+						result.update(status=status.HTTP_400_BAD_REQUEST, data={"detail": detail})
+						continue
+					reference = temp_ids[namespace][reference]
+
+				data = {key: value for key, value in operation.items() if key not in ("op", "id", reference_key)}
+				with transaction.atomic():
+					response = _run_view(view_class, request, data, pk=reference)
+					if response.status_code >= 400:
+						transaction.set_rollback(True)
+				result.update(status=response.status_code, data=response.data)
+
+				if temp_id is not None and response.status_code < 400:
+					temp_ids[self.CREATES[result["op"]]][temp_id] = response.data["id"]
+					result["id"] = temp_id
+
+		ids = {temp_id: real_id for mapping in temp_ids.values() for temp_id, real_id in mapping.items()}
+		return Response({"results": results, "ids": ids}, status=status.HTTP_200_OK)
+
+
+def _analytics_bound(value):
+	"""Parse an ISO date or datetime query parameter into an aware datetime (None if invalid)."""
+	try:
+		parsed = parse_datetime(value)
+		if parsed is None:
+			date = parse_date(value)
+			if date is None:
+				return None
+			parsed = datetime.combine(date, time.min)
+	except ValueError:
+		return None
+	if timezone.is_naive(parsed):
+		parsed = timezone.make_aware(parsed)
+	return parsed
+
+
+class PrepTimeAnalyticsAPIView(APIView):
+	"""GET /api/analytics/prep-times/ - p50/p90/p99 seconds spent in each status.
+
+	Query params: ``from`` / ``to`` (ISO date or datetime, default the last 30 days),
+	``by`` (comma separated subset of item, category, station, hour) and ``status``
+	(the states to measure, default all). Admin only.
+	"""
+
+	permission_classes = (IsAuthenticated, IsAdminRole)
+	DEFAULT_RANGE = timedelta(days=30)
+
+	def get(self, request):
+		until = timezone.now()
+		if request.query_params.get("to"):
+			until = _analytics_bound(request.query_params["to"])
+		since = until - self.DEFAULT_RANGE if until else None
+		if request.query_params.get("from"):
+			since = _analytics_bound(request.query_params["from"])
+		if since is None or until is None or since >= until:
+			return Response({"detail": "Invalid from/to range."}, status=status.HTTP_400_BAD_REQUEST)
+
+		groupings = GROUPINGS
+		by_param = request.query_params.get("by")
+		if by_param:
+			groupings = tuple(g for g in GROUPINGS if g in {b.strip() for b in by_param.split(",")})
+			if not groupings:
+				return Response({"detail": f"by must be one of {', '.join(GROUPINGS)}."}, status=status.HTTP_400_BAD_REQUEST)
+
+		statuses = None
 		status_param = request.query_params.get("status")
 		if status_param:
 			allowed_statuses = set(dict(OrderItem.STATUS_CHOICES).keys())
-			requested = {s.strip() for s in status_param.split(",") if s.strip()}
-			valid = list(requested & allowed_statuses)
-			if valid:
-				qs = qs.filter(status__in=valid)
+			statuses = list({s.strip() for s in status_param.split(",") if s.strip()} & allowed_statuses)
 
-		table_param = request.query_params.get("table")
-		if table_param:
+		data = {"from": since, "to": until, **time_in_state(since, until, statuses, groupings)}
+		return Response(data, status=status.HTTP_200_OK)
+
+
+# Seconds between SSE comment frames, keeps proxies from closing idle streams
+STREAM_KEEPALIVE_SECONDS = 15
+# Reconnect delay suggested to EventSource clients
+STREAM_RETRY_MS = 3000
+
+
+def _stream_user(request, code):
+	"""Authenticate a stream request and check it may view the station. Returns (user, allowed).
+
+	EventSource cannot send headers, so a JWT may also be passed as ?token=.
+	Runs in a worker thread because authentication and role lookups hit the DB.
+	"""
+	auth = CachedJWTAuthentication()
+	try:
+		result = auth.authenticate(request)
+		if result is None and request.GET.get("token"):
+			validated = auth.get_validated_token(request.GET["token"])
+			result = (auth.get_user(validated), validated)
+	except (InvalidToken, AuthenticationFailed):
+		return None, False
+	user = result[0] if result else getattr(request, "user", None)
+	if not user or not user.is_authenticated:
+		return None, False
+	return user, user_can_view_station(user, station_router.get(code))
+
+
+def _stream_filters(params):
+	filters = {"statuses": None, "table": None, "session": None}
+	status_param = params.get("status")
+	if status_param:
+		allowed_statuses = set(dict(OrderItem.STATUS_CHOICES).keys())
+		requested = {s.strip() for s in status_param.split(",") if s.strip()}
+		valid = requested & allowed_statuses
+		if valid:
+			filters["statuses"] = valid
+	for name in ("table", "session"):
+		value = params.get(name)
+		if value:
 			try:
-				qs = qs.filter(order__session__table__number=int(table_param))
+				filters[name] = int(value)
 			except ValueError:
 				pass
+	return filters
 
-		session_param = request.query_params.get("session")
-		if session_param:
+
+def _stream_event_matches(event, code, filters):
+	if event["type"] == EVENT_RESYNC:
+		return True
+	if event.get("station") != code:
+		return False
+	if filters["table"] is not None and event.get("table") != filters["table"]:
+		return False
+	if filters["session"] is not None and event.get("session") != filters["session"]:
+		return False
+	# Status filters only scope new items: updates and deletions are always sent
+	# so a screen can drop rows that leave its filter.
+	if filters["statuses"] and event["type"] == EVENT_CREATED and event.get("status") not in filters["statuses"]:
+		return False
+	return True
+
+
+async def _order_item_event_stream(code, filters):
+	queue = broker.subscribe()
+	# writes handled by other processes reach the broker through the poller
+	poller.ensure_running()
+	try:
+		yield f"retry: {STREAM_RETRY_MS}\n\n"
+		while True:
 			try:
-				qs = qs.filter(order__session_id=int(session_param))
-			except ValueError:
-				pass
+				event = await asyncio.wait_for(queue.get(), timeout=STREAM_KEEPALIVE_SECONDS)
+			except asyncio.TimeoutError:
+				yield ": keepalive\n\n"
+				continue
+			if _stream_event_matches(event, code, filters):
+				data = json.dumps(event, cls=DjangoJSONEncoder)
+				yield f"event: {event['type']}\ndata: {data}\n\n"
+	finally:
+		broker.unsubscribe(queue)
 
-		qs = qs.order_by("created_at")
-		serializer = OrderItemSerializer(qs, many=True)
-		return Response(serializer.data, status=status.HTTP_200_OK)
 
+class StationOrderItemStreamView(View):
+	"""GET /api/stations/{code}/stream/ - Server-Sent Events feed of OrderItem
+	created/updated/deleted events for one station.
 
-class BaristaDashboardAPIView(APIView):
-	permission_classes = (IsAuthenticated,)
+	Async so that idle connections only hold a queue on the event loop; serve the
+	project through ``Restaurant_Backend.asgi`` for this endpoint to scale.
+	"""
 
-	def get(self, request):
-		# Allow barista, waiter, or admin to view dashboard
-		if not (_user_has_role(request.user, "barista") or _user_has_role(request.user, "waiter") or getattr(request.user, "is_superuser", False) or getattr(getattr(request.user, 'role', None), 'is_admin', False)):
-			return Response({"detail": "You do not have permission to view the barista dashboard."}, status=status.HTTP_403_FORBIDDEN)
+	station_code = None
 
-		base_qs = OrderItem.objects.filter(item__type=MenuItem.TYPE_DRINK)
+	async def get(self, request, code=None):
+		code = self.station_code or code
+		user, allowed = await sync_to_async(_stream_user)(request, code)
+		if user is None:
+			return JsonResponse({"detail": "Authentication credentials were not provided."}, status=status.HTTP_401_UNAUTHORIZED)
+		if not allowed:
+			return JsonResponse({"detail": f"You do not have permission to view {code} items."}, status=status.HTTP_403_FORBIDDEN)
 
-		# Optional status filter (same as list endpoint) to scope dashboard
-		status_param = request.query_params.get("status")
-		if status_param:
-			allowed_statuses = set(dict(OrderItem.STATUS_CHOICES).keys())
-			requested = {s.strip() for s in status_param.split(",") if s.strip()}
-			valid = list(requested & allowed_statuses)
-			if valid:
-				base_qs = base_qs.filter(status__in=valid)
+		filters = _stream_filters(request.GET)
+		response = StreamingHttpResponse(_order_item_event_stream(code, filters), content_type="text/event-stream")
+		response["Cache-Control"] = "no-cache"
+		response["X-Accel-Buffering"] = "no"
+		return response
 
-		counts = {OrderItem.STATUS_WAITING: 0, OrderItem.STATUS_IN_PROGRESS: 0, OrderItem.STATUS_READY: 0}
-		for row in base_qs.values("status").annotate(c=Count("id")):
-			s = row["status"]
-			if s in counts:
-				counts[s] = row["c"]
 
-		data = {
-			"drink": {
-				"waiting": counts[OrderItem.STATUS_WAITING],
-				"in_progress": counts[OrderItem.STATUS_IN_PROGRESS],
-				"ready": counts[OrderItem.STATUS_READY],
-				"total_pending": counts[OrderItem.STATUS_WAITING] + counts[OrderItem.STATUS_IN_PROGRESS],
-			},
-			"updated_at": timezone.now(),
-		}
-		return Response(data, status=status.HTTP_200_OK)
+class KitchenOrderItemStreamView(StationOrderItemStreamView):
+	station_code = "kitchen"
+
+
+class BaristaOrderItemStreamView(StationOrderItemStreamView):
+	station_code = "barista"
@@ -29,6 +29,7 @@ class Command(BaseCommand):
                 {'name': 'Create menu item', 'code': 'menu_items_create'},
                 {'name': 'Update menu item', 'code': 'menu_items_update'},
                 {'name': 'Delete menu item', 'code': 'menu_items_delete'},
+                {'name': 'Change menu item availability', 'code': 'menu_items_availability'},
                 # Orders
                 {'name': 'Create order', 'code': 'orders_create'},
                 {'name': 'View order', 'code': 'orders_view'},
@@ -82,7 +83,7 @@ class Command(BaseCommand):
                     'permissions': [
                         'auth_login', 'auth_me',
                         'kitchen_items_view', 'kitchen_items_update',
-                        'orders_update_item_status',
+                        'orders_update_item_status', 'menu_items_availability',
                     ],
                 },
                 {
@@ -91,7 +92,7 @@ class Command(BaseCommand):
                     'permissions': [
                         'auth_login', 'auth_me',
                         'barista_items_view', 'barista_items_update',
-                        'orders_update_item_status',
+                        'orders_update_item_status', 'menu_items_availability',
                     ],
                 },
                 {
@@ -0,0 +1,60 @@
+from django.db import migrations
+
+# Codes the orders, table session and billing endpoints used to grant by role name
+PERMISSIONS = {
+    "tables_open_session": "Open table session",
+    "tables_close_session": "Close table session",
+    "menu_items_availability": "Change menu item availability",
+    "orders_create": "Create order",
+    "orders_add_item": "Add order item",
+    "orders_update_item_status": "Update order item status",
+    "billing_request_bill": "Request bill",
+    "billing_pending_view": "View pending bills",
+    "billing_invoice_create": "Create invoice",
+    "billing_invoice_pay": "Pay invoice",
+}
+
+ROLE_PERMISSIONS = {
+    "waiter": (
+        "tables_open_session",
+        "orders_create",
+        "orders_add_item",
+        "orders_update_item_status",
+        "billing_request_bill",
+    ),
+    "chef": ("orders_update_item_status", "menu_items_availability"),
+    "barista": ("orders_update_item_status", "menu_items_availability"),
+    "cashier": (
+        "tables_close_session",
+        "billing_pending_view",
+        "billing_invoice_create",
+        "billing_invoice_pay",
+    ),
+}
+
+
+def grant_role_permission_codes(apps, schema_editor):
+    Role = apps.get_model("rbac_app", "Role")
+    Permission = apps.get_model("rbac_app", "Permission")
+
+    permissions = {}
+    for code, name in PERMISSIONS.items():
+        permissions[code], _ = Permission.objects.get_or_create(
+            code=code, defaults={"name": name}
+        )
+
+    # Role names were compared case-insensitively
+    for role_name, codes in ROLE_PERMISSIONS.items():
+        for role in Role.objects.filter(name__iexact=role_name):
+            role.permissions.add(*(permissions[code] for code in codes))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rbac_app", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(grant_role_permission_codes, migrations.RunPython.noop),
+    ]
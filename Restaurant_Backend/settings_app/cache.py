@@ -0,0 +1,47 @@
+"""Process-local copy of the billing settings row.
+
+Every invoice reads the tax, service charge and discount rates, and the row
+changes a few times a year, so its values are loaded once and each caller gets a
+fresh ``Setting`` built from them. Setting signals drop the copy in this process;
+other processes pick up changes after ``TTL_SECONDS``.
+"""
+import threading
+import time
+
+
+class SettingsCache:
+    TTL_SECONDS = 60
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = None
+        self._loaded_at = 0.0
+
+    def get(self):
+        """Return the Setting row (created with the defaults if there is none)."""
+        from .models import Setting
+
+        with self._lock:
+            values = self._values
+            if values is not None and time.monotonic() - self._loaded_at >= self.TTL_SECONDS:
+                values = None
+        if values is None:
+            obj = Setting.objects.first()
+            if not obj:
+                obj = Setting.objects.create()
+            values = tuple(getattr(obj, f.attname) for f in Setting._meta.concrete_fields)
+            with self._lock:
+                self._values = values
+                self._loaded_at = time.monotonic()
+        return Setting.from_db("default", [f.attname for f in Setting._meta.concrete_fields], values)
+
+    def invalidate(self):
+        with self._lock:
+            self._values = None
+
+
+settings_cache = SettingsCache()
+
+
+def get_settings():
+    return settings_cache.get()
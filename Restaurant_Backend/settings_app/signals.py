@@ -0,0 +1,14 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import settings_cache
+from .models import Setting
+
+
+@receiver(post_save, sender=Setting)
+@receiver(post_delete, sender=Setting)
+def setting_changed(sender, **kwargs):
+    settings_cache.invalidate()
+    # again after commit, in case another request reloaded the old row meanwhile
+    transaction.on_commit(settings_cache.invalidate)
@@ -0,0 +1,44 @@
+from decimal import Decimal
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from accounts_app.models import User
+from rbac_app.models import Role
+from .cache import get_settings, settings_cache
+from .models import Setting
+
+
+class SettingsUpdateTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username="admin", role=Role.objects.create(name="admin", is_admin=True))
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        Setting.objects.create(tax_rate=Decimal("10.00"))
+
+    def test_patch_keeps_fields_changed_behind_the_cache(self):
+        # this process caches the row, then another process changes the tax rate
+        self.assertEqual(get_settings().tax_rate, Decimal("10.00"))
+        Setting.objects.update(tax_rate=Decimal("20.00"))
+
+        response = self.client.patch("/api/settings/", {"discount_rate": "5.00"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["tax_rate"], "20.00")
+        row = Setting.objects.get()
+        self.assertEqual((row.tax_rate, row.discount_rate), (Decimal("20.00"), Decimal("5.00")))
+
+    def test_patch_invalidates_the_cache(self):
+        get_settings()
+        self.client.patch("/api/settings/", {"tax_rate": "12.50"}, format="json")
+        self.assertEqual(get_settings().tax_rate, Decimal("12.50"))
+
+    def test_patch_requires_admin(self):
+        waiter = User.objects.create_user(username="waiter", role=Role.objects.create(name="waiter"))
+        client = APIClient()
+        client.force_authenticate(waiter)
+        response = client.patch("/api/settings/", {"tax_rate": "0.00"}, format="json")
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(Setting.objects.get().tax_rate, Decimal("10.00"))
+
+    def tearDown(self):
+        settings_cache.invalidate()
@@ -1,9 +1,11 @@
+from django.db import transaction
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 
 from accounts_app.permissions import IsAdminRole
+from .cache import get_settings
 from .models import Setting
 from .serializers import SettingSerializer
 
@@ -12,19 +14,20 @@ class SettingsRetrieveUpdateAPIView(APIView):
     permission_classes = (IsAuthenticated,)
 
     def get(self, request):
-        obj = Setting.objects.first()
-        if not obj:
-            obj = Setting.objects.create()
+        obj = get_settings()
         serializer = SettingSerializer(obj)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     def patch(self, request):
         if not (getattr(request.user, "is_superuser", False) or IsAdminRole().has_permission(request, self)):
             return Response({"detail": "You do not have permission to update settings."}, status=status.HTTP_403_FORBIDDEN)
-        obj = Setting.objects.first()
-        if not obj:
-            obj = Setting.objects.create()
-        serializer = SettingSerializer(obj, data=request.data, partial=True)
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
+        # written from the locked row, not the cached copy, so fields this request
+        # does not send keep the values other processes saved
+        with transaction.atomic():
+            obj = Setting.objects.select_for_update().first()
+            if not obj:
+                obj = Setting.objects.create()
+            serializer = SettingSerializer(obj, data=request.data, partial=True)
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-18 19:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tables_app", "0002_tablesession_bill_requested_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tablesession",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
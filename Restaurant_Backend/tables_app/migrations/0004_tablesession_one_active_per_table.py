@@ -0,0 +1,22 @@
+# Generated by Django 5.2.9 on 2026-10-18 19:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tables_app", "0003_tablesession_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="tablesession",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status", "active")),
+                fields=("table",),
+                name="tablesession_one_active_per_table",
+                violation_error_message="There is already an active session for this table.",
+            ),
+        ),
+    ]
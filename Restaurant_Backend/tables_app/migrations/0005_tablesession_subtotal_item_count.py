@@ -0,0 +1,48 @@
+# Generated by Django 5.2.9 on 2026-10-18 19:48
+
+from django.db import migrations, models
+from django.db.models import DecimalField, F, Sum
+
+
+def backfill_session_totals(apps, schema_editor):
+    TableSession = apps.get_model("tables_app", "TableSession")
+    OrderItem = apps.get_model("orders_app", "OrderItem")
+    rows = (
+        OrderItem.objects.order_by()
+        .values("order__session_id")
+        .annotate(
+            subtotal=Sum(
+                F("price_snapshot") * F("quantity"),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            ),
+            item_count=Sum("quantity"),
+        )
+    )
+    for row in rows:
+        TableSession.objects.filter(pk=row["order__session_id"]).update(
+            subtotal=row["subtotal"], item_count=row["item_count"]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders_app", "0007_station_capacity"),
+        ("tables_app", "0004_tablesession_one_active_per_table"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tablesession",
+            name="item_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="tablesession",
+            name="subtotal",
+            field=models.DecimalField(
+                decimal_places=2, default=0, editable=False, max_digits=12
+            ),
+        ),
+        migrations.RunPython(backfill_session_totals, migrations.RunPython.noop),
+    ]
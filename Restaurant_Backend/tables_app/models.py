@@ -1,6 +1,5 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
-from django.core.exceptions import ValidationError
 
 
 class Table(models.Model):
@@ -34,29 +33,43 @@ class TableSession(models.Model):
 	status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_ACTIVE)
 	bill_requested = models.BooleanField(default=False)
 	bill_requested_at = models.DateTimeField(null=True, blank=True)
+	# bumped on every save; the active sessions list derives its ETag from it
+	updated_at = models.DateTimeField(auto_now=True, db_index=True)
+	# running sum of price_snapshot * quantity and of quantity over the session's order
+	# items, kept up to date with F() updates by orders_app (see orders_app.counters)
+	subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+	item_count = models.PositiveIntegerField(default=0, editable=False)
 
 	class Meta:
 		ordering = ("-started_at",)
+		constraints = [
+			# enforced by the database, so concurrent opens cannot both succeed
+			models.UniqueConstraint(
+				fields=["table"],
+				condition=models.Q(status="active"),
+				name="tablesession_one_active_per_table",
+				violation_error_message="There is already an active session for this table.",
+			),
+		]
 
-	def clean(self):
-		# Ensure only one active session per table
-		if self.status == self.STATUS_ACTIVE:
-			qs = TableSession.objects.filter(table=self.table, status=self.STATUS_ACTIVE)
-			if self.pk:
-				qs = qs.exclude(pk=self.pk)
-			if qs.exists():
-				raise ValidationError("There is already an active session for this table.")
-
-	def save(self, *args, **kwargs):
-		self.full_clean()
-		super().save(*args, **kwargs)
+	@classmethod
+	def open(cls, table):
+		"""Start a session and mark the table occupied; IntegrityError if the table already has one."""
+		with transaction.atomic():
+			session = cls.objects.create(table=table)
+			table.status = Table.STATUS_OCCUPIED
+			table.save(update_fields=["status"])
+		return session
 
 	def close(self):
 		if self.status == self.STATUS_CLOSED:
 			return
-		self.status = self.STATUS_CLOSED
-		self.ended_at = timezone.now()
-		self.save()
+		with transaction.atomic():
+			self.status = self.STATUS_CLOSED
+			self.ended_at = timezone.now()
+			self.save(update_fields=["status", "ended_at", "updated_at"])
+			self.table.status = Table.STATUS_AVAILABLE
+			self.table.save(update_fields=["status"])
 
 	def __str__(self):
 		return f"Session {self.id} - Table {self.table.number} ({self.status})"
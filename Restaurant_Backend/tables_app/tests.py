@@ -0,0 +1,121 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from accounts_app.models import User
+from menu_app.models import Category, Item
+from orders_app.models import Order, OrderItem
+from rbac_app.models import Role
+from .models import Table, TableSession
+
+
+class TablesTestCase(TestCase):
+	def setUp(self):
+		call_command("seed_permissions_roles", stdout=StringIO())
+		roles = {role.name: role for role in Role.objects.all()}
+		self.users = {name: User.objects.create_user(username=name, role=roles[name]) for name in ("waiter", "cashier")}
+		self.tables = [Table.objects.create(number=number) for number in (1, 2, 3)]
+
+	def client_for(self, username):
+		client = APIClient()
+		client.force_authenticate(self.users[username])
+		return client
+
+
+class ActiveSessionsTests(TablesTestCase):
+	def test_etag_follows_sessions(self):
+		waiter = self.client_for("waiter")
+		session = TableSession.open(self.tables[0])
+		response = waiter.get("/api/sessions/active/")
+		self.assertEqual([row["id"] for row in response.data], [session.pk])
+		etag = response["ETag"]
+		self.assertEqual(waiter.get("/api/sessions/active/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+		waiter.post(f"/api/sessions/{session.pk}/request-bill/")
+		response = waiter.get("/api/sessions/active/", HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(response.status_code, 200)
+		self.assertTrue(response.data[0]["bill_requested"])
+
+		etag = response["ETag"]
+		session.close()
+		response = waiter.get("/api/sessions/active/", HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual((response.status_code, response.data), (200, []))
+
+
+class FloorPlanTests(TablesTestCase):
+	def setUp(self):
+		super().setUp()
+		category = Category.objects.create(name="Mains")
+		self.steak = Item.objects.create(category=category, name="Steak", price=Decimal("15.00"), type=Item.TYPE_FOOD)
+
+	def seat(self, table, *statuses):
+		session = TableSession.open(table)
+		order = Order.objects.create(session=session, created_by=self.users["waiter"])
+		for item_status in statuses:
+			OrderItem.objects.create(order=order, item=self.steak, quantity=2, price_snapshot=self.steak.price, status=item_status)
+		return session
+
+	def test_tables_with_their_active_session(self):
+		session = self.seat(self.tables[1], OrderItem.STATUS_WAITING, OrderItem.STATUS_READY, OrderItem.STATUS_SERVED)
+		closed = self.seat(self.tables[0], OrderItem.STATUS_WAITING)
+		closed.close()
+
+		response = self.client_for("waiter").get("/api/floor/")
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual([(row["number"], row["status"]) for row in response.data], [(1, "available"), (2, "occupied"), (3, "available")])
+		self.assertIsNone(response.data[0]["session"])
+		floor_session = response.data[1]["session"]
+		self.assertEqual(floor_session["id"], session.pk)
+		self.assertEqual(
+			(floor_session["item_count"], floor_session["open_items"], floor_session["ready_items"], floor_session["total"]),
+			(6, 2, 1, "90.00"),
+		)
+
+	def test_query_count_does_not_grow_with_the_floor(self):
+		waiter = self.client_for("waiter")
+		self.seat(self.tables[0], OrderItem.STATUS_WAITING)
+		with self.assertNumQueries(2):
+			waiter.get("/api/floor/")
+		for number in range(4, 12):
+			self.seat(Table.objects.create(number=number), OrderItem.STATUS_WAITING, OrderItem.STATUS_READY)
+		with self.assertNumQueries(2):
+			response = waiter.get("/api/floor/")
+		self.assertEqual(len(response.data), 11)
+
+
+class OpenSessionTests(TablesTestCase):
+	def url(self, table):
+		return f"/api/tables/{table.pk}/open-session/"
+
+	def test_one_active_session_per_table(self):
+		waiter = self.client_for("waiter")
+		response = waiter.post(self.url(self.tables[0]))
+		self.assertEqual(response.status_code, 201)
+		response = waiter.post(self.url(self.tables[0]))
+		self.assertEqual((response.status_code, response.data["detail"]), (400, "Table is already occupied."))
+		self.assertEqual(TableSession.objects.filter(table=self.tables[0]).count(), 1)
+
+	def test_concurrent_open_is_rejected_by_the_constraint(self):
+		TableSession.open(self.tables[0])
+		# a second request that read the table before the first one committed
+		Table.objects.filter(pk=self.tables[0].pk).update(status=Table.STATUS_AVAILABLE)
+		response = self.client_for("waiter").post(self.url(self.tables[0]))
+		self.assertEqual((response.status_code, response.data["detail"]), (400, "There is already an active session for this table."))
+		self.assertEqual(TableSession.objects.filter(table=self.tables[0]).count(), 1)
+
+	def test_constraint_only_covers_active_sessions(self):
+		TableSession.open(self.tables[0]).close()
+		session = TableSession.open(self.tables[0])
+		with self.assertRaises(IntegrityError), transaction.atomic():
+			TableSession.objects.create(table=self.tables[0])
+		session.close()
+		self.assertEqual(self.client_for("waiter").post(self.url(self.tables[0])).status_code, 201)
+
+	def test_requires_the_permission_code(self):
+		response = self.client_for("cashier").post(self.url(self.tables[0]))
+		self.assertEqual(response.status_code, 403)
+		self.assertFalse(TableSession.objects.exists())
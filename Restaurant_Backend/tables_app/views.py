@@ -1,23 +1,21 @@
+from decimal import Decimal
+
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from django.db import IntegrityError
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.db.models import Count, Max, OuterRef, Q, Subquery
 
-from accounts_app.permissions import IsAdminRole
+from accounts_app.permissions import HasPermissionCode, IsAdminRole
+from Restaurant_Backend.etags import make_etag, not_modified
+from Restaurant_Backend.idempotency import IdempotentAPIViewMixin
+from orders_app.models import OrderItem
 from .models import Table, TableSession
 from .serializers import TableSerializer, TableSessionSerializer
 
 
-def _user_has_role(user, role_name):
-	if not user or not user.is_authenticated:
-		return False
-	if getattr(user, "is_superuser", False):
-		return True
-	role = getattr(user, "role", None)
-	return bool(role and getattr(role, "name", "").lower() == role_name.lower())
-
-
 class TableListCreateAPIView(generics.ListCreateAPIView):
 	queryset = Table.objects.all().order_by("number")
 	serializer_class = TableSerializer
@@ -30,40 +28,32 @@ class TableListCreateAPIView(generics.ListCreateAPIView):
 		return [IsAuthenticated()]
 
 
-class OpenSessionAPIView(generics.GenericAPIView):
-	permission_classes = (IsAuthenticated,)
+class OpenSessionAPIView(IdempotentAPIViewMixin, generics.GenericAPIView):
+	permission_classes = (IsAuthenticated, HasPermissionCode)
+	required_permission = "tables_open_session"
+	permission_denied_message = "You do not have permission to open a session."
 
 	def post(self, request, pk):
-		# Only waiters (or admin/superuser) can open sessions
-		if not _user_has_role(request.user, "waiter") and not getattr(request.user, "is_superuser", False) and not getattr(getattr(request.user, 'role', None), 'is_admin', False):
-			return Response({"detail": "You do not have permission to open a session."}, status=status.HTTP_403_FORBIDDEN)
-
 		table = get_object_or_404(Table, pk=pk)
 		if table.status == Table.STATUS_OCCUPIED:
 			return Response({"detail": "Table is already occupied."}, status=status.HTTP_400_BAD_REQUEST)
 
-		# create session
-		session = TableSession(table=table)
 		try:
-			session.save()
-		except Exception as e:
-			return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
-
-		table.status = Table.STATUS_OCCUPIED
-		table.save()
+			session = TableSession.open(table)
+		except IntegrityError:
+			# another request opened a session for this table first
+			return Response({"detail": "There is already an active session for this table."}, status=status.HTTP_400_BAD_REQUEST)
 
 		serializer = TableSessionSerializer(session)
 		return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
-class CloseSessionAPIView(generics.GenericAPIView):
-	permission_classes = (IsAuthenticated,)
+class CloseSessionAPIView(IdempotentAPIViewMixin, generics.GenericAPIView):
+	permission_classes = (IsAuthenticated, HasPermissionCode)
+	required_permission = "tables_close_session"
+	permission_denied_message = "You do not have permission to close a session."
 
 	def post(self, request, pk):
-		# Only cashier or admin can close sessions
-		if not _user_has_role(request.user, "cashier") and not getattr(request.user, "is_superuser", False) and not getattr(getattr(request.user, 'role', None), 'is_admin', False):
-			return Response({"detail": "You do not have permission to close a session."}, status=status.HTTP_403_FORBIDDEN)
-
 		table = get_object_or_404(Table, pk=pk)
 		# find active session
 		try:
@@ -72,8 +62,6 @@ class CloseSessionAPIView(generics.GenericAPIView):
 			return Response({"detail": "No active session for this table."}, status=status.HTTP_400_BAD_REQUEST)
 
 		session.close()
-		table.status = Table.STATUS_AVAILABLE
-		table.save()
 
 		serializer = TableSessionSerializer(session)
 		return Response(serializer.data, status=status.HTTP_200_OK)
@@ -85,21 +73,19 @@ class SessionRetrieveAPIView(generics.RetrieveAPIView):
 	permission_classes = (IsAuthenticated,)
 
 
-class RequestBillAPIView(generics.GenericAPIView):
-	permission_classes = (IsAuthenticated,)
+class RequestBillAPIView(IdempotentAPIViewMixin, generics.GenericAPIView):
+	permission_classes = (IsAuthenticated, HasPermissionCode)
+	required_permission = "billing_request_bill"
+	permission_denied_message = "You do not have permission to request a bill."
 
 	def post(self, request, pk):
-		# Only waiter (or admin/superuser) can request bill
-		if not _user_has_role(request.user, "waiter") and not getattr(request.user, "is_superuser", False) and not getattr(getattr(request.user, 'role', None), 'is_admin', False):
-			return Response({"detail": "You do not have permission to request a bill."}, status=status.HTTP_403_FORBIDDEN)
-
 		session = get_object_or_404(TableSession, pk=pk)
 		if session.status != TableSession.STATUS_ACTIVE:
 			return Response({"detail": "Session is not active."}, status=status.HTTP_400_BAD_REQUEST)
 
 		session.bill_requested = True
 		session.bill_requested_at = timezone.now()
-		session.save()
+		session.save(update_fields=["bill_requested", "bill_requested_at", "updated_at"])
 
 		serializer = TableSessionSerializer(session)
 		return Response(serializer.data, status=status.HTTP_200_OK)
@@ -109,6 +95,14 @@ class ActiveSessionsListAPIView(generics.GenericAPIView):
 	permission_classes = (IsAuthenticated,)
 
 	def get(self, request):
+		# Any session open, close or bill request bumps the latest updated_at
+		version = TableSession.objects.aggregate(updated=Max("updated_at"))["updated"]
+		active = TableSession.objects.filter(status=TableSession.STATUS_ACTIVE).count()
+		etag = make_etag("sessions-active", version, active)
+		response = not_modified(request, etag)
+		if response is not None:
+			return response
+
 		sessions = TableSession.objects.filter(status=TableSession.STATUS_ACTIVE).select_related("table").order_by("table__number")
 		data = [
 			{
@@ -119,4 +113,71 @@ class ActiveSessionsListAPIView(generics.GenericAPIView):
 			}
 			for s in sessions
 		]
+		response = Response(data, status=status.HTTP_200_OK)
+		response["ETag"] = etag
+		return response
+
+
+class FloorPlanAPIView(generics.GenericAPIView):
+	"""GET /api/floor/ - every table with its active session and the session's item counts and total.
+
+	Built from two queries whatever the number of tables or items: the tables with
+	their active session's columns (including its running subtotal) as correlated
+	subqueries, and the item status counts of all active sessions per table.
+	"""
+
+	permission_classes = (IsAuthenticated,)
+
+	def get(self, request):
+		active = TableSession.objects.filter(table=OuterRef("pk"), status=TableSession.STATUS_ACTIVE).order_by()
+		tables = (
+			Table.objects.order_by("number")
+			.annotate(
+				session_id=Subquery(active.values("id")[:1]),
+				session_started_at=Subquery(active.values("started_at")[:1]),
+				session_bill_requested=Subquery(active.values("bill_requested")[:1]),
+				session_bill_requested_at=Subquery(active.values("bill_requested_at")[:1]),
+				session_subtotal=Subquery(active.values("subtotal")[:1]),
+				session_item_count=Subquery(active.values("item_count")[:1]),
+			)
+			.values_list(
+				"id",
+				"number",
+				"status",
+				"session_id",
+				"session_started_at",
+				"session_bill_requested",
+				"session_bill_requested_at",
+				"session_subtotal",
+				"session_item_count",
+			)
+		)
+
+		item_counts = {
+			row["order__session__table_id"]: row
+			for row in OrderItem.objects.filter(order__session__status=TableSession.STATUS_ACTIVE)
+			.order_by()
+			.values("order__session__table_id")
+			.annotate(
+				open_items=Count("id", filter=~Q(status=OrderItem.STATUS_SERVED)),
+				ready_items=Count("id", filter=Q(status=OrderItem.STATUS_READY)),
+			)
+		}
+
+		data = []
+		for table_id, number, table_status, session_id, started_at, bill_requested, bill_requested_at, subtotal, item_count in tables:
+			session = None
+			if session_id is not None:
+				counts = item_counts.get(table_id, {})
+				session = {
+					"id": session_id,
+					"started_at": started_at,
+					"bill_requested": bool(bill_requested),
+					"bill_requested_at": bill_requested_at,
+					"item_count": item_count,
+					"open_items": counts.get("open_items", 0),
+					"ready_items": counts.get("ready_items", 0),
+					"total": str(Decimal(subtotal).quantize(Decimal("0.01"))),
+				}
+			data.append({"id": table_id, "number": number, "status": table_status, "session": session})
 		return Response(data, status=status.HTTP_200_OK)